@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Callable, Optional
+
+from fastapi import HTTPException, Request
+
+from app.clients.lanes import INTERACTIVE
+from app.metrics import ADMISSION_LIMIT, ADMISSION_IN_FLIGHT, ADMISSION_SHED_TOTAL
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+
+logger = logging.getLogger(__name__)
+
+
+def parse_endpoint_values(value: str, cast=float) -> dict:
+    """Parses "predict=64,async_predict=256" into {endpoint: value}."""
+    values = {}
+    for part in value.split(","):
+        if not part.strip():
+            continue
+        endpoint, _, raw = part.strip().partition("=")
+        values[endpoint] = cast(raw)
+    return values
+
+
+# Верхняя граница одновременных запросов на процесс API, по эндпоинтам; AIMD держит
+# текущий лимит между ADMISSION_MIN_LIMIT и ею
+ADMISSION_LIMITS = parse_endpoint_values(
+    os.getenv("ADMISSION_LIMITS", "predict=64,simple_predict=64,async_predict=256"), int,
+)
+ADMISSION_MIN_LIMIT = int(os.getenv("ADMISSION_MIN_LIMIT", "4"))
+# Запрос дольше этого времени (или с ответом 5xx) — признак перегрузки: лимит уменьшается
+ADMISSION_LATENCY_TARGETS = parse_endpoint_values(
+    os.getenv("ADMISSION_LATENCY_TARGETS", "predict=0.5,simple_predict=0.5,async_predict=0.25"),
+)
+ADMISSION_BACKOFF = float(os.getenv("ADMISSION_BACKOFF", "0.9"))
+# Сигналы перегрузки зависимостей: очередь пула инференса, очередь задач модерации в полосе
+ADMISSION_MAX_INFERENCE_QUEUE = int(os.getenv("ADMISSION_MAX_INFERENCE_QUEUE", "32"))
+ADMISSION_MAX_QUEUE_LAG = int(os.getenv("ADMISSION_MAX_QUEUE_LAG", "10000"))
+ADMISSION_LAG_INTERVAL = float(os.getenv("ADMISSION_LAG_INTERVAL", "5"))
+# Retry-After в ответах 429: после отказа по лимиту и после отказа из-за отставания воркеров
+ADMISSION_RETRY_AFTER = float(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+ADMISSION_LAG_RETRY_AFTER = float(os.getenv("ADMISSION_LAG_RETRY_AFTER", "30"))
+
+
+class AIMDLimit:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    Every finished request is a sample. A slow (over `latency_target`) or failed one
+    multiplies the limit by `backoff`; a fast one adds 1 / limit, i.e. about +1 per
+    limit's worth of requests, but only while the limit is actually in use (at least
+    half of it in flight), so an idle endpoint doesn't drift up to `max_limit`.
+    """
+    def __init__(self, max_limit: int, min_limit: int = 1, latency_target: float = 1.0, backoff: float = 0.9):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.value = float(self.max_limit)
+
+    @property
+    def limit(self) -> int:
+        return int(self.value)
+
+    def on_sample(self, latency: float, in_flight: int, dropped: bool = False) -> None:
+        if dropped or latency > self.latency_target:
+            self.value = max(self.min_limit, self.value * self.backoff)
+        elif in_flight * 2 >= self.limit:
+            self.value = min(self.max_limit, self.value + 1 / self.value)
+
+
+class AdmissionController:
+    """
+    FastAPI dependency that admits a request to `endpoint` or sheds it with 429 and
+    Retry-After.
+
+    A request is shed when the endpoint already has `limit.limit` requests in flight or
+    when one of `checks` reports an overloaded dependency. A check is a callable taking
+    the request and returning None, or the Retry-After in seconds; the name of the check
+    is the `reason` label of admission_shed_total.
+    """
+    def __init__(self, endpoint: str, limit: AIMDLimit, checks: dict = None, retry_after: float = ADMISSION_RETRY_AFTER):
+        self.endpoint = endpoint
+        self.limit = limit
+        self.checks = checks or {}
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self._report()
+
+    def _report(self) -> None:
+        ADMISSION_LIMIT.labels(endpoint=self.endpoint).set(self.limit.limit)
+        ADMISSION_IN_FLIGHT.labels(endpoint=self.endpoint).set(self.in_flight)
+
+    def rejection(self, request: Request):
+        """(reason, retry_after) if the request has to be shed, otherwise None."""
+        if self.in_flight >= self.limit.limit:
+            return "concurrency", self.retry_after
+        for reason, check in self.checks.items():
+            retry_after = check(request)
+            if retry_after is not None:
+                return reason, retry_after
+        return None
+
+    async def __call__(self, request: Request):
+        rejected = self.rejection(request)
+        if rejected is not None:
+            reason, retry_after = rejected
+            ADMISSION_SHED_TOTAL.labels(endpoint=self.endpoint, reason=reason).inc()
+            raise HTTPException(
+                status_code=429,
+                detail=f"Service is overloaded ({reason}), retry later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+        self.in_flight += 1
+        self._report()
+        start = time.perf_counter()
+        dropped = False
+        try:
+            yield
+        except Exception as e:
+            # Ошибка клиента (4xx) о перегрузке не говорит, 5xx и прочие исключения — говорят
+            dropped = not isinstance(e, HTTPException) or e.status_code >= 500
+            raise
+        finally:
+            self.limit.on_sample(time.perf_counter() - start, self.in_flight, dropped)
+            self.in_flight -= 1
+            self._report()
+
+
+def create_admission_controller(endpoint: str, checks: dict = None) -> AdmissionController:
+    limit = AIMDLimit(
+        max_limit=ADMISSION_LIMITS.get(endpoint, 64),
+        min_limit=ADMISSION_MIN_LIMIT,
+        latency_target=ADMISSION_LATENCY_TARGETS.get(endpoint, 1.0),
+        backoff=ADMISSION_BACKOFF,
+    )
+    return AdmissionController(endpoint, limit, checks)
+
+
+def inference_queue_check(executor, max_depth: int = ADMISSION_MAX_INFERENCE_QUEUE) -> Callable:
+    """Overloaded while more than `max_depth` scoring calls wait for the inference pool."""
+    def check(request) -> Optional[float]:
+        return ADMISSION_RETRY_AFTER if executor.queue_depth > max_depth else None
+    return check
+
+
+def db_pool_check(engine, max_overflow: int) -> Callable:
+    """
+    Overloaded while every connection of the pool, overflow included, is checked out:
+    any new query would wait for one. `max_overflow` is the value the engine was created
+    with. Pools without a size (sqlite in tests) never are.
+    """
+    def check(request) -> Optional[float]:
+        pool = engine.pool
+        if not hasattr(pool, "checkedout") or not hasattr(pool, "size"):
+            return None
+        capacity = pool.size() + max(0, max_overflow)
+        return ADMISSION_RETRY_AFTER if pool.checkedout() >= capacity else None
+    return check
+
+
+class QueueLagMonitor:
+    """
+    Pending moderation tasks per lane, re-read every `interval` seconds in the
+    background. Every request creates a pending row whatever the queue backend is,
+    so the count is the backlog of the workers.
+    """
+    def __init__(self, session_maker, interval: float = ADMISSION_LAG_INTERVAL):
+        self.session_maker = session_maker
+        self.interval = interval
+        self.pending = {}
+        self._task = None
+
+    async def refresh(self) -> None:
+        async with self.session_maker() as db:
+            self.pending = await ModerationResultRepository(db).count_pending_by_lane()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Failed to read moderation queue lag: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def check(self, max_pending: int = ADMISSION_MAX_QUEUE_LAG) -> Callable:
+        """Overloaded while the lane of the request (`priority`) has more than `max_pending` tasks."""
+        def check(request) -> Optional[float]:
+            lane = request.query_params.get("priority", INTERACTIVE)
+            return ADMISSION_LAG_RETRY_AFTER if self.pending.get(lane, 0) > max_pending else None
+        return check
@@ -1,31 +1,47 @@
 # app/clients/kafka.py
 import json
-from aiokafka import AIOKafkaProducer
+from typing import Optional
 from datetime import datetime, timezone
 
+from app.clients.lanes import INTERACTIVE, lane_topic
+from app.instrumentation import timed, KAFKA_PUBLISH
+
 class KafkaProducer:
+    backend = "kafka"
+
     def __init__(self, bootstrap_servers: str):
         self._bootstrap = bootstrap_servers
         self._producer = None
 
     async def start(self) -> None:
+        # aiokafka импортируется при старте, а не при импорте модуля с роутами
+        from aiokafka import AIOKafkaProducer
         self._producer = AIOKafkaProducer(bootstrap_servers=self._bootstrap)
         await self._producer.start()
 
+    @property
+    def is_started(self) -> bool:
+        return self._producer is not None
+
     async def stop(self) -> None:
         if self._producer:
             await self._producer.stop()
             self._producer = None
 
-    async def send_json(self, topic: str, payload: dict) -> None:
+    @timed(KAFKA_PUBLISH)
+    async def send_json(self, topic: str, payload: dict, key: Optional[str] = None) -> None:
         if self._producer is None:
             raise RuntimeError("Kafka producer is not started. Call await start() on startup.")
         data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
-        await self._producer.send_and_wait(topic, data)
+        key_bytes = key.encode("utf-8") if key is not None else None
+        await self._producer.send_and_wait(topic, data, key=key_bytes)
 
-    async def send_moderation_request(self, item_id: int) -> None:
+    async def send_moderation_request(self, item_id: int, lane: str = INTERACTIVE) -> None:
         payload = {
             "item_id": item_id,
+            "lane": lane,
             "timestamp": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
         }
-        await self.send_json("moderation", payload)
+        # Ключ по item_id: все сообщения одного объявления попадают в одну партицию
+        # и обрабатываются одним воркером группы строго по порядку.
+        await self.send_json(lane_topic("moderation", lane), payload, key=str(item_id))
@@ -0,0 +1,35 @@
+# Полосы приоритета задач модерации: у каждой свой топик Kafka (или значение колонки
+# moderation_results.lane в очереди Postgres), воркер делит пачки между ними по весам
+INTERACTIVE = "interactive"
+BULK = "bulk"
+RETRY = "retry"
+LANES = (INTERACTIVE, BULK, RETRY)
+# Доли сообщений, которые воркер берёт из полос, когда все они заняты:
+# 8 interactive на 3 retry и 1 bulk
+DEFAULT_LANE_WEIGHTS = "interactive=8,retry=3,bulk=1"
+
+
+def lane_topic(topic: str, lane: str) -> str:
+    """Kafka topic of the lane: interactive keeps the original topic, the others get a suffix."""
+    if lane == INTERACTIVE:
+        return topic
+    return f"{topic}-{lane}"
+
+
+def parse_lane_weights(value: str) -> dict:
+    """
+    Parses "interactive=8,retry=3,bulk=1" into {lane: weight}. Every lane must be listed
+    with a positive integer weight.
+    """
+    weights = {}
+    for part in value.split(","):
+        lane, _, weight = part.strip().partition("=")
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane '{lane}' in '{value}'. Expected one of: {', '.join(LANES)}")
+        if not weight.strip().isdigit() or int(weight) <= 0:
+            raise ValueError(f"Weight of lane '{lane}' must be a positive integer, got '{weight}'")
+        weights[lane] = int(weight)
+    missing = [lane for lane in LANES if lane not in weights]
+    if missing:
+        raise ValueError(f"No weight for lanes: {', '.join(missing)}")
+    return weights
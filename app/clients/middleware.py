@@ -1,7 +1,7 @@
 import time
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.instrumentation import start_trace, finish_trace
 
 REQUEST_COUNT = Counter(
     "http_requests_total", "Total HTTP requests", ["method", "endpoint", "status"]
@@ -9,15 +9,50 @@ REQUEST_COUNT = Counter(
 REQUEST_DURATION = Histogram(
     "http_request_duration_seconds", "HTTP request duration in seconds", ["method", "endpoint"]
 )
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being processed", multiprocess_mode="livesum"
+)
+
+# Метка для путей, не совпавших ни с одним маршрутом: сырой путь раздул бы число серий
+UNMATCHED_ENDPOINT = "unmatched"
+
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware recording request count, latency and in-flight requests.
+
+    Unlike BaseHTTPMiddleware it doesn't wrap the response body or spawn a task per
+    request, so streaming responses pass through untouched. The endpoint label is the
+    route template the router stored in the scope (e.g. /moderation_result/{task_id}).
+    A sampled share of requests also gets a per-stage breakdown (see app.instrumentation).
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
-class PrometheusMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        method = request.method
-        start_time = time.time()
-        response = await call_next(request)
-        duration = time.time() - start_time
-        route = request.scope.get("route")
-        endpoint = route.path if route and hasattr(route, "path") else request.url.path
-        REQUEST_COUNT.labels(method=method, endpoint=endpoint, status=response.status_code).inc()
-        REQUEST_DURATION.labels(method=method, endpoint=endpoint).observe(duration)
-        return response
\ No newline at end of file
+        REQUESTS_IN_FLIGHT.inc()
+        trace, token = start_trace("http")
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or UNMATCHED_ENDPOINT
+            method = scope["method"]
+            REQUEST_COUNT.labels(method=method, endpoint=endpoint, status=status_code).inc()
+            REQUEST_DURATION.labels(method=method, endpoint=endpoint).observe(duration)
+            finish_trace(trace, token, operation=f"{method} {endpoint}")
@@ -0,0 +1,50 @@
+# app/clients/queue.py
+from sqlalchemy import text
+
+from app.clients.kafka import KafkaProducer
+from app.clients.lanes import INTERACTIVE
+from app.instrumentation import timed, KAFKA_PUBLISH
+
+# Канал LISTEN/NOTIFY, которым API будит воркеры очереди в Postgres
+MODERATION_QUEUE_CHANNEL = "moderation_tasks"
+
+NOTIFY_QUERY = text("SELECT pg_notify(:channel, :payload)")
+
+
+class PostgresQueueProducer:
+    """
+    Producer of the Postgres queue (QUEUE_BACKEND=postgres).
+
+    The pending row in moderation_results created by /async_predict is the job itself
+    (its lane included), so sending a request only wakes the workers up with NOTIFY.
+    """
+    backend = "postgres"
+
+    def __init__(self, session_maker, channel: str = MODERATION_QUEUE_CHANNEL):
+        self.session_maker = session_maker
+        self.channel = channel
+        self._started = False
+
+    async def start(self) -> None:
+        self._started = True
+
+    @property
+    def is_started(self) -> bool:
+        return self._started
+
+    async def stop(self) -> None:
+        self._started = False
+
+    @timed(KAFKA_PUBLISH)
+    async def send_moderation_request(self, item_id: int, lane: str = INTERACTIVE) -> None:
+        async with self.session_maker() as db:
+            await db.execute(NOTIFY_QUERY, {"channel": self.channel, "payload": str(item_id)})
+            await db.commit()
+
+
+def create_queue_producer(backend: str, bootstrap_servers: str, session_maker):
+    if backend == KafkaProducer.backend:
+        return KafkaProducer(bootstrap_servers)
+    if backend == PostgresQueueProducer.backend:
+        return PostgresQueueProducer(session_maker)
+    raise ValueError(f"Unknown queue backend '{backend}'. Expected one of: kafka, postgres")
@@ -3,6 +3,10 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Очередь задач модерации: kafka или postgres (pending-строки moderation_results + LISTEN/NOTIFY)
+QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "kafka")
 KAFKA_BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "redpanda:29092")
 TOPIC = os.getenv("TOPIC", "moderation")
 API_PORT = int(os.getenv("API_PORT", "8000"))
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
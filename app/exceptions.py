@@ -20,3 +20,11 @@ class AccountBlockedError(Exception):
 
 class InvalidTokenError(Exception):
     """Raised when a JWT token is invalid or expired."""
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profiling session is already running in this process."""
+
+
+class PasswordHashingBusyError(Exception):
+    """Raised when too many password hashes are already waiting for the hashing pool."""
@@ -0,0 +1,44 @@
+import asyncio
+import inspect
+import os
+
+from sqlalchemy import text
+
+# Время на одну проверку зависимости в /health/ready
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "1"))
+
+PING_QUERY = text("SELECT 1")
+
+
+async def ping_database(session_maker):
+    async with session_maker() as db:
+        await db.execute(PING_QUERY)
+    return True
+
+
+async def _run_check(check, timeout: float):
+    try:
+        result = check()
+        if inspect.isawaitable(result):
+            result = await asyncio.wait_for(result, timeout)
+    except asyncio.TimeoutError:
+        return f"timed out after {timeout}s"
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+    return None if result else "not ready"
+
+
+async def run_checks(checks: dict, timeout: float = None) -> dict:
+    """
+    Runs readiness checks concurrently.
+
+    Args:
+        checks (dict): name -> callable returning a bool or an awaitable of a bool
+
+    Returns:
+        dict: name -> None if the check passed, otherwise the reason it failed
+    """
+    timeout = HEALTH_CHECK_TIMEOUT if timeout is None else timeout
+    names = list(checks)
+    results = await asyncio.gather(*(_run_check(checks[name], timeout) for name in names))
+    return dict(zip(names, results))
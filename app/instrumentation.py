@@ -0,0 +1,181 @@
+import functools
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from app.metrics import DB_QUERY_DURATION, STAGE_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Доля запросов и сообщений, для которых собирается разбивка по стадиям; 0 — выключено
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+# Порог в секундах, выше которого разбивка пишется в лог; 0 — не логировать
+SLOW_REQUEST_THRESHOLD = float(os.getenv("SLOW_REQUEST_THRESHOLD", "0"))
+
+AUTH = "auth"
+CACHE_LOOKUP = "cache_lookup"
+DATABASE = "database"
+FEATURES = "features"
+INFERENCE = "inference"
+CACHE_WRITE = "cache_write"
+KAFKA_PUBLISH = "kafka_publish"
+
+_current_trace = ContextVar("trace", default=None)
+
+
+class Trace:
+    """Stage timings of one sampled request or worker message."""
+    __slots__ = ("operation", "start", "stages", "active")
+
+    def __init__(self, operation: str):
+        self.operation = operation
+        self.start = time.perf_counter()
+        self.stages = {}
+        # Имя стадии, которая сейчас измеряется: вложенные стадии относятся к внешней
+        self.active = None
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+
+class _StageTimer:
+    __slots__ = ("trace", "stage", "start")
+
+    def __init__(self, trace: Trace, stage: str):
+        self.trace = trace
+        self.stage = stage
+
+    def __enter__(self):
+        self.trace.active = self.stage
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.trace.add(self.stage, time.perf_counter() - self.start)
+        self.trace.active = None
+        return False
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def stage(name: str):
+    """
+    Context manager timing one stage of the current trace.
+
+    Without a sampled trace (or inside another stage) it is a shared no-op object,
+    so unsampled requests pay for one ContextVar lookup.
+    """
+    trace = _current_trace.get()
+    if trace is None or trace.active is not None:
+        return _NOOP_STAGE
+    return _StageTimer(trace, name)
+
+
+def timed(name: str):
+    """Decorator form of `stage` for coroutine functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None or trace.active is not None:
+                return await func(*args, **kwargs)
+            with _StageTimer(trace, name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def db_query(query_type: str):
+    """
+    Times a repository coroutine: always into db_query_duration_seconds{query_type},
+    and into the `database` stage of the current trace when it is sampled.
+    """
+    def decorator(func):
+        histogram = DB_QUERY_DURATION.labels(query_type=query_type)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            timer = None
+            if trace is not None and trace.active is None:
+                timer = _StageTimer(trace, DATABASE).__enter__()
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+                if timer is not None:
+                    timer.__exit__()
+        return wrapper
+    return decorator
+
+
+def start_trace(operation: str, sample_rate: float = None):
+    """
+    Starts a trace for the current request/message if it is sampled.
+
+    Returns:
+        tuple: the Trace (or None when not sampled) and the ContextVar token for finish_trace
+    """
+    rate = TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return None, None
+    trace = Trace(operation)
+    return trace, _current_trace.set(trace)
+
+
+def finish_trace(trace, token, operation: str = None):
+    """Publishes stage timings of a sampled trace and logs slow ones."""
+    if trace is None:
+        return
+    _current_trace.reset(token)
+    operation = operation or trace.operation
+    total = time.perf_counter() - trace.start
+    for name, seconds in trace.stages.items():
+        STAGE_DURATION.labels(operation=operation, stage=name).observe(seconds)
+    if SLOW_REQUEST_THRESHOLD and total >= SLOW_REQUEST_THRESHOLD:
+        breakdown = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in trace.stages.items())
+        other = total - sum(trace.stages.values())
+        logger.warning(f"Slow {operation}: total={total * 1000:.1f}ms ({breakdown}, other={other * 1000:.1f}ms)")
+
+
+@contextmanager
+def traced(operation: str, sample_rate: float = None):
+    """`with traced("moderation_message"):` — start_trace/finish_trace around a block."""
+    trace, token = start_trace(operation, sample_rate)
+    try:
+        yield trace
+    finally:
+        finish_trace(trace, token)
+
+
+def traced_coroutine(operation: str, sample_rate: float = None):
+    """Decorator form of `traced` for coroutine functions (e.g. a worker message handler)."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            trace, token = start_trace(operation, sample_rate)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                finish_trace(trace, token)
+        return wrapper
+    return decorator
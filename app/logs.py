@@ -0,0 +1,83 @@
+import atexit
+import logging
+import os
+import queue
+import random
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+# Доля запросов, для которых пишутся request/response записи; 0 — не писать
+REQUEST_LOG_SAMPLE_RATE = float(os.getenv("REQUEST_LOG_SAMPLE_RATE", "0.01"))
+
+_listener = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler renders the message in the calling thread; here the record is
+    queued as is, so building the string (and e.g. Pydantic __str__) happens off the
+    event loop. Only safe for an in-process queue.
+    """
+    def prepare(self, record):
+        return record
+
+
+class Fields:
+    """key=value rendering of structured log fields, done only when a handler formats it."""
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: dict):
+        self.fields = fields
+
+    def __str__(self):
+        return " ".join(f"{key}={value}" for key, value in self.fields.items())
+
+
+def configure_logging(level=None):
+    """
+    Routes the root logger through a queue: the caller only enqueues records, a
+    listener thread formats them and writes to stderr. Safe to call again in a forked
+    child, where the parent's listener thread doesn't exist.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    root.setLevel(level or LOG_LEVEL)
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def log_event(logger, event: str, sample_rate: float = None, level=logging.INFO, **fields):
+    """
+    Sampled structured log record: `log_event(logger, "predict.request", request=request)`.
+
+    Nothing is formatted in the caller: the level and sampling checks come first and the
+    fields are rendered by the handler only if the record is actually written.
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = REQUEST_LOG_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate <= 0 or (rate < 1 and random.random() >= rate):
+        return
+    logger.log(level, "%s %s", event, Fields(fields))
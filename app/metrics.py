@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram
+from prometheus_client import Counter, Gauge, Histogram
 
 PREDICTIONS_TOTAL = Counter(
     "predictions_total",
@@ -30,3 +30,95 @@ MODEL_PREDICTION_PROBABILITY = Histogram(
     "Distribution of violation probabilities predicted by the ML model",
     buckets=[0.0, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0]
 )
+
+INFERENCE_QUEUE_DEPTH = Gauge(
+    "inference_queue_depth",
+    "Number of inference calls waiting for a free executor slot",
+    ["backend"],
+    multiprocess_mode="livesum",
+)
+
+INFERENCE_UTILIZATION = Gauge(
+    "inference_utilization_ratio",
+    "Share of busy inference executor slots",
+    ["backend"],
+    multiprocess_mode="liveall",
+)
+
+STAGE_DURATION = Histogram(
+    "stage_duration_seconds",
+    "Time spent in each stage of a sampled request or worker message",
+    ["operation", "stage"],
+    buckets=[0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0]
+)
+
+STARTUP_PHASE_DURATION = Gauge(
+    "startup_phase_duration_seconds",
+    "Duration of each startup phase of the process",
+    ["phase"],
+    multiprocess_mode="max",
+)
+
+CACHE_WARMUP_ITEMS = Counter(
+    "cache_warmup_items_total",
+    "Items processed by the cache warm-up: cached from stored results, scored by the model or skipped",
+    ["result"],
+)
+
+CACHE_WARMUP_PROGRESS = Gauge(
+    "cache_warmup_progress_ratio",
+    "Share of candidate items processed by the running or last cache warm-up",
+    multiprocess_mode="max",
+)
+
+CACHE_WARMUP_DURATION = Gauge(
+    "cache_warmup_duration_seconds",
+    "Duration of the last finished cache warm-up",
+    multiprocess_mode="max",
+)
+
+LANE_LAG = Gauge(
+    "moderation_lane_lag",
+    "Moderation tasks waiting in a priority lane: per Kafka partition, or 'all' for the Postgres queue",
+    ["lane", "partition"],
+    multiprocess_mode="livemax",
+)
+
+LANE_LATENCY = Histogram(
+    "moderation_lane_latency_seconds",
+    "Time from enqueueing a moderation task to the end of its batch, per priority lane",
+    ["lane"],
+    buckets=[0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 900.0, 3600.0]
+)
+
+ADMISSION_LIMIT = Gauge(
+    "admission_concurrency_limit",
+    "Current adaptive concurrency limit of an endpoint",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "admission_in_flight",
+    "Requests admitted to an endpoint and still being processed",
+    ["endpoint"],
+    multiprocess_mode="livesum",
+)
+
+ADMISSION_SHED_TOTAL = Counter(
+    "admission_shed_total",
+    "Requests rejected with 429 by admission control",
+    ["endpoint", "reason"],
+)
+
+RATE_LIMITED_TOTAL = Counter(
+    "rate_limited_total",
+    "Requests rejected with 429 by the per-account rate limit",
+    ["endpoint", "tier"],
+)
+
+RATE_LIMIT_CHECKS_TOTAL = Counter(
+    "rate_limit_checks_total",
+    "Rate limit checks by where they were decided: local (no Redis call), redis or bypass (Redis unavailable)",
+    ["endpoint", "source"],
+)
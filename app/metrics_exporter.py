@@ -0,0 +1,88 @@
+import os
+import re
+import shutil
+
+from prometheus_client import (
+    CollectorRegistry,
+    REGISTRY,
+    CONTENT_TYPE_LATEST,
+    generate_latest,
+    start_http_server,
+)
+from prometheus_client.multiprocess import MultiProcessCollector, mark_process_dead
+
+# Файлы значений prometheus_client: counter_123.db, gauge_livesum_123.db и т.п.
+METRIC_FILE_PID = re.compile(r"_(\d+)\.db$")
+
+
+def multiproc_dir():
+    return os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+
+
+def prepare_multiproc_dir(path=None):
+    """
+    Empties the multiprocess metrics directory. Must run in the parent process before
+    any worker starts: files left from a previous run would be summed into new values.
+    """
+    path = path or multiproc_dir()
+    if not path:
+        return
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def cleanup_dead_processes(path) -> set:
+    """
+    Drops live gauges of worker processes that have exited.
+
+    Counters and histograms of dead processes stay on disk on purpose: removing them
+    would make the aggregated counters go backwards.
+    """
+    dead = set()
+    for name in os.listdir(path):
+        match = METRIC_FILE_PID.search(name)
+        if match is None:
+            continue
+        pid = int(match.group(1))
+        if pid not in dead and not _is_alive(pid):
+            dead.add(pid)
+    for pid in dead:
+        mark_process_dead(pid, path)
+    return dead
+
+
+class LiveMultiProcessCollector(MultiProcessCollector):
+    """MultiProcessCollector that forgets live gauges of dead workers on every scrape."""
+    def collect(self):
+        cleanup_dead_processes(self._path)
+        return super().collect()
+
+
+def build_registry(path=None):
+    """Registry to expose: values of all processes in multiprocess mode, the default one otherwise."""
+    path = path or multiproc_dir()
+    if not path:
+        return REGISTRY
+    registry = CollectorRegistry()
+    LiveMultiProcessCollector(registry, path=path)
+    return registry
+
+
+def collect_latest(registry=None) -> bytes:
+    return generate_latest(registry or build_registry())
+
+
+def start_metrics_server(port: int, addr: str = "0.0.0.0"):
+    """Serves aggregated metrics on a separate port, independent of the API/worker event loops."""
+    return start_http_server(port, addr=addr, registry=build_registry())
+
@@ -0,0 +1,257 @@
+import asyncio
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from app.exceptions import ProfilerBusyError
+
+logger = logging.getLogger(__name__)
+
+WALL = "wall"
+CPU = "cpu"
+MODES = (WALL, CPU)
+COLLAPSED = "collapsed"
+SPEEDSCOPE = "speedscope"
+
+DEFAULT_INTERVAL = 0.005
+PROFILE_MAX_SECONDS = 120
+
+# Один сеанс профилирования на процесс: два сэмплера исказили бы друг другу результат
+_session_lock = threading.Lock()
+
+
+def frame_key(frame):
+    code = frame.f_code
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+def walk_stack(frame) -> tuple:
+    """Stack of the frame from the outermost call to the frame itself."""
+    stack = []
+    while frame is not None:
+        stack.append(frame_key(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+def frame_name(key) -> str:
+    name, filename, line = key
+    if not filename:
+        return name
+    return f"{name} ({os.path.basename(filename)}:{line})"
+
+
+class Profile:
+    """Aggregated samples: how many times each distinct stack was seen."""
+    def __init__(self, mode: str, interval: float):
+        self.mode = mode
+        self.interval = interval
+        self.stacks = Counter()
+        self.duration = 0.0
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def add(self, stack: tuple):
+        self.stacks[stack] += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format: `outer;inner;leaf count` per line (flamegraph.pl, speedscope)."""
+        lines = [
+            f"{';'.join(frame_name(key) for key in stack)} {count}"
+            for stack, count in self.stacks.most_common()
+        ]
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self, name: str = "profile") -> dict:
+        """Speedscope "sampled" profile; identical stacks are merged into one weighted sample."""
+        frames, index = [], {}
+        samples, weights = [], []
+        for stack, count in self.stacks.most_common():
+            sample = []
+            for key in stack:
+                if key not in index:
+                    index[key] = len(frames)
+                    frames.append({"name": key[0], "file": key[1], "line": key[2]})
+                sample.append(index[key])
+            samples.append(sample)
+            weights.append(count * self.interval)
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "moderation-service",
+            "shared": {"frames": frames},
+            "profiles": [{
+                "type": "sampled",
+                "name": f"{name} ({self.mode})",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": sum(weights),
+                "samples": samples,
+                "weights": weights,
+            }],
+        }
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler with two modes.
+
+    wall: a background thread snapshots the stacks of all other threads every
+    `interval` seconds, waiting included (sleeping in epoll, blocked on a lock).
+    cpu: SIGPROF fires every `interval` seconds of process CPU time and the handler
+    records the main thread's stack, i.e. the event loop. Signals can only be set up
+    from the main thread.
+    """
+    def __init__(self, mode: str = WALL, interval: float = DEFAULT_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        if interval <= 0:
+            raise ValueError("Sampling interval must be positive")
+        self.mode = mode
+        self.interval = interval
+        self.profile = Profile(mode, interval)
+        self._stop = threading.Event()
+        self._thread = None
+        self._previous_handler = None
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        if self.mode == WALL:
+            self._thread = threading.Thread(target=self._sample_threads, name="wall-profiler", daemon=True)
+            self._thread.start()
+        else:
+            if threading.current_thread() is not threading.main_thread():
+                raise ValueError("CPU profiling must be started from the main thread")
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_sigprof)
+            signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+        return self
+
+    def stop(self) -> Profile:
+        if self.mode == WALL:
+            self._stop.set()
+            self._thread.join()
+        else:
+            signal.setitimer(signal.ITIMER_PROF, 0, 0)
+            signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+        self.profile.duration = time.perf_counter() - self._started
+        return self.profile
+
+    def _sample_threads(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                thread = (f"thread:{names.get(ident, ident)}", "", 0)
+                self.profile.add((thread,) + walk_stack(frame))
+
+    def _on_sigprof(self, signum, frame):
+        if frame is not None:
+            self.profile.add(walk_stack(frame))
+
+
+async def profile_for(seconds: float, mode: str = WALL, interval: float = DEFAULT_INTERVAL) -> Profile:
+    """Samples the running process for `seconds` without blocking the event loop."""
+    if not _session_lock.acquire(blocking=False):
+        raise ProfilerBusyError("Profiling session is already running")
+    try:
+        profiler = SamplingProfiler(mode, interval).start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile = profiler.stop()
+        return profile
+    finally:
+        _session_lock.release()
+
+
+def _without_tracemalloc(snapshot):
+    return snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+
+
+async def tracemalloc_report(seconds: float, top: int = 25, frames: int = 1) -> str:
+    """
+    Top allocation sites now and their growth over `seconds`.
+
+    Tracing is started for the duration of the call unless it is already on (e.g.
+    PYTHONTRACEMALLOC), so allocations made before the call are only visible then.
+    """
+    if not _session_lock.acquire(blocking=False):
+        raise ProfilerBusyError("Profiling session is already running")
+    started_here = not tracemalloc.is_tracing()
+    try:
+        if started_here:
+            tracemalloc.start(frames)
+        first = _without_tracemalloc(tracemalloc.take_snapshot())
+        await asyncio.sleep(seconds)
+        second = _without_tracemalloc(tracemalloc.take_snapshot())
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started_here:
+            tracemalloc.stop()
+        _session_lock.release()
+
+    lines = [f"# traced: current={current / 1024:.1f} KiB peak={peak / 1024:.1f} KiB, window={seconds}s"]
+    lines.append(f"# top {top} allocation sites")
+    lines.extend(str(stat) for stat in second.statistics("lineno")[:top])
+    lines.append(f"# top {top} growth over the window")
+    lines.extend(str(stat) for stat in second.compare_to(first, "lineno")[:top])
+    return "\n".join(lines) + "\n"
+
+
+def install_signal_handlers(loop, directory: str, seconds: float, mode: str = WALL, prefix: str = "worker"):
+    """
+    SIGUSR1 profiles the process for `seconds`, SIGUSR2 captures a tracemalloc report;
+    results are written to `directory`:
+
+        kill -USR1 <pid>  ->  <directory>/<prefix>-<pid>-<time>.collapsed
+        kill -USR2 <pid>  ->  <directory>/<prefix>-<pid>-<time>.tracemalloc.txt
+    """
+    tasks = set()
+
+    def output_path(suffix):
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, f"{prefix}-{os.getpid()}-{int(time.time())}.{suffix}")
+
+    async def write_profile():
+        profile = await profile_for(seconds, mode)
+        path = output_path(COLLAPSED)
+        with open(path, "w") as f:
+            f.write(profile.collapsed())
+        logger.warning(f"Profile written: {path} ({profile.samples} samples, {mode})")
+
+    async def write_tracemalloc():
+        report = await tracemalloc_report(seconds)
+        path = output_path("tracemalloc.txt")
+        with open(path, "w") as f:
+            f.write(report)
+        logger.warning(f"tracemalloc report written: {path}")
+
+    def spawn(factory):
+        def handler():
+            task = loop.create_task(factory())
+            tasks.add(task)
+            task.add_done_callback(done)
+        return handler
+
+    def done(task):
+        tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Profiling failed: {task.exception()}")
+
+    loop.add_signal_handler(signal.SIGUSR1, spawn(write_profile))
+    loop.add_signal_handler(signal.SIGUSR2, spawn(write_tracemalloc))
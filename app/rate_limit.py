@@ -0,0 +1,172 @@
+import logging
+import math
+import os
+import time
+from typing import NamedTuple, Optional
+
+from fastapi import Depends, HTTPException
+
+from app.admission import parse_endpoint_values
+from app.metrics import RATE_LIMITED_TOTAL, RATE_LIMIT_CHECKS_TOTAL
+from repository.account.rate_limit_repository import RateLimitRepository
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucketLimit(NamedTuple):
+    rate: float
+    burst: int
+
+    @classmethod
+    def parse(cls, value: str) -> "TokenBucketLimit":
+        """Parses "<tokens per second>/<burst>", e.g. "5/20"."""
+        rate, _, burst = value.partition("/")
+        limit = cls(float(rate), int(burst or math.ceil(float(rate))))
+        if limit.rate <= 0 or limit.burst < 1:
+            raise ValueError(f"Rate limit must be positive: {value!r}")
+        return limit
+
+
+def parse_rate_limit_tiers(value: str) -> dict:
+    """
+    Parses "free:simple_predict=5/20,async_predict=2/10;pro:simple_predict=50/100"
+    into {tier: {endpoint: TokenBucketLimit}}. An endpoint missing from a tier is not limited.
+    """
+    tiers = {}
+    for part in value.split(";"):
+        if not part.strip():
+            continue
+        tier, _, limits = part.strip().partition(":")
+        tiers[tier.strip()] = parse_endpoint_values(limits, TokenBucketLimit.parse)
+    return tiers
+
+
+# Лимиты частоты запросов по тарифам аккаунтов: токенов в секунду и размер корзины
+RATE_LIMIT_TIERS = parse_rate_limit_tiers(os.getenv(
+    "RATE_LIMIT_TIERS",
+    "free:simple_predict=5/20,async_predict=2/10;pro:simple_predict=50/100,async_predict=20/50",
+))
+# Тариф, лимиты которого применяются к аккаунтам с неизвестным тарифом
+RATE_LIMIT_DEFAULT_TIER = os.getenv("RATE_LIMIT_DEFAULT_TIER", "free")
+# Процесс берёт токены из Redis пачкой (не больше четверти корзины) и тратит их без
+# обращений к Redis; неистраченные сгорают через RATE_LIMIT_LEASE_SECONDS
+RATE_LIMIT_LEASE_TOKENS = int(os.getenv("RATE_LIMIT_LEASE_TOKENS", "10"))
+RATE_LIMIT_LEASE_SECONDS = float(os.getenv("RATE_LIMIT_LEASE_SECONDS", "1"))
+# Сколько секунд после ошибки Redis запросы пропускаются без проверки
+RATE_LIMIT_ERROR_BACKOFF = float(os.getenv("RATE_LIMIT_ERROR_BACKOFF", "5"))
+RATE_LIMIT_LOCAL_MAX_SIZE = int(os.getenv("RATE_LIMIT_LOCAL_MAX_SIZE", "100000"))
+
+
+class LocalLease:
+    __slots__ = ("tokens", "expires_at", "blocked_until")
+
+    def __init__(self, tokens: int = 0, expires_at: float = 0.0, blocked_until: float = 0.0):
+        self.tokens = tokens
+        self.expires_at = expires_at
+        self.blocked_until = blocked_until
+
+
+class RateLimiter:
+    """
+    Per-account, per-endpoint token buckets enforced in Redis, with an in-process
+    pre-filter in front of them.
+
+    The process takes tokens from the shared bucket a lease at a time and spends them
+    locally, so only one request in `lease_size` goes to Redis. After Redis refuses,
+    the account is rejected locally until the bucket has refilled a token. Leases only
+    ever hold tokens already taken from the bucket, so all processes together never
+    admit more than the limit; unspent tokens expire after `lease_seconds`.
+
+    If Redis is unavailable, requests are let through for `error_backoff` seconds:
+    the limit protects the service, it must not take it down.
+    """
+    def __init__(
+        self,
+        tiers: dict = None,
+        default_tier: str = RATE_LIMIT_DEFAULT_TIER,
+        repository: RateLimitRepository = None,
+        lease_tokens: int = RATE_LIMIT_LEASE_TOKENS,
+        lease_seconds: float = RATE_LIMIT_LEASE_SECONDS,
+        error_backoff: float = RATE_LIMIT_ERROR_BACKOFF,
+        max_size: int = RATE_LIMIT_LOCAL_MAX_SIZE,
+    ):
+        self.tiers = RATE_LIMIT_TIERS if tiers is None else tiers
+        self.default_tier = default_tier
+        self.repository = repository or RateLimitRepository()
+        self.lease_tokens = max(1, lease_tokens)
+        self.lease_seconds = lease_seconds
+        self.error_backoff = error_backoff
+        self.max_size = max_size
+        self._leases = {}
+        self._bypass_until = 0.0
+
+    def tier_of(self, account) -> str:
+        tier = getattr(account, "tier", None)
+        return tier if tier in self.tiers else self.default_tier
+
+    def lease_size(self, limit: TokenBucketLimit) -> int:
+        return max(1, min(self.lease_tokens, limit.burst // 4))
+
+    def _lease(self, key) -> LocalLease:
+        lease = self._leases.get(key)
+        if lease is None:
+            if len(self._leases) >= self.max_size:
+                # Словарь хранит порядок вставки: вытесняем самую старую запись
+                self._leases.pop(next(iter(self._leases)))
+            lease = self._leases[key] = LocalLease()
+        return lease
+
+    async def acquire(self, account_id, tier: str, endpoint: str) -> Optional[float]:
+        """Takes a token; returns None if the request is allowed, otherwise the Retry-After in seconds."""
+        limit = self.tiers.get(tier, {}).get(endpoint)
+        if limit is None:
+            return None
+        now = time.monotonic()
+        lease = self._lease((account_id, endpoint))
+        if lease.blocked_until > now:
+            RATE_LIMIT_CHECKS_TOTAL.labels(endpoint=endpoint, source="local").inc()
+            return lease.blocked_until - now
+        if lease.tokens > 0 and lease.expires_at > now:
+            lease.tokens -= 1
+            RATE_LIMIT_CHECKS_TOTAL.labels(endpoint=endpoint, source="local").inc()
+            return None
+        if self._bypass_until > now:
+            RATE_LIMIT_CHECKS_TOTAL.labels(endpoint=endpoint, source="bypass").inc()
+            return None
+
+        try:
+            granted, retry_after = await self.repository.take(
+                account_id, endpoint, limit.rate, limit.burst, self.lease_size(limit),
+            )
+        except Exception as e:
+            logger.warning(f"Rate limit check failed, letting requests through for {self.error_backoff}s: {e}")
+            self._bypass_until = now + self.error_backoff
+            RATE_LIMIT_CHECKS_TOTAL.labels(endpoint=endpoint, source="bypass").inc()
+            return None
+
+        RATE_LIMIT_CHECKS_TOTAL.labels(endpoint=endpoint, source="redis").inc()
+        now = time.monotonic()
+        if granted == 0:
+            lease.tokens = 0
+            lease.blocked_until = now + retry_after
+            return retry_after
+        # Один токен — текущему запросу, остальные — следующим запросам этого процесса
+        lease.tokens = granted - 1
+        lease.expires_at = now + self.lease_seconds
+        return None
+
+    def dependency(self, endpoint: str, get_account):
+        """FastAPI dependency for `endpoint`: resolves the account and rejects with 429 over its limit."""
+        async def check_rate_limit(account=Depends(get_account)):
+            tier = self.tier_of(account)
+            retry_after = await self.acquire(account.id, tier, endpoint)
+            if retry_after is not None:
+                RATE_LIMITED_TOTAL.labels(endpoint=endpoint, tier=tier).inc()
+                raise HTTPException(
+                    status_code=429,
+                    detail="Rate limit exceeded, retry later",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+            return account
+
+        return check_rate_limit
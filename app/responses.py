@@ -0,0 +1,24 @@
+from fastapi.responses import JSONResponse
+
+# Тело ответа /moderation_result рендерит и кэш Redis, поэтому оно живёт рядом с записями
+from repository.records import compact_json, moderation_result_body, render_moderation_result
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse for plain data (dicts, lists, str, int, float, bool, None) built by
+    the endpoint itself. Returning it from an endpoint skips the response model
+    validation and `jsonable_encoder`; with orjson installed it also encodes faster.
+    """
+    def render(self, content) -> bytes:
+        return compact_json(content)
+
+
+class RenderedJSONResponse(JSONResponse):
+    """A response body rendered ahead of time (e.g. kept in the cache), sent as is."""
+    def render(self, content) -> bytes:
+        return content.encode() if isinstance(content, str) else content
+
+
+def prediction_body(result) -> dict:
+    return {"is_violation": result.is_violation, "probability": result.probability}
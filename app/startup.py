@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+
+from app.metrics import STARTUP_PHASE_DURATION
+
+logger = logging.getLogger(__name__)
+
+
+class StartupState:
+    """
+    Startup progress of one process: duration of every phase and the readiness flag.
+
+    Liveness only says the process is up; readiness is set once all startup phases
+    have finished, and dropped again on shutdown.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.completed = set()
+        self.failed = {}
+        self.ready = False
+        self.ready_after = None
+        self.background = {}
+
+    @asynccontextmanager
+    async def phase(self, name: str):
+        """`async with state.phase("kafka"):` — times one startup phase."""
+        start = time.perf_counter()
+        try:
+            yield
+            self.completed.add(name)
+        except Exception as e:
+            self.failed[name] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duration = time.perf_counter() - start
+            self.phases[name] = duration
+            STARTUP_PHASE_DURATION.labels(phase=name).set(duration)
+
+    async def run_concurrently(self, *steps):
+        """
+        Runs independent startup coroutines at once. If one fails, the rest are cancelled
+        and the first error is re-raised, as a sequential startup would do.
+        """
+        try:
+            async with asyncio.TaskGroup() as group:
+                for step in steps:
+                    group.create_task(step)
+        except* Exception as errors:
+            raise errors.exceptions[0]
+
+    def run_in_background(self, name: str, step):
+        """
+        Starts a startup coroutine that must not hold the server back (model load,
+        warm-ups): the socket is bound and liveness answers while it runs, readiness waits.
+        """
+        task = asyncio.create_task(step, name=f"startup-{name}")
+        self.background[name] = task
+        return task
+
+    @property
+    def running(self) -> list:
+        return [name for name, task in self.background.items() if not task.done()]
+
+    async def stop_background(self):
+        for task in self.background.values():
+            task.cancel()
+        await asyncio.gather(*self.background.values(), return_exceptions=True)
+
+    def mark_ready(self):
+        self.ready = True
+        self.ready_after = time.perf_counter() - self.started
+        logger.info(f"Startup finished in {self.ready_after:.2f}s: {self.summary()}")
+
+    def mark_stopping(self):
+        self.ready = False
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={seconds:.2f}s" for name, seconds in self.phases.items())
+
+    def to_dict(self) -> dict:
+        return {
+            "ready": self.ready,
+            "running": self.running,
+            "phases": {name: round(seconds, 4) for name, seconds in self.phases.items()},
+            "failed": dict(self.failed),
+        }
@@ -0,0 +1,103 @@
+import os
+import random
+import sys
+
+# Доля трассируемых запросов по умолчанию
+SENTRY_TRACES_SAMPLE_RATE = float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "0.05"))
+# Доля запросов, для которых транзакция пишется «на всякий случай»: неуспешные из них
+# отправляются всегда, успешные прореживаются до SENTRY_TRACES_SAMPLE_RATE
+SENTRY_TRACES_ERROR_SAMPLE_RATE = float(os.getenv("SENTRY_TRACES_ERROR_SAMPLE_RATE", "0.25"))
+# Частоты по эндпоинтам: "/predict=0.1,/metrics=0"
+SENTRY_TRACES_ENDPOINT_RATES = os.getenv("SENTRY_TRACES_ENDPOINT_RATES", "/metrics=0")
+
+# Статусы спанов Sentry, при которых транзакция считается успешной
+OK_STATUSES = {None, "ok"}
+
+
+def parse_rates(spec: str) -> dict:
+    """Parses "prefix=rate,prefix=rate" into {prefix: rate}."""
+    rates = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        prefix, _, rate = part.partition("=")
+        rates[prefix.strip()] = float(rate)
+    return rates
+
+
+class TraceSampler:
+    """
+    Sentry `traces_sampler` with per-endpoint rates and error-biased sampling.
+
+    A request is traced with the candidate rate max(endpoint rate, error rate). When the
+    transaction is finished, failed ones are always sent and successful ones are kept
+    with probability rate / candidate rate, so their effective rate stays at the
+    endpoint rate. An endpoint with rate 0 is not traced at all.
+    """
+    def __init__(self, default_rate: float, error_rate: float = 0.0, endpoint_rates: dict = None):
+        self.default_rate = default_rate
+        self.error_rate = error_rate
+        # Самый длинный префикс проверяется первым
+        self.endpoint_rates = sorted((endpoint_rates or {}).items(), key=lambda rule: -len(rule[0]))
+
+    def rate_for(self, name) -> float:
+        if name:
+            for prefix, rate in self.endpoint_rates:
+                if name.startswith(prefix):
+                    return rate
+        return self.default_rate
+
+    def candidate_rate(self, rate: float) -> float:
+        return max(rate, self.error_rate) if rate > 0 else 0.0
+
+    def __call__(self, sampling_context: dict) -> float:
+        parent_sampled = sampling_context.get("parent_sampled")
+        if parent_sampled is not None:
+            return float(parent_sampled)
+        scope = sampling_context.get("asgi_scope") or {}
+        name = scope.get("path") or (sampling_context.get("transaction_context") or {}).get("name")
+        return self.candidate_rate(self.rate_for(name))
+
+    def before_send_transaction(self, event: dict, hint: dict):
+        trace_context = (event.get("contexts") or {}).get("trace") or {}
+        if trace_context.get("status") not in OK_STATUSES:
+            return event
+        rate = self.rate_for(event.get("transaction"))
+        candidate = self.candidate_rate(rate)
+        if candidate <= rate or random.random() < rate / candidate:
+            return event
+        return None
+
+
+def create_sampler() -> TraceSampler:
+    return TraceSampler(
+        default_rate=SENTRY_TRACES_SAMPLE_RATE,
+        error_rate=SENTRY_TRACES_ERROR_SAMPLE_RATE,
+        endpoint_rates=parse_rates(SENTRY_TRACES_ENDPOINT_RATES),
+    )
+
+
+def init_sentry(default_environment: str = "dev", **options) -> TraceSampler:
+    """sentry_sdk.init with the configured sampler; shared by the API and the worker."""
+    import sentry_sdk
+
+    sampler = create_sampler()
+    sentry_sdk.init(
+        # Тут должен быть ключ от Sentry
+        dsn=os.getenv("SENTRY_DSN", ""),
+        traces_sampler=sampler,
+        before_send_transaction=sampler.before_send_transaction,
+        environment=os.getenv("SENTRY_ENVIRONMENT", default_environment),
+        **options,
+    )
+    return sampler
+
+
+def capture_exception(error):
+    """
+    sentry_sdk.capture_exception that doesn't import the SDK: if init_sentry never ran,
+    there is no client to send the event to anyway.
+    """
+    sdk = sys.modules.get("sentry_sdk")
+    if sdk is not None:
+        sdk.capture_exception(error)
@@ -0,0 +1,60 @@
+"""
+Cache warm-up command: fills Redis with results for the hottest items.
+
+    python -m app.workers.cache_warmup --limit 5000
+"""
+import argparse
+import asyncio
+import logging
+
+from .settings import MLFLOW_TRACKING_URI
+from app.logs import configure_logging
+from db.database import session_maker
+from repository.model.mlflow_repository import MlflowModelRepository
+from repository.moderation_result.hot_items_repository import hot_items_repository
+from repository.moderation_result.moderation_redis_repository import ModerationRedisRepository
+from service.cache_warmer import CacheWarmer, CACHE_WARMUP_BATCH_SIZE, CACHE_WARMUP_BATCH_DELAY
+from service.model_service import ModelService
+
+logger = logging.getLogger(__name__)
+
+
+def load_model_service(skip_scoring: bool):
+    model_repository = MlflowModelRepository(MLFLOW_TRACKING_URI)
+    service = ModelService(model_repository=model_repository, item_repository=None)
+    if skip_scoring:
+        return service
+    try:
+        service.load_model()
+    except Exception as e:
+        logger.warning(f"Model is not available, only stored results will be cached: {e}")
+    return service
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=1000, help="how many hottest items to warm")
+    parser.add_argument("--batch-size", type=int, default=CACHE_WARMUP_BATCH_SIZE)
+    parser.add_argument("--batch-delay", type=float, default=CACHE_WARMUP_BATCH_DELAY)
+    parser.add_argument("--no-scoring", action="store_true", help="cache stored results only, don't run the model")
+    args = parser.parse_args()
+
+    configure_logging()
+    model_service = await asyncio.to_thread(load_model_service, args.no_scoring)
+    warmer = CacheWarmer(
+        session_maker,
+        ModerationRedisRepository(),
+        hot_items=hot_items_repository,
+        model_service=model_service,
+        batch_size=args.batch_size,
+        batch_delay=args.batch_delay,
+    )
+    report = await warmer.warm(args.limit)
+    print(
+        f"candidates={report.candidates} cached={report.cached} scored={report.scored} "
+        f"skipped={report.skipped} duration={report.duration:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,32 +2,59 @@ import asyncio
 import json
 import logging
 import os
+import signal
 import time
 from datetime import datetime, timezone
-from aiokafka import AIOKafkaConsumer, AIOKafkaProducer
-import sentry_sdk
+from functools import partial
+from aiokafka import AIOKafkaProducer
 
-from .settings import KAFKA_BOOTSTRAP, TOPIC, DLQ_TOPIC, CONSUMER_GROUP, MLFLOW_TRACKING_URI
+from .settings import (
+    KAFKA_BOOTSTRAP,
+    TOPIC,
+    DLQ_TOPIC,
+    MLFLOW_TRACKING_URI,
+    INFERENCE_BACKEND,
+    INFERENCE_WORKERS,
+    PROFILE_DIR,
+    PROFILE_SECONDS,
+    PROFILE_MODE,
+    QUEUE_BACKEND,
+    LANE_LAG_INTERVAL,
+)
+from .queue import create_queue_consumer
+from app.clients.lanes import INTERACTIVE, RETRY, lane_topic
 from db.database import session_maker
 from repository.item.item_repository import ItemRepository
 from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+from repository.moderation_result.moderation_redis_repository import ModerationRedisRepository
+from repository.moderation_result.finished_tasks import FinishedTaskBuffer
+from repository.records import TaskOutcome
 from repository.model.mlflow_repository import MlflowModelRepository
 from service.model_service import ModelService
-from dto.request import PredictRequest
+from service.inference_executor import create_inference_executor
 from app.metrics import (
     PREDICTIONS_TOTAL,
     PREDICTION_DURATION,
     PREDICTION_ERRORS_TOTAL,
     MODEL_PREDICTION_PROBABILITY,
+    LANE_LAG,
+    LANE_LATENCY,
 )
 from app.exceptions import ModelIsNotAvailable, AdvertisementNotFoundError
+from app.instrumentation import traced_coroutine, stage, KAFKA_PUBLISH
+from app.logs import configure_logging, log_event
+from app.tracing import init_sentry, capture_exception
+from app.profiling import install_signal_handlers
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 MAX_RETRIES = 3
 RETRY_DELAY = 3
 
+# Итоговые статусы пачки сообщений уходят в кэш Redis вместе с событиями о завершении
+# (long-poll и SSE /moderation_result)
+finished_tasks = FinishedTaskBuffer(ModerationRedisRepository())
+
 
 class RetryableError(Exception):
     pass
@@ -46,115 +73,286 @@ def is_retryable_error(error: Exception) -> bool:
 def calculate_retry_delay(retry_count: int) -> int:
     return RETRY_DELAY * (2 ** retry_count)
 
+
 async def main():
-    sentry_sdk.init(
-        # Тут должен быть ключ от Sentry
-        dsn=os.getenv("SENTRY_DSN", ""),
-        traces_sample_rate=1.0,
-        environment=os.getenv("SENTRY_ENVIRONMENT", "development"),
-    )
+    configure_logging()
+    init_sentry("development")
 
-    consumer = AIOKafkaConsumer(
-        TOPIC,
-        bootstrap_servers=KAFKA_BOOTSTRAP,
-        group_id=CONSUMER_GROUP,
-        enable_auto_commit=False,
-        auto_offset_reset="earliest",
-    )
-    
-    dlq_producer = AIOKafkaProducer(
-        bootstrap_servers=KAFKA_BOOTSTRAP
-    )
+    consumer = create_queue_consumer(QUEUE_BACKEND)
+    # В очереди Postgres DLQ не нужен: ошибка остаётся в строке задачи со статусом failed
+    dlq_producer = AIOKafkaProducer(bootstrap_servers=KAFKA_BOOTSTRAP) if consumer.backend == "kafka" else None
     
     model_repo = MlflowModelRepository(MLFLOW_TRACKING_URI)
-    model = None
-    
-    try:
-        model = model_repo.load_model()
-    except Exception as e:
-        try:
-            model = model_repo.train_model()
-        except Exception as train_error:
-            logger.error(f"Failed to train model: {train_error}")
+    model = load_model(model_repo)
+
+    executor = create_inference_executor(INFERENCE_BACKEND, INFERENCE_WORKERS)
+    if model is not None:
+        executor.start(model)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stopping.set)
+    install_signal_handlers(loop, PROFILE_DIR, PROFILE_SECONDS, PROFILE_MODE, prefix="moderation-worker")
     
     await consumer.start()
-    await dlq_producer.start()
+    if dlq_producer is not None:
+        await dlq_producer.start()
     
-    logger.info(f"[worker] Started consuming topic '{TOPIC}' as group '{CONSUMER_GROUP}'")
+    logger.info(f"[worker] Started consuming {consumer} (pid={os.getpid()})")
+    lag_reported_at = 0.0
     try:
-        async for msg in consumer:
-            event = None
-            item_id = None
-            
-            try:
-                event = json.loads(msg.value.decode("utf-8"))
-                item_id = event.get("item_id")
-                timestamp = event.get("timestamp")
-                logger.info(f"Received event: item_id={item_id}, timestamp={timestamp}")
-                if item_id is None:
-                    raise PermanentError("Missing 'item_id' in message")
-                await process_with_retry(
-                    item_id=item_id,
+        while not stopping.is_set():
+            if loop.time() - lag_reported_at >= LANE_LAG_INTERVAL:
+                await report_lane_lag(consumer)
+                lag_reported_at = loop.time()
+            messages = await consumer.next_batch(stopping)
+            if messages is None:
+                break
+            if not messages:
+                continue
+            async with consumer.in_flight():
+                await handle_batch(
+                    consumer=consumer,
+                    messages=messages,
                     model=model,
                     model_repo=model_repo,
                     dlq_producer=dlq_producer,
-                    original_event=event
+                    executor=executor,
+                    requeue=partial(requeue_for_retry, dlq_producer),
                 )
-                await consumer.commit()
-                
-            except PermanentError as e:
-                sentry_sdk.capture_exception(e)
-                PREDICTION_ERRORS_TOTAL.labels(error_type="permanent").inc()
-                logger.error(f"Permanent error processing message: {e}")
-                try:
-                    async with session_maker() as db:
-                        await mark_moderation_failed(
-                            db=db,
-                            item_id=item_id,
-                            error_message=f"Permanent error: {str(e)}"
-                        )
-                except Exception as db_error:
-                    logger.error(f"Failed to update moderation status: {db_error}")
-                await send_to_dlq(
-                    dlq_producer=dlq_producer,
+        logger.info("[worker] Shutting down gracefully")
+    finally:
+        executor.shutdown()
+        await consumer.stop()
+        if dlq_producer is not None:
+            await dlq_producer.stop()
+
+def load_model(model_repo):
+    """
+    The model from the registry, checked against FEATURE_SCHEMA like in the API; a missing
+    or incompatible model is replaced by a freshly trained one. None if training fails too.
+    """
+    service = ModelService(item_repository=None, model_repository=model_repo)
+    try:
+        service.load_model()
+    except Exception as e:
+        logger.info(f"Model was not loaded ({e}), training a new one")
+        try:
+            service.train_model()
+        except Exception as train_error:
+            logger.error(f"Failed to train model: {train_error}")
+    return service.model
+
+async def report_lane_lag(consumer):
+    try:
+        for lane, partition, lag in await consumer.lane_lag():
+            LANE_LAG.labels(lane=lane, partition=partition).set(lag)
+    except Exception as e:
+        logger.warning(f"Failed to measure lane lag: {e}")
+
+def observe_lane_latency(messages):
+    """Time from enqueueing to the end of the batch, by the `lane` and `timestamp` of each message."""
+    now = datetime.now(timezone.utc)
+    for msg in messages:
+        try:
+            event = json.loads(msg.value.decode("utf-8"))
+            latency = (now - datetime.fromisoformat(event["timestamp"])).total_seconds()
+        except Exception:
+            continue
+        LANE_LATENCY.labels(lane=event.get("lane", INTERACTIVE)).observe(max(0.0, latency))
+
+async def handle_batch(consumer, messages, model, model_repo, dlq_producer, executor=None, requeue=None):
+    """
+    Moderates the batch with moderate_batch, then handles whatever it left message by
+    message; finally writes the finished tasks to Redis and commits the offsets once for
+    the whole batch.
+    """
+    remaining = messages
+    if model is not None:
+        try:
+            remaining = await moderate_batch(messages, model, model_repo, executor)
+        except Exception as e:
+            # Обычный путь с повторами и DLQ разберётся с каждым сообщением сам
+            logger.warning(f"Batch moderation of {len(messages)} messages failed, falling back to one by one: {e}")
+            remaining = messages
+    for msg in remaining:
+        await handle_message(
+            consumer=consumer,
+            msg=msg,
+            model=model,
+            model_repo=model_repo,
+            dlq_producer=dlq_producer,
+            executor=executor,
+            requeue=requeue,
+        )
+    await finished_tasks.flush()
+    # Смещения коммитятся после записи в кэш: при падении пачка обработается заново
+    await consumer.commit()
+    observe_lane_latency(messages)
+
+def message_task(msg):
+    """
+    (item_id, task_id) of a message. Only the Postgres queue knows the task it claimed;
+    a Kafka message has task_id None and its task is the latest pending one of the item.
+    """
+    try:
+        event = json.loads(msg.value.decode("utf-8"))
+        task_id = event.get("task_id")
+        return int(event["item_id"]), int(task_id) if task_id is not None else None
+    except Exception:
+        return None, None
+
+async def pending_task_id(db, moder_repo, item_id, task_id=None):
+    if task_id is not None:
+        return task_id
+    task = await moder_repo.get_latest_pending(db, item_id)
+    return task.id if task else None
+
+@traced_coroutine("moderation_batch")
+async def moderate_batch(messages, model, model_repo, executor=None):
+    """
+    Fast path for a batch: one feature query, one pending-task query, one model call and
+    one UPDATE for every item that has a pending task.
+
+    Returns:
+        list: messages left for handle_message: malformed ones, items not found and
+              repeated items (their older pending tasks are picked up one by one)
+    """
+    by_item = {}
+    claimed = {}
+    remaining = []
+    for msg in messages:
+        item_id, task_id = message_task(msg)
+        if item_id is None or item_id in by_item:
+            remaining.append(msg)
+        else:
+            by_item[item_id] = msg
+            if task_id is not None:
+                claimed[item_id] = task_id
+    if not by_item:
+        return remaining
+
+    async with session_maker() as db:
+        item_repo = ItemRepository(db)
+        moder_repo = ModerationResultRepository(db, finished_tasks=finished_tasks)
+        item_ids, features = await item_repo.get_feature_matrix(list(by_item))
+        found = set(item_ids)
+        remaining.extend(msg for item_id, msg in by_item.items() if item_id not in found)
+        # Задачу, арендованную из очереди Postgres, не ищем заново: последняя ожидающая
+        # задача объявления может принадлежать другому воркеру
+        pending = await moder_repo.get_latest_pending_for_items(
+            db, [item_id for item_id in item_ids if item_id not in claimed]
+        )
+        pending.update((item_id, claimed[item_id]) for item_id in item_ids if item_id in claimed)
+        rows = [row for row, item_id in enumerate(item_ids) if item_id in pending]
+        if rows:
+            service = ModelService(
+                item_repository=item_repo,
+                model_repository=model_repo,
+                model=model,
+                executor=executor,
+            )
+            start = time.perf_counter()
+            results = await service.predict_batch_async(features[rows])
+            per_item = (time.perf_counter() - start) / len(rows)
+            outcomes = []
+            for row, result in zip(rows, results):
+                PREDICTION_DURATION.observe(per_item)
+                PREDICTIONS_TOTAL.labels(result="violation" if result.is_violation else "no_violation").inc()
+                MODEL_PREDICTION_PROBABILITY.observe(result.probability)
+                outcomes.append(TaskOutcome(
+                    task_id=pending[item_ids[row]],
+                    status="completed",
+                    is_violation=result.is_violation,
+                    probability=result.probability,
+                ))
+            await moder_repo.update_tasks(db, outcomes)
+    log_event(logger, "moderation.batch", messages=len(messages), moderated=len(rows), remaining=len(remaining))
+    return remaining
+
+@traced_coroutine("moderation_message")
+async def handle_message(consumer, msg, model, model_repo, dlq_producer, executor=None, requeue=None):
+    event = None
+    item_id = None
+    task_id = None
+    
+    try:
+        event = json.loads(msg.value.decode("utf-8"))
+        item_id = event.get("item_id")
+        task_id = event.get("task_id")
+        timestamp = event.get("timestamp")
+        log_event(logger, "moderation.received", item_id=item_id, timestamp=timestamp)
+        if item_id is None:
+            raise PermanentError("Missing 'item_id' in message")
+        await process_with_retry(
+            item_id=item_id,
+            model=model,
+            model_repo=model_repo,
+            dlq_producer=dlq_producer,
+            original_event=event,
+            executor=executor,
+            requeue=requeue,
+        )
+        
+    except PermanentError as e:
+        capture_exception(e)
+        PREDICTION_ERRORS_TOTAL.labels(error_type="permanent").inc()
+        logger.error(f"Permanent error processing message: {e}")
+        try:
+            async with session_maker() as db:
+                await mark_moderation_failed(
+                    db=db,
                     item_id=item_id,
-                    error=e,
-                    event=event,
-                    retry_count=0,
-                    is_permanent=True
+                    error_message=f"Permanent error: {str(e)}",
+                    task_id=task_id,
                 )
-                await consumer.commit()
-                
-            except Exception as e:
-                sentry_sdk.capture_exception(e)
-                PREDICTION_ERRORS_TOTAL.labels(error_type="unhandled").inc()
-                try:
-                    async with session_maker() as db:
-                        await mark_moderation_failed(
-                            db=db,
-                            item_id=item_id,
-                            error_message=str(e)
-                        )
-                except Exception as db_error:
-                    logger.error(f"Failed to update moderation status: {db_error}")
-                
-                await send_to_dlq(
-                    dlq_producer=dlq_producer,
+        except Exception as db_error:
+            logger.error(f"Failed to update moderation status: {db_error}")
+        await send_to_dlq(
+            dlq_producer=dlq_producer,
+            item_id=item_id,
+            error=e,
+            event=event,
+            retry_count=0,
+            is_permanent=True
+        )
+        
+    except Exception as e:
+        capture_exception(e)
+        PREDICTION_ERRORS_TOTAL.labels(error_type="unhandled").inc()
+        try:
+            async with session_maker() as db:
+                await mark_moderation_failed(
+                    db=db,
                     item_id=item_id,
-                    error=e,
-                    event=event,
-                    retry_count=0,
-                    is_permanent=False
+                    error_message=str(e),
+                    task_id=task_id,
                 )
-                
-                await consumer.commit()
-                
-    finally:
-        await consumer.stop()
-        await dlq_producer.stop()
+        except Exception as db_error:
+            logger.error(f"Failed to update moderation status: {db_error}")
+        
+        await send_to_dlq(
+            dlq_producer=dlq_producer,
+            item_id=item_id,
+            error=e,
+            event=event,
+            retry_count=0,
+            is_permanent=False
+        )
 
-async def process_with_retry(item_id: int, model, model_repo, dlq_producer, original_event: dict):
-    retry_count = 0
+async def process_with_retry(
+    item_id: int, model, model_repo, dlq_producer, original_event: dict, executor=None, requeue=None,
+):
+    """
+    Moderates the item, retrying transient errors with exponential backoff. With `requeue`
+    the first retry of a message outside the retry lane is handed to `requeue` instead,
+    so the backoff doesn't hold up the rest of the batch; the retry lane then retries in
+    place as before.
+    """
+    # Сообщение из полосы retry уже было повторено один раз
+    retry_count = original_event.get("retry_count") or 0
+    task_id = original_event.get("task_id")
     last_error = None
     
     while retry_count <= MAX_RETRIES:
@@ -164,7 +362,9 @@ async def process_with_retry(item_id: int, model, model_repo, dlq_producer, orig
                     db=db,
                     item_id=item_id,
                     model=model,
-                    model_repo=model_repo
+                    model_repo=model_repo,
+                    executor=executor,
+                    task_id=task_id,
                 )
             
             return
@@ -177,18 +377,22 @@ async def process_with_retry(item_id: int, model, model_repo, dlq_producer, orig
                 raise PermanentError(str(e)) from e
             
             if retry_count >= MAX_RETRIES:
-                sentry_sdk.capture_exception(e)
+                capture_exception(e)
                 PREDICTION_ERRORS_TOTAL.labels(error_type="max_retries_exceeded").inc()
                 logger.error(f"Max retries ({MAX_RETRIES}) exceeded for item_id={item_id}")
                 break
             try:
                 async with session_maker() as db:
                     moder_repo = ModerationResultRepository(db)
-                    task = await moder_repo.get_latest_pending(db, item_id)
-                    if task:
-                        await moder_repo.increment_retry_count(db, task.id)
+                    pending_id = await pending_task_id(db, moder_repo, item_id, task_id)
+                    if pending_id is not None:
+                        await moder_repo.increment_retry_count(db, pending_id)
             except Exception as db_error:
                 logger.warning(f"Failed to increment retry count: {db_error}")
+
+            if requeue is not None and original_event.get("lane") != RETRY and await requeue(original_event):
+                log_event(logger, "moderation.requeued", item_id=item_id, lane=RETRY)
+                return
             
             delay = calculate_retry_delay(retry_count)
             await asyncio.sleep(delay)
@@ -200,7 +404,8 @@ async def process_with_retry(item_id: int, model, model_repo, dlq_producer, orig
                 db=db,
                 item_id=item_id,
                 error_message=f"Max retries exceeded. Last error: {str(last_error)}",
-                retry_count=retry_count
+                retry_count=retry_count,
+                task_id=task_id,
             )
     except Exception as db_error:
         logger.error(f"Failed to update moderation status: {db_error}")
@@ -214,60 +419,54 @@ async def process_with_retry(item_id: int, model, model_repo, dlq_producer, orig
         is_permanent=False
     )
 
-async def handle_moderation(db, item_id: int, model, model_repo):
+async def handle_moderation(db, item_id: int, model, model_repo, executor=None, task_id=None):
     item_repo = ItemRepository(db)
-    moder_repo = ModerationResultRepository(db)
+    moder_repo = ModerationResultRepository(db, finished_tasks=finished_tasks)
     
-    item = await item_repo.get_item(item_id)
-    if item is None:
+    item_ids, features = await item_repo.get_feature_matrix([item_id])
+    if not item_ids:
         raise AdvertisementNotFoundError(f"Item with id={item_id} not found in database")
     
-    task = await moder_repo.get_latest_pending(db, item_id)
-    if task is None:
+    task_id = await pending_task_id(db, moder_repo, item_id, task_id)
+    if task_id is None:
         return
     if model is None:
         PREDICTION_ERRORS_TOTAL.labels(error_type="model_not_available").inc()
         raise ModelIsNotAvailable("ML model is not available")
-    prediction_request = PredictRequest(
-        item_id=item.id,
-        name=item.name,
-        description=item.description,
-        category=item.category,
-        images_qty=item.images_qty
-    )
     service = ModelService(
         item_repository=item_repo,
         model_repository=model_repo,
-        model=model
+        model=model,
+        executor=executor,
     )
     start = time.perf_counter()
-    result = service.predict(prediction_request)
+    result = (await service.predict_batch_async(features))[0]
     PREDICTION_DURATION.observe(time.perf_counter() - start)
     PREDICTIONS_TOTAL.labels(result="violation" if result.is_violation else "no_violation").inc()
     MODEL_PREDICTION_PROBABILITY.observe(result.probability)
     await moder_repo.update_task(
         db=db,
-        task_id=task.id,
+        task_id=task_id,
         is_violation=result.is_violation,
         probability=result.probability,
         error_message=None,
         status="completed"
     )
 
-async def mark_moderation_failed(db, item_id: int, error_message: str, retry_count: int = 0):
-    if item_id is None:
+async def mark_moderation_failed(db, item_id: int, error_message: str, retry_count: int = 0, task_id=None):
+    if item_id is None and task_id is None:
         return
     
-    moder_repo = ModerationResultRepository(db)
+    moder_repo = ModerationResultRepository(db, finished_tasks=finished_tasks)
     
-    task = await moder_repo.get_latest_pending(db, item_id)
-    if task is None:
+    task_id = await pending_task_id(db, moder_repo, item_id, task_id)
+    if task_id is None:
         logger.warning(f"No pending moderation task found for item_id={item_id}")
         return
     
     await moder_repo.update_task(
         db=db,
-        task_id=task.id,
+        task_id=task_id,
         is_violation=None,
         probability=None,
         error_message=error_message,
@@ -275,7 +474,35 @@ async def mark_moderation_failed(db, item_id: int, error_message: str, retry_cou
         retry_count=retry_count
     )
     
+async def requeue_for_retry(producer, event: dict) -> bool:
+    """
+    Moves the message to the retry lane: a task of the Postgres queue changes its lane in
+    place, a Kafka message is republished to the retry topic with the same key.
+
+    Returns:
+        bool: False if the message could not be moved and has to be retried in place
+    """
+    try:
+        if event.get("task_id") is not None:
+            async with session_maker() as db:
+                return await ModerationResultRepository(db).requeue_task(db, event["task_id"], RETRY)
+        if producer is None:
+            return False
+        payload = {**event, "lane": RETRY, "retry_count": (event.get("retry_count") or 0) + 1}
+        with stage(KAFKA_PUBLISH):
+            await producer.send_and_wait(
+                lane_topic(TOPIC, RETRY),
+                json.dumps(payload).encode("utf-8"),
+                key=str(event["item_id"]).encode("utf-8"),
+            )
+        return True
+    except Exception as e:
+        logger.warning(f"Failed to move item_id={event.get('item_id')} to the retry lane: {e}")
+        return False
+
 async def send_to_dlq(dlq_producer, item_id: int, error: Exception, event: dict, retry_count: int, is_permanent: bool):
+    if dlq_producer is None:
+        return
     try:
         dlq_payload = {
             "error": str(error),
@@ -291,7 +518,8 @@ async def send_to_dlq(dlq_producer, item_id: int, error: Exception, event: dict,
         }
         
         dlq_data = json.dumps(dlq_payload).encode("utf-8")
-        await dlq_producer.send_and_wait(DLQ_TOPIC, dlq_data)
+        with stage(KAFKA_PUBLISH):
+            await dlq_producer.send_and_wait(DLQ_TOPIC, dlq_data)
         logger.info(f"Sent message to DLQ: item_id={item_id}, retries={retry_count}, permanent={is_permanent}")
         
     except Exception as dlq_error:
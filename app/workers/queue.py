@@ -0,0 +1,333 @@
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import timezone
+from typing import NamedTuple
+
+from aiokafka import AIOKafkaConsumer, ConsumerRebalanceListener
+
+from .settings import (
+    KAFKA_BOOTSTRAP,
+    TOPIC,
+    CONSUMER_GROUP,
+    WORKER_BATCH_SIZE,
+    WORKER_BATCH_TIMEOUT_MS,
+    QUEUE_POLL_INTERVAL,
+    QUEUE_CLAIM_TIMEOUT,
+    LANE_WEIGHTS,
+)
+from app.clients.lanes import DEFAULT_LANE_WEIGHTS, lane_topic, parse_lane_weights
+from app.clients.queue import MODERATION_QUEUE_CHANNEL
+from db.database import engine, session_maker
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+
+logger = logging.getLogger(__name__)
+
+
+class QueueMessage(NamedTuple):
+    """Message of a non-Kafka backend, shaped like a Kafka record: JSON with `item_id` in `value`."""
+    value: bytes
+
+
+class InFlightRebalanceListener(ConsumerRebalanceListener):
+    """
+    Delays partition revocation until the in-flight batch is processed and committed,
+    so that the next owner of the partition never picks up a half-processed item.
+    """
+    def __init__(self):
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @asynccontextmanager
+    async def in_flight(self):
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._idle.set()
+
+    async def on_partitions_revoked(self, revoked):
+        if revoked:
+            logger.info(f"Partitions revoked: {sorted(str(tp) for tp in revoked)}, waiting for in-flight batch")
+        await self._idle.wait()
+
+    async def on_partitions_assigned(self, assigned):
+        logger.info(f"Partitions assigned: {sorted(str(tp) for tp in assigned)}")
+
+
+class WeightedFairScheduler:
+    """
+    Start-time fair queueing over the priority lanes.
+
+    Every lane has a tag that grows by messages / weight each time the lane is served;
+    `order` puts the lane with the smallest tag first, so under load in all lanes they
+    get messages in proportion to their weights. A lane that was idle restarts from the
+    current virtual time (the tag of the last served lane) instead of keeping the credit
+    it did not use, and can't take over the worker once it fills up again.
+    """
+    def __init__(self, weights: dict):
+        self.weights = dict(weights)
+        self._finish = {lane: 0.0 for lane in self.weights}
+        self._virtual = 0.0
+
+    def start_tag(self, lane: str) -> float:
+        return max(self._finish[lane], self._virtual)
+
+    def order(self) -> list:
+        # При равных метках первой идёт полоса с большим весом
+        return sorted(self.weights, key=lambda lane: (self.start_tag(lane), -self.weights[lane]))
+
+    def served(self, lane: str, messages: int) -> None:
+        start = self.start_tag(lane)
+        self._finish[lane] = start + messages / self.weights[lane]
+        self._virtual = start
+
+
+async def first_of(operation, stopping: asyncio.Event, timeout: float = None):
+    """
+    Runs `operation` until it completes, `stopping` is set or `timeout` passes.
+
+    Returns:
+        tuple: (True, result) if the operation completed, otherwise (False, None)
+    """
+    work = asyncio.ensure_future(operation)
+    stop = asyncio.ensure_future(stopping.wait())
+    done, pending = await asyncio.wait({work, stop}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    if work in done:
+        return True, work.result()
+    return False, None
+
+
+class QueueConsumer:
+    """
+    Source of moderation messages for the worker loop.
+
+    `next_batch` returns a list of messages (possibly empty) or None once the worker is
+    stopping; `commit` acknowledges everything returned so far. The worker processes a
+    batch inside `in_flight()`. Each batch comes from one priority lane, picked by
+    WeightedFairScheduler over the lanes that have messages (a Kafka batch that had to
+    wait for messages may hold several lanes, each charged to the scheduler).
+    """
+    backend = "base"
+
+    def __init__(self, batch_size: int, weights: dict = None):
+        self.batch_size = batch_size
+        self.scheduler = WeightedFairScheduler(weights or parse_lane_weights(DEFAULT_LANE_WEIGHTS))
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def next_batch(self, stopping: asyncio.Event):
+        raise NotImplementedError
+
+    async def commit(self) -> None:
+        pass
+
+    @asynccontextmanager
+    async def in_flight(self):
+        yield
+
+    async def lane_lag(self) -> list:
+        """Waiting messages as (lane, partition, count) tuples, for the moderation_lane_lag metric."""
+        return []
+
+
+class KafkaQueueConsumer(QueueConsumer):
+    backend = "kafka"
+
+    def __init__(
+        self,
+        bootstrap_servers: str,
+        topic: str,
+        group_id: str,
+        batch_size: int,
+        batch_timeout_ms: int,
+        weights: dict = None,
+    ):
+        super().__init__(batch_size, weights)
+        self.bootstrap_servers = bootstrap_servers
+        self.topic = topic
+        self.group_id = group_id
+        self.batch_timeout_ms = batch_timeout_ms
+        # Топик каждой полосы: moderation, moderation-bulk, moderation-retry
+        self.lanes = {lane_topic(topic, lane): lane for lane in self.scheduler.weights}
+        self.listener = InFlightRebalanceListener()
+        self.consumer = None
+
+    def __str__(self):
+        return f"topics {sorted(self.lanes)} as group '{self.group_id}'"
+
+    async def start(self) -> None:
+        self.consumer = AIOKafkaConsumer(
+            bootstrap_servers=self.bootstrap_servers,
+            group_id=self.group_id,
+            enable_auto_commit=False,
+            auto_offset_reset="earliest",
+        )
+        self.consumer.subscribe(list(self.lanes), listener=self.listener)
+        await self.consumer.start()
+
+    async def stop(self) -> None:
+        if self.consumer is not None:
+            await self.consumer.stop()
+
+    def partitions_by_lane(self) -> dict:
+        by_lane = {}
+        for tp in self.consumer.assignment():
+            by_lane.setdefault(self.lanes.get(tp.topic), []).append(tp)
+        return by_lane
+
+    async def next_batch(self, stopping: asyncio.Event):
+        """
+        Messages already fetched for the first lane in scheduler order that has any. If no
+        lane has, waits for one getmany over all partitions; whatever arrives is returned
+        lane by lane in scheduler order and each lane is charged for its share, empty if
+        nothing arrived in time.
+        """
+        if not stopping.is_set():
+            by_lane = self.partitions_by_lane()
+            for lane in self.scheduler.order():
+                if not by_lane.get(lane):
+                    continue
+                # timeout_ms=0: только то, что consumer уже подтянул в фоне, без ожидания
+                batch = await self.consumer.getmany(*by_lane[lane], timeout_ms=0, max_records=self.batch_size)
+                if batch:
+                    messages = [msg for messages in batch.values() for msg in messages]
+                    self.scheduler.served(lane, len(messages))
+                    return messages
+        fetched, batch = await first_of(
+            self.consumer.getmany(timeout_ms=self.batch_timeout_ms, max_records=self.batch_size), stopping,
+        )
+        if not fetched:
+            return None
+        # При слабом трафике в пачке бывает несколько полос: планировщик учитывает каждую
+        arrived = {}
+        for tp, messages in batch.items():
+            arrived.setdefault(self.lanes.get(tp.topic), []).extend(messages)
+        result = []
+        for lane in self.scheduler.order():
+            if arrived.get(lane):
+                self.scheduler.served(lane, len(arrived[lane]))
+                result.extend(arrived[lane])
+        return result
+
+    async def commit(self) -> None:
+        await self.consumer.commit()
+
+    def in_flight(self):
+        return self.listener.in_flight()
+
+    async def lane_lag(self) -> list:
+        lag = []
+        for tp in self.consumer.assignment():
+            highwater = self.consumer.highwater(tp)
+            if highwater is None or tp.topic not in self.lanes:
+                continue
+            position = await self.consumer.position(tp)
+            lag.append((self.lanes[tp.topic], str(tp.partition), max(0, highwater - position)))
+        return lag
+
+
+class PostgresQueueConsumer(QueueConsumer):
+    """
+    Claims pending rows of moderation_results with SELECT ... FOR UPDATE SKIP LOCKED,
+    trying the lanes in scheduler order until one has tasks.
+
+    Between claims the consumer sleeps on LISTEN `channel` (PostgresQueueProducer sends
+    NOTIFY), waking up every `poll_interval` seconds anyway to pick up tasks whose lease of
+    `lease_seconds` expired. The rows are the state of the queue, so `commit` does nothing:
+    a claimed task stops being pending when the worker writes its result.
+    """
+    backend = "postgres"
+
+    def __init__(
+        self,
+        engine,
+        session_maker,
+        batch_size: int,
+        poll_interval: float,
+        lease_seconds: float,
+        channel: str = MODERATION_QUEUE_CHANNEL,
+        weights: dict = None,
+    ):
+        super().__init__(batch_size, weights)
+        self.engine = engine
+        self.session_maker = session_maker
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.channel = channel
+        self._wakeup = asyncio.Event()
+        self._connection = None
+
+    def __str__(self):
+        return f"postgres queue on channel '{self.channel}'"
+
+    def _on_notify(self, connection, pid, channel, payload):
+        self._wakeup.set()
+
+    async def start(self) -> None:
+        # Отдельное соединение держит LISTEN всё время работы воркера
+        self._connection = await self.engine.connect()
+        raw = await self._connection.get_raw_connection()
+        await raw.driver_connection.add_listener(self.channel, self._on_notify)
+
+    async def stop(self) -> None:
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    async def claim(self, lane: str):
+        async with self.session_maker() as db:
+            return await ModerationResultRepository(db).claim_pending(db, self.batch_size, self.lease_seconds, lane)
+
+    @staticmethod
+    def message(task, lane: str) -> QueueMessage:
+        created_at = task.created_at
+        if created_at.tzinfo is None:
+            # sqlite отдаёт время без зоны; в базе оно в UTC
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        payload = {
+            "item_id": task.item_id,
+            "task_id": task.id,
+            "lane": lane,
+            "retry_count": task.retry_count,
+            "timestamp": created_at.isoformat(),
+        }
+        return QueueMessage(json.dumps(payload).encode("utf-8"))
+
+    async def next_batch(self, stopping: asyncio.Event):
+        """Claimed tasks of one lane as messages; empty after `poll_interval` seconds without any."""
+        if stopping.is_set():
+            return None
+        # Сброс до запроса: NOTIFY, пришедший во время claim, разбудит следующее ожидание
+        self._wakeup.clear()
+        for lane in self.scheduler.order():
+            tasks = await self.claim(lane)
+            if tasks:
+                self.scheduler.served(lane, len(tasks))
+                return [self.message(task, lane) for task in tasks]
+        await first_of(self._wakeup.wait(), stopping, timeout=self.poll_interval)
+        return None if stopping.is_set() else []
+
+    async def lane_lag(self) -> list:
+        async with self.session_maker() as db:
+            pending = await ModerationResultRepository(db).count_pending_by_lane()
+        return [(lane, "all", pending.get(lane, 0)) for lane in self.scheduler.weights]
+
+
+def create_queue_consumer(backend: str) -> QueueConsumer:
+    if backend == KafkaQueueConsumer.backend:
+        return KafkaQueueConsumer(
+            KAFKA_BOOTSTRAP, TOPIC, CONSUMER_GROUP, WORKER_BATCH_SIZE, WORKER_BATCH_TIMEOUT_MS, weights=LANE_WEIGHTS,
+        )
+    if backend == PostgresQueueConsumer.backend:
+        return PostgresQueueConsumer(
+            engine, session_maker, WORKER_BATCH_SIZE, QUEUE_POLL_INTERVAL, QUEUE_CLAIM_TIMEOUT, weights=LANE_WEIGHTS,
+        )
+    raise ValueError(f"Unknown queue backend '{backend}'. Expected one of: kafka, postgres")
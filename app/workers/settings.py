@@ -1,10 +1,36 @@
 import os
 from dotenv import load_dotenv
 
+from app.clients.lanes import DEFAULT_LANE_WEIGHTS, parse_lane_weights
+
 load_dotenv()
 
+# Источник задач: kafka или postgres (pending-строки moderation_results + LISTEN/NOTIFY)
+QUEUE_BACKEND = os.getenv("QUEUE_BACKEND", "kafka")
+# Очередь в Postgres: как часто проверять задачи без NOTIFY и через сколько секунд
+# задача, забранная упавшим воркером, снова становится доступной
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "5"))
+QUEUE_CLAIM_TIMEOUT = float(os.getenv("QUEUE_CLAIM_TIMEOUT", "300"))
 KAFKA_BOOTSTRAP = os.getenv("KAFKA_BOOTSTRAP", "localhost:9092")
 TOPIC = os.getenv("TOPIC", "moderation")
 DLQ_TOPIC = os.getenv("DLQ_TOPIC", "moderation_dlq")
 CONSUMER_GROUP = os.getenv("CONSUMER_GROUP", "moderation-worker")
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://mlflow:5000")
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", str(os.cpu_count() or 1)))
+WORKER_SHUTDOWN_TIMEOUT = float(os.getenv("WORKER_SHUTDOWN_TIMEOUT", "30"))
+MODERATION_PARTITIONS = int(os.getenv("MODERATION_PARTITIONS", str(WORKER_PROCESSES)))
+# Сообщений за один getmany: результаты пачки пишутся в Redis одним pipeline, смещения коммитятся разом
+WORKER_BATCH_SIZE = int(os.getenv("WORKER_BATCH_SIZE", "50"))
+WORKER_BATCH_TIMEOUT_MS = int(os.getenv("WORKER_BATCH_TIMEOUT_MS", "1000"))
+# Веса полос приоритета (interactive, bulk, retry) в планировщике воркера и как часто
+# обновлять метрику moderation_lane_lag
+LANE_WEIGHTS = parse_lane_weights(os.getenv("LANE_WEIGHTS", DEFAULT_LANE_WEIGHTS))
+LANE_LAG_INTERVAL = float(os.getenv("LANE_LAG_INTERVAL", "15"))
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
+METRICS_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-moderation-worker")
+# kill -USR1 / -USR2 <pid>: профиль или отчёт tracemalloc пишутся в PROFILE_DIR
+PROFILE_DIR = os.getenv("PROFILE_DIR", "/tmp/profiles")
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "wall")
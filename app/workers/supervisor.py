@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+
+from aiokafka.admin import AIOKafkaAdminClient, NewTopic, NewPartitions
+
+from .settings import (
+    KAFKA_BOOTSTRAP,
+    TOPIC,
+    WORKER_PROCESSES,
+    WORKER_SHUTDOWN_TIMEOUT,
+    MODERATION_PARTITIONS,
+    METRICS_PORT,
+    METRICS_DIR,
+    QUEUE_BACKEND,
+    LANE_WEIGHTS,
+)
+from app.clients.lanes import lane_topic
+from app.logs import configure_logging
+
+logger = logging.getLogger(__name__)
+
+RESTART_DELAY = 1
+
+
+def run_worker():
+    from app.workers.moderation_worker import main
+    asyncio.run(main())
+
+
+async def ensure_topic_partitions(topic: str, partitions: int):
+    """
+    Makes sure the topic has at least `partitions` partitions: a consumer group
+    can't run more active consumers than there are partitions.
+    """
+    admin = AIOKafkaAdminClient(bootstrap_servers=KAFKA_BOOTSTRAP)
+    await admin.start()
+    try:
+        described = await admin.describe_topics([topic])
+        current = next(
+            (len(t["partitions"]) for t in described if t["topic"] == topic and t["error_code"] == 0),
+            0,
+        )
+        if current == 0:
+            await admin.create_topics([NewTopic(topic, num_partitions=partitions, replication_factor=1)])
+            logger.info(f"[supervisor] Created topic '{topic}' with {partitions} partitions")
+        elif current < partitions:
+            await admin.create_partitions({topic: NewPartitions(total_count=partitions)})
+            logger.info(f"[supervisor] Increased partitions of '{topic}' from {current} to {partitions}")
+    finally:
+        await admin.close()
+
+
+class WorkerSupervisor:
+    """
+    Runs N moderation worker processes in the same consumer group.
+
+    Kafka spreads topic partitions across the processes; on SIGTERM/SIGINT every
+    child gets SIGTERM, finishes its in-flight message, commits and leaves the group.
+    Crashed children are restarted.
+    """
+    def __init__(self, processes: int = WORKER_PROCESSES, target=run_worker, shutdown_timeout: float = WORKER_SHUTDOWN_TIMEOUT):
+        self.processes = max(1, processes)
+        self.target = target
+        self.shutdown_timeout = shutdown_timeout
+        self._ctx = multiprocessing.get_context("spawn")
+        self._children = {}
+        self._stopping = False
+
+    def _spawn(self, slot: int):
+        process = self._ctx.Process(target=self.target, name=f"moderation-worker-{slot}", daemon=False)
+        process.start()
+        self._children[slot] = process
+        logger.info(f"[supervisor] Started {process.name} (pid={process.pid})")
+
+    def request_stop(self, *_):
+        self._stopping = True
+
+    def start(self):
+        for slot in range(self.processes):
+            self._spawn(slot)
+
+    def watch(self, poll_interval: float = 0.5):
+        while not self._stopping:
+            for slot, process in list(self._children.items()):
+                if not process.is_alive() and not self._stopping:
+                    logger.warning(f"[supervisor] {process.name} exited with code {process.exitcode}, restarting")
+                    time.sleep(RESTART_DELAY)
+                    self._spawn(slot)
+            time.sleep(poll_interval)
+
+    def stop(self):
+        for process in self._children.values():
+            if process.is_alive():
+                process.terminate()
+        deadline = time.monotonic() + self.shutdown_timeout
+        for process in self._children.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning(f"[supervisor] {process.name} did not stop in {self.shutdown_timeout}s, killing")
+                process.kill()
+                process.join()
+
+    def serve_metrics(self):
+        """
+        Metrics of all worker processes on METRICS_PORT: children write their values into
+        METRICS_DIR (prometheus_client multiprocess mode), the supervisor aggregates them.
+        """
+        if not METRICS_PORT:
+            return
+        # Переменная должна быть задана до импорта prometheus_client здесь и в дочерних процессах
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = METRICS_DIR
+        from app.metrics_exporter import prepare_multiproc_dir, start_metrics_server
+        prepare_multiproc_dir(METRICS_DIR)
+        start_metrics_server(METRICS_PORT)
+        logger.info(f"[supervisor] Serving worker metrics on :{METRICS_PORT}")
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.request_stop)
+        signal.signal(signal.SIGINT, self.request_stop)
+        if QUEUE_BACKEND == "kafka":
+            # Каждая полоса приоритета — свой топик, партиций в каждом хватает на все процессы
+            for lane in LANE_WEIGHTS:
+                topic = lane_topic(TOPIC, lane)
+                try:
+                    asyncio.run(ensure_topic_partitions(topic, max(MODERATION_PARTITIONS, self.processes)))
+                except Exception as e:
+                    logger.warning(f"[supervisor] Failed to ensure partitions for '{topic}': {e}")
+        self.serve_metrics()
+        logger.info(f"[supervisor] Starting {self.processes} workers on the {QUEUE_BACKEND} queue")
+        self.start()
+        try:
+            self.watch()
+        finally:
+            self.stop()
+
+
+if __name__ == "__main__":
+    configure_logging()
+    WorkerSupervisor().run()
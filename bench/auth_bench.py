@@ -0,0 +1,84 @@
+"""
+Per-request cost of the auth dependency `get_current_account`.
+
+Rows:
+  - before: an AuthService per request, `jwt.decode` on every call and the account
+    status read from the database (the code before the token cache);
+  - DB fallback: the shared verifier with its cache, status still from the database
+    (what runs until the revocation set is loaded);
+  - fast path: cached claims, the cached tier and the in-process revocation set,
+    no database.
+
+The database is sqlite in memory, so the rows show the in-process part of the cost;
+over the network to Postgres the query takes longer and the difference grows:
+
+    python -m bench.auth_bench --requests 20000
+"""
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+os.environ.setdefault("TESTING", "1")
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from db.database import Base
+import db.tables.account
+from repository.account.account_repository import AccountRepository
+from routes import api
+from service.auth_service import AuthService
+
+
+async def before(request, db):
+    # Прежняя версия зависимости
+    token = request.cookies.get("access_token")
+    auth = AuthService(account_repo=None, secret_key=api.JWT_SECRET)
+    payload = auth.verify_token(token)
+    account = await AccountRepository(db).get_status(payload["sub"])
+    if account is None or account.is_blocked:
+        raise HTTPException(status_code=403)
+    return account
+
+
+async def measure(dependency, request, db, n):
+    for _ in range(100):
+        await dependency(request=request, db=db)
+    start = time.perf_counter()
+    for _ in range(n):
+        await dependency(request=request, db=db)
+    return (time.perf_counter() - start) / n
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    engine = create_async_engine("sqlite+aiosqlite://", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with session_maker() as db:
+        account = await AccountRepository(db).create_account("bench", "password")
+        token = AuthService(account_repo=None, secret_key=api.JWT_SECRET).create_token(account.id, account.login)
+        request = SimpleNamespace(cookies={"access_token": token})
+
+        api.revoked_accounts.loaded = False
+        rows = [("before", await measure(before, request, db, args.requests))]
+        rows.append(("DB fallback", await measure(api.get_current_account, request, db, args.requests)))
+        api.revoked_accounts.loaded = True
+        rows.append(("fast path", await measure(api.get_current_account, request, db, args.requests)))
+    await engine.dispose()
+
+    print(f"{'path':>12} {'us/request':>11} {'speedup':>8}")
+    baseline = rows[0][1]
+    for name, per_request in rows:
+        print(f"{name:>12} {per_request * 1e6:>11.1f} {baseline / per_request:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
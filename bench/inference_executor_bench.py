@@ -0,0 +1,90 @@
+"""
+Compares inline, thread pool and process pool inference executors.
+
+Concurrent clients score batches while a heartbeat task measures how long the
+event loop is stalled; `--model-cost-ms` adds pure-Python work per call to mimic
+a heavier model that holds the GIL.
+
+    python -m bench.inference_executor_bench --clients 16 --calls 50 --batch 32 --model-cost-ms 5
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+from repository.model.local_model_repository import LocalModelRepository
+from service.inference_executor import create_inference_executor, INFERENCE_BACKENDS
+
+
+class GilHeavyModel:
+    def __init__(self, model, cost_ms: float):
+        self.model = model
+        self.cost_s = cost_ms / 1000
+
+    def predict_proba(self, features):
+        deadline = time.perf_counter() + self.cost_s
+        while time.perf_counter() < deadline:
+            pass
+        return self.model.predict_proba(features)
+
+
+async def heartbeat(stop: asyncio.Event, interval: float, lags: list):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run_backend(backend: str, model, args) -> dict:
+    executor = create_inference_executor(backend, args.workers)
+    executor.start(model)
+    features = np.random.default_rng(0).random((args.batch, 4))
+    # Прогрев: процессы пула стартуют лениво
+    await asyncio.gather(*(executor.predict_proba(features) for _ in range(args.workers)))
+
+    latencies, lags = [], []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop, 0.001, lags))
+
+    async def client():
+        for _ in range(args.calls):
+            start = time.perf_counter()
+            await executor.predict_proba(features)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await beat
+    executor.shutdown()
+    return {
+        "rows_per_s": args.clients * args.calls * args.batch / elapsed,
+        "p50_ms": np.percentile(latencies, 50) * 1000,
+        "p99_ms": np.percentile(latencies, 99) * 1000,
+        "max_loop_lag_ms": max(lags, default=0) * 1000,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--batch", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--model-cost-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    model = LocalModelRepository().train_model()
+    if args.model_cost_ms:
+        model = GilHeavyModel(model, args.model_cost_ms)
+
+    print(f"{'backend':>8} {'rows/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'max loop lag ms':>16}")
+    for backend in INFERENCE_BACKENDS:
+        r = await run_backend(backend, model, args)
+        print(f"{backend:>8} {r['rows_per_s']:>10.0f} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['max_loop_lag_ms']:>16.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
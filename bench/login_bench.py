@@ -0,0 +1,104 @@
+"""
+Login throughput under concurrency and what it does to the event loop.
+
+`--concurrency` clients log in `--logins` times in total (account lookup and password
+check, sqlite in memory) while a ticker measures how late the event loop wakes up
+every millisecond, i.e. how much a login burst delays every other request. Rows:
+  - md5 (before): the unsalted hash, checked on the event loop;
+  - <kdf> inline: the KDF on the event loop;
+  - <kdf> pool: the KDF in the bounded hashing pool (the code now).
+
+    python -m bench.login_bench --logins 200 --concurrency 32
+    python -m bench.login_bench --algorithm pbkdf2_sha256
+"""
+import argparse
+import asyncio
+import hashlib
+import time
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from db.database import Base
+import db.tables.account
+from repository.account.account_repository import AccountRepository
+from service.passwords import PasswordHasher
+
+
+class InlineHasher(PasswordHasher):
+    """Hashes on the event loop, as a plain call in the endpoint would."""
+    async def _run(self, func, *args):
+        return func(*args)
+
+
+async def ticker(delays, stopping):
+    loop = asyncio.get_running_loop()
+    while not stopping.is_set():
+        expected = loop.time() + 0.001
+        await asyncio.sleep(0.001)
+        delays.append(loop.time() - expected)
+
+
+async def run(session_maker, hasher, logins, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            async with session_maker() as db:
+                account = await AccountRepository(db, hasher=hasher).get_by_login_and_password("bench", "password")
+                assert account is not None
+
+    delays, stopping = [], asyncio.Event()
+    lag = asyncio.create_task(ticker(delays, stopping))
+    start = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - start
+    stopping.set()
+    await lag
+    delays.sort()
+    p99 = delays[int(len(delays) * 0.99)] if delays else 0.0
+    return logins / elapsed, p99, delays[-1] if delays else 0.0
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--algorithm", default="scrypt", choices=("scrypt", "pbkdf2_sha256"))
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    engine = create_async_engine("sqlite+aiosqlite://", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_maker = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    pool = PasswordHasher(args.algorithm, workers=args.workers, max_pending=args.logins)
+    inline = InlineHasher(args.algorithm)
+    async with session_maker() as db:
+        account = await AccountRepository(db, hasher=pool).create_account("bench", "password")
+
+    async def set_hash(password_hash):
+        async with session_maker() as db:
+            await db.execute(
+                text("UPDATE account SET password = :password WHERE id = :id"),
+                {"password": password_hash, "id": account.id},
+            )
+            await db.commit()
+
+    kdf_hash = pool.hash("password")
+    rows = (
+        ("md5 (before)", inline, hashlib.md5(b"password").hexdigest()),
+        (f"{args.algorithm} inline", inline, kdf_hash),
+        (f"{args.algorithm} pool", pool, kdf_hash),
+    )
+    print(f"{'hashing':>22} {'logins/s':>9} {'loop lag p99 ms':>16} {'max ms':>8}")
+    for name, hasher, stored in rows:
+        await set_hash(stored)
+        throughput, p99, worst = await run(session_maker, hasher, args.logins, args.concurrency)
+        print(f"{name:>22} {throughput:>9.0f} {p99 * 1000:>16.1f} {worst * 1000:>8.1f}")
+    pool.shutdown()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
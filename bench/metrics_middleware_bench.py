@@ -0,0 +1,88 @@
+"""
+Per-request overhead of the Prometheus middleware: no middleware, the former
+BaseHTTPMiddleware implementation and the pure ASGI one.
+
+Requests are driven straight through the ASGI interface (no sockets), so the
+difference between rows is the middleware itself.
+
+    python -m bench.metrics_middleware_bench --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.clients.middleware import PrometheusMiddleware, REQUEST_COUNT, REQUEST_DURATION
+
+
+class LegacyPrometheusMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        duration = time.time() - start_time
+        route = request.scope.get("route")
+        endpoint = route.path if route and hasattr(route, "path") else request.url.path
+        REQUEST_COUNT.labels(method=request.method, endpoint=endpoint, status=response.status_code).inc()
+        REQUEST_DURATION.labels(method=request.method, endpoint=endpoint).observe(duration)
+        return response
+
+
+def make_app(middleware=None):
+    app = FastAPI()
+
+    @app.get("/moderation_result/{task_id}")
+    async def result(task_id: int):
+        return {"task_id": task_id, "status": "completed"}
+
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def drive(app, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    def scope(i):
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": f"/moderation_result/{i}",
+            "raw_path": f"/moderation_result/{i}".encode(),
+            "root_path": "",
+            "query_string": b"",
+            "headers": [],
+            "client": ("127.0.0.1", 1234),
+            "server": ("127.0.0.1", 8000),
+        }
+
+    for i in range(100):
+        await app(scope(i), receive, send)
+    start = time.perf_counter()
+    for i in range(n):
+        await app(scope(i), receive, send)
+    return (time.perf_counter() - start) / n
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    baseline = await drive(make_app(), args.requests)
+    print(f"{'middleware':>20} {'us/request':>11} {'overhead us':>12}")
+    for name, middleware in (("none", None), ("BaseHTTPMiddleware", LegacyPrometheusMiddleware), ("pure ASGI", PrometheusMiddleware)):
+        per_request = baseline if middleware is None else await drive(make_app(middleware), args.requests)
+        print(f"{name:>20} {per_request * 1e6:>11.1f} {(per_request - baseline) * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""
+Memory held by N decoded cache entries as plain dicts, SimpleNamespace objects
+and ModerationRecord, plus the cost of decoding them from the cache payload.
+
+    python -m bench.record_memory_bench --records 1000000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+from json import loads
+from types import SimpleNamespace
+
+from repository.records import ModerationRecord
+
+
+def payloads(n: int) -> list:
+    return [
+        ModerationRecord(i, i, "completed", bool(i % 2), (i % 100) / 100, None, 0).to_cache()
+        for i in range(n)
+    ]
+
+
+DECODERS = {
+    "dict": loads,
+    "SimpleNamespace": lambda raw: SimpleNamespace(**dict(zip(ModerationRecord._fields, loads(raw)))),
+    "ModerationRecord": ModerationRecord.from_cache,
+}
+
+
+def measure(decode, raw: list) -> tuple:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    decoded = [decode(r) for r in raw]
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del decoded
+    return current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    raw = payloads(args.records)
+    print(f"{'type':>18} {'MB':>8} {'bytes/rec':>10} {'decode us/rec':>14}")
+    for name, decode in DECODERS.items():
+        size, elapsed = measure(decode, raw)
+        print(
+            f"{name:>18} {size / 2**20:>8.1f} {size / args.records:>10.0f} "
+            f"{elapsed / args.records * 1e6:>14.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
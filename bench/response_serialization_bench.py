@@ -0,0 +1,126 @@
+"""
+Per-response cost of serializing a /moderation_result hit.
+
+Rows, for a finished task already in the cache:
+  - model (before): ModerationResultResponse built from the record, then validated
+    against the response model and passed through `jsonable_encoder` by FastAPI;
+  - FastJSONResponse: a dict of the record's fields, encoded directly;
+  - pre-rendered: the body rendered when the result was cached, sent as is.
+
+"encode" is the serialization step alone and "request" the whole ASGI request through
+FastAPI (routing, parameters, response). FastJSONResponse uses orjson when it is
+installed; --no-orjson measures the standard json fallback:
+
+    python -m bench.response_serialization_bench --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.responses import FastJSONResponse, RenderedJSONResponse, moderation_result_body, render_moderation_result
+from dto.response import ModerationResultResponse
+from repository import records
+from repository.records import ModerationRecord
+
+RECORD = ModerationRecord(12345, 678, "completed", False, 0.123456789)
+BODY = render_moderation_result(RECORD)
+
+
+def model_response():
+    return ModerationResultResponse(
+        task_id=RECORD.id, status=RECORD.status, is_violation=RECORD.is_violation, probability=RECORD.probability,
+    )
+
+
+def encoders():
+    def before():
+        model = model_response()
+        return JSONResponse(jsonable_encoder(ModerationResultResponse.model_validate(model.model_dump()))).body
+
+    return (
+        ("model (before)", before),
+        ("FastJSONResponse", lambda: FastJSONResponse(moderation_result_body(RECORD)).body),
+        ("pre-rendered", lambda: RenderedJSONResponse(BODY).body),
+    )
+
+
+def make_app():
+    app = FastAPI()
+
+    @app.get("/before/{task_id}", response_model=ModerationResultResponse)
+    async def before(task_id: int):
+        return model_response()
+
+    @app.get("/fast/{task_id}", response_model=ModerationResultResponse, response_class=FastJSONResponse)
+    async def fast(task_id: int):
+        return FastJSONResponse(moderation_result_body(RECORD))
+
+    @app.get("/rendered/{task_id}", response_model=ModerationResultResponse, response_class=FastJSONResponse)
+    async def rendered(task_id: int):
+        return RenderedJSONResponse(BODY)
+
+    return app
+
+
+async def drive(app, path: str, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 8000),
+    }
+    for _ in range(100):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / n
+
+
+def time_encode(encode, n: int) -> float:
+    for _ in range(100):
+        encode()
+    start = time.perf_counter()
+    for _ in range(n):
+        encode()
+    return (time.perf_counter() - start) / n
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--no-orjson", action="store_true")
+    args = parser.parse_args()
+    if args.no_orjson:
+        records.orjson = None
+    print(f"json encoder: {'orjson' if records.orjson is not None else 'json'}")
+
+    app = make_app()
+    paths = ("/before/12345", "/fast/12345", "/rendered/12345")
+    print(f"{'response':>18} {'encode us':>10} {'request us':>11}")
+    for (name, encode), path in zip(encoders(), paths):
+        encode_cost = time_encode(encode, args.requests)
+        request_cost = await drive(app, path, args.requests)
+        print(f"{name:>18} {encode_cost * 1e6:>10.2f} {request_cost * 1e6:>11.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""
+Per-row decode cost of repository results: the old `SELECT *` + `dict(row)` +
+`to_bool` + `SimpleNamespace` path against explicit projections decoded into records.
+
+Rows come from a real sqlite database through SQLAlchemy, so driver and result
+processing costs are included; `--rows` rows are fetched and decoded `--repeat` times.
+
+    python -m bench.row_decode_bench --rows 10000 --repeat 5
+"""
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+
+from sqlalchemy import text, Boolean
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from db.database import Base
+import db.tables.item
+import db.tables.moderation_result
+from repository.item.item_repository import ITEM_COLUMNS
+from repository.moderation_result.moderation_result_repository import MODERATION_COLUMNS, MODERATION_TYPES
+from repository.records import ItemRecord, ModerationRecord, PendingTask
+
+
+def to_bool(val):
+    if isinstance(val, str):
+        return val.lower() != "false"
+    return bool(val)
+
+
+def legacy_item(row):
+    d = dict(row)
+    d["is_closed"] = to_bool(d.get("is_closed", False))
+    return SimpleNamespace(**d)
+
+
+def legacy_moderation(row):
+    d = dict(row)
+    if d.get("is_violation") is not None:
+        d["is_violation"] = to_bool(d["is_violation"])
+    return SimpleNamespace(**d)
+
+
+async def seed(session, n: int):
+    await session.execute(
+        text("INSERT INTO items (name, description, category, images_qty, is_closed) VALUES (:n, :d, 1, 3, false)"),
+        [{"n": f"item {i}", "d": "x" * 200} for i in range(n)],
+    )
+    await session.execute(
+        text(
+            "INSERT INTO moderation_results (item_id, status, is_violation, probability, retry_count) "
+            "VALUES (:i, 'completed', true, 0.5, 0)"
+        ),
+        [{"i": i + 1} for i in range(n)],
+    )
+    await session.commit()
+
+
+async def measure(session, query, decode, repeat: int, mappings: bool) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = await session.execute(query)
+        rows = result.mappings().all() if mappings else result.all()
+        decoded = [decode(row) for row in rows]
+        best = min(best, (time.perf_counter() - start) / len(decoded))
+    return best
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_async_engine("sqlite+aiosqlite://", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession)() as session:
+        await seed(session, args.rows)
+        cases = [
+            ("item SELECT *", text("SELECT * FROM items"), legacy_item, True),
+            ("item record", text(f"SELECT {ITEM_COLUMNS} FROM items").columns(is_closed=Boolean), ItemRecord.from_row, False),
+            ("moderation SELECT *", text("SELECT * FROM moderation_results"), legacy_moderation, True),
+            (
+                "moderation record",
+                text(f"SELECT {MODERATION_COLUMNS} FROM moderation_results").columns(**MODERATION_TYPES),
+                ModerationRecord.from_row,
+                False,
+            ),
+            ("pending SELECT *", text("SELECT * FROM moderation_results"), legacy_moderation, True),
+            ("pending id only", text("SELECT id FROM moderation_results"), PendingTask.from_row, False),
+        ]
+        print(f"{'case':>20} {'us/row':>8}")
+        for name, query, decode, mappings in cases:
+            per_row = await measure(session, query, decode, args.repeat, mappings)
+            print(f"{name:>20} {per_row * 1e6:>8.2f}")
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""
+API startup time, phase by phase.
+
+Import: `import routes.api` in a fresh interpreter, with the heaviest top-level
+imports from `-X importtime` and the heavy packages that are still not loaded
+afterwards (they are imported lazily during the lifespan).
+
+Lifespan (--lifespan): runs the real lifespan against the configured Kafka,
+Postgres and MLflow and prints the duration of every phase. The phases run
+concurrently, so the wall time is less than their sum.
+
+    python -m bench.startup_bench
+    python -m bench.startup_bench --lifespan
+"""
+import argparse
+import asyncio
+import os
+import re
+import subprocess
+import sys
+import time
+
+HEAVY_MODULES = ("mlflow", "sklearn", "sentry_sdk", "aiokafka", "scipy", "pandas")
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+IMPORT_PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import routes.api
+print(time.perf_counter() - start)
+print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))
+"""
+
+
+def measure_import(top: int):
+    env = dict(os.environ, TESTING="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", IMPORT_PROBE],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    seconds, loaded = result.stdout.splitlines()[-2:]
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        # Прямые импорты routes.api (отступ в два пробела)
+        if match and len(match.group(3)) == 2:
+            imports.append((int(match.group(2)), match.group(4)))
+    imports.sort(reverse=True)
+
+    print(f"import routes.api: {float(seconds):.3f}s")
+    print(f"heavy modules loaded at import: {loaded or 'none'}")
+    print(f"{'module':>60} {'cumulative ms':>14}")
+    for micros, name in imports[:top]:
+        print(f"{name:>60} {micros / 1000:>14.1f}")
+
+
+async def measure_lifespan():
+    from routes import api
+
+    start = time.perf_counter()
+    async with api.lifespan(api.app):
+        wall = time.perf_counter() - start
+    state = api.startup_state
+    print(f"\n{'phase':>20} {'seconds':>8}")
+    for name, seconds in state.phases.items():
+        marker = " (failed)" if name in state.failed else ""
+        print(f"{name:>20} {seconds:>8.3f}{marker}")
+    print(f"{'sum of phases':>20} {sum(state.phases.values()):>8.3f}")
+    print(f"{'wall':>20} {wall:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--lifespan", action="store_true", help="also run the lifespan against real services")
+    args = parser.parse_args()
+
+    measure_import(args.top)
+    if args.lifespan:
+        asyncio.run(measure_lifespan())
+
+
+if __name__ == "__main__":
+    main()
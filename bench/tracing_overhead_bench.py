@@ -0,0 +1,132 @@
+"""
+Per-request cost of request/response logging and Sentry tracing.
+
+Rows, in order (Sentry integrations can't be uninstalled, so the rows without
+Sentry run first):
+  - f-string logging with INFO filtered out (the former endpoint code);
+  - sampled structured logging through the queue handler;
+  - Sentry with tracing off, with traces_sample_rate=1.0 and with the TraceSampler.
+
+Events go to a no-op transport, so the numbers are the in-process cost only.
+Sampled log records go to stderr:
+
+    python -m bench.tracing_overhead_bench --requests 5000 2>/dev/null
+"""
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import sentry_sdk
+from fastapi import FastAPI
+from pydantic import BaseModel
+from sentry_sdk.transport import Transport
+
+from app.logs import configure_logging, log_event, stop_logging
+from app.tracing import TraceSampler
+
+logger = logging.getLogger("bench.endpoint")
+
+
+class Body(BaseModel):
+    seller_id: int
+    item_id: int
+    name: str
+    description: str
+    category: int
+    images_qty: int
+
+
+class Result(BaseModel):
+    is_violation: bool
+    probability: float
+
+
+class NullTransport(Transport):
+    def capture_envelope(self, envelope):
+        pass
+
+
+BODY = json.dumps({
+    "seller_id": 1, "item_id": 2, "name": "item", "description": "d" * 200, "category": 3, "images_qty": 1,
+}).encode()
+
+
+def make_app(structured: bool):
+    app = FastAPI()
+
+    @app.post("/predict")
+    async def predict(request: Body):
+        if structured:
+            log_event(logger, "predict.request", request=request)
+        else:
+            logger.info(f'Got new request: {request}.')
+        result = Result(is_violation=False, probability=0.1)
+        if structured:
+            log_event(logger, "predict.response", result=result)
+        else:
+            logger.info(f'Response: {result}.')
+        return result
+
+    return app
+
+
+async def drive(app, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": BODY, "more_body": False}
+
+    async def send(message):
+        pass
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": "/predict",
+        "raw_path": b"/predict",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(BODY)).encode())],
+        "client": ("127.0.0.1", 1234),
+        "server": ("127.0.0.1", 8000),
+    }
+    for _ in range(100):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / n
+
+
+def init_sentry(**options):
+    sentry_sdk.init(dsn="https://public@example.invalid/1", transport=NullTransport, **options)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    sampler = TraceSampler(default_rate=0.05, error_rate=0.25)
+    rows = (
+        ("f-string log, INFO filtered", False, lambda: logging.getLogger().setLevel(logging.WARNING)),
+        ("sampled structured log", True, lambda: configure_logging(logging.INFO)),
+        ("sentry, tracing off", True, lambda: init_sentry()),
+        ("sentry, traces 1.0", True, lambda: init_sentry(traces_sample_rate=1.0)),
+        ("sentry, TraceSampler", True, lambda: init_sentry(
+            traces_sampler=sampler, before_send_transaction=sampler.before_send_transaction,
+        )),
+    )
+    print(f"{'configuration':>30} {'us/request':>11}")
+    for name, structured, setup in rows:
+        setup()
+        per_request = await drive(make_app(structured), args.requests)
+        print(f"{name:>30} {per_request * 1e6:>11.1f}")
+    stop_logging()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+"""
+Scaling benchmark for the moderation worker pool.
+
+Each process plays the role of one moderation-worker replica from the same consumer
+group: it owns an equal share of the messages (as it would own an equal share of
+partitions keyed by item_id) and runs the CPU part of handle_moderation on them.
+
+    python -m bench.worker_scaling_bench --messages 20000
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+from dto.request import PredictRequest
+from repository.model.local_model_repository import LocalModelRepository
+from service.model_service import ModelService
+
+
+def consume_share(share: int, item_ids_offset: int, ready, go, done):
+    repo = LocalModelRepository()
+    service = ModelService(model_repository=repo, item_repository=None, model=repo.train_model())
+    ready.put(os.getpid())
+    go.wait()
+    for item_id in range(item_ids_offset, item_ids_offset + share):
+        service.predict(PredictRequest(
+            item_id=item_id,
+            name="Item",
+            description="d" * (item_id % 500 + 1),
+            category=item_id % 10,
+            images_qty=item_id % 12,
+        ))
+    done.put(os.getpid())
+
+
+def run(processes: int, messages: int) -> float:
+    ctx = multiprocessing.get_context("spawn")
+    ready, done, go = ctx.Queue(), ctx.Queue(), ctx.Event()
+    share = messages // processes
+    workers = [
+        ctx.Process(target=consume_share, args=(share, i * share, ready, go, done))
+        for i in range(processes)
+    ]
+    for w in workers:
+        w.start()
+    for _ in workers:
+        ready.get()
+    start = time.perf_counter()
+    go.set()
+    for _ in workers:
+        done.get()
+    elapsed = time.perf_counter() - start
+    for w in workers:
+        w.join()
+    return share * processes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--max-processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    counts = sorted({1, 2, 4, args.max_processes} | set(range(1, args.max_processes + 1, max(1, args.max_processes // 4))))
+    counts = [c for c in counts if c <= args.max_processes]
+    baseline = None
+    print(f"{'processes':>9} {'msg/s':>10} {'speedup':>8} {'efficiency':>10}")
+    for n in counts:
+        throughput = run(n, args.messages)
+        baseline = baseline or throughput
+        speedup = throughput / baseline
+        print(f"{n:>9} {throughput:>10.0f} {speedup:>8.2f} {speedup / n:>10.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,12 @@ DB_PORT = os.getenv("DB_PORT", "5432")
 DB_USER = os.getenv("DB_USER", "postgres")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "postgres")
 DB_NAME = os.getenv("DB_NAME", "postgres")
+# Пул соединений: DB_POOL_SIZE постоянных и до DB_MAX_OVERFLOW дополнительных под нагрузкой
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
 
 sqlalchemy_db = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-engine = create_async_engine(sqlalchemy_db, echo=True)
+engine = create_async_engine(sqlalchemy_db, echo=True, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW)
 session_maker = async_sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=AsyncSession)
 
 class Base(DeclarativeBase):
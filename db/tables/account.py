@@ -1,10 +1,11 @@
 from db.database import Base
-from sqlalchemy import Column, Integer, Text, Boolean
+from sqlalchemy import Column, Integer, Text, Boolean, false, text
 
 
 class Account(Base):
     __tablename__ = "account"
     id = Column(Integer, primary_key=True, index=True)
-    login = Column(Text, nullable=False)
+    login = Column(Text, nullable=False, index=True)
     password = Column(Text, nullable=False)
-    is_blocked = Column(Boolean, nullable=False, default=False, server_default="false")
+    is_blocked = Column(Boolean, nullable=False, default=False, server_default=false())
+    tier = Column(Text, nullable=False, default="free", server_default=text("'free'"))
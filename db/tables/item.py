@@ -1,5 +1,6 @@
 from db.database import Base
-from sqlalchemy import Column, Integer, String, Text, Boolean
+from db.tables.seller import Seller
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, false
 
 class Item(Base):
     __tablename__ = "items"
@@ -8,4 +9,5 @@ class Item(Base):
     description = Column(Text, nullable=False)
     images_qty = Column(Integer, nullable=False)
     category = Column(Integer, nullable=False)
-    is_closed = Column(Boolean, nullable=False, default=False, server_default="false")
+    is_closed = Column(Boolean, nullable=False, default=False, server_default=false())
+    seller_id = Column(Integer, ForeignKey(Seller.id, ondelete="SET NULL"), nullable=True, index=True)
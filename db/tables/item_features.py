@@ -0,0 +1,13 @@
+from db.database import Base
+from sqlalchemy import Column, Integer, Float, ForeignKey
+
+
+class ItemFeatures(Base):
+    """Normalized feature vector of an item, columns follow FEATURE_SCHEMA.store_columns."""
+    __tablename__ = "item_features"
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    schema_version = Column(Integer, nullable=False)
+    f_is_verified_seller = Column(Float, nullable=False)
+    f_images_qty = Column(Float, nullable=False)
+    f_description_length = Column(Float, nullable=False)
+    f_category = Column(Float, nullable=False)
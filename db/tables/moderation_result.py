@@ -1,8 +1,18 @@
 from db.database import Base
-from sqlalchemy import Column, Integer, String, Text, Boolean, Float, DateTime, ForeignKey, func
+from sqlalchemy import Column, Integer, String, Text, Boolean, Float, DateTime, ForeignKey, Index, func, text
 
 class ModerationResult(Base):
     __tablename__ = "moderation_results"
+    __table_args__ = (
+        # Очередь QUEUE_BACKEND=postgres выбирает только pending-строки, по полосам
+        Index(
+            "ix_moderation_results_pending",
+            "lane",
+            "id",
+            postgresql_where=text("status = 'pending'"),
+            sqlite_where=text("status = 'pending'"),
+        ),
+    )
     id = Column(Integer, primary_key=True, index=True)
     item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), nullable=False, index=True)
     status = Column(String, nullable=False)
@@ -12,6 +22,10 @@ class ModerationResult(Base):
     retry_count = Column(Integer, nullable=False, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     processed_at = Column(DateTime(timezone=True), nullable=True)
+    # Когда воркер забрал задачу из очереди QUEUE_BACKEND=postgres
+    claimed_at = Column(DateTime(timezone=True), nullable=True)
+    # Полоса приоритета: interactive, bulk или retry (app/clients/lanes.py)
+    lane = Column(String, nullable=False, server_default="interactive")
 
     def to_dict(self):
         return {
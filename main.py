@@ -1,4 +1,28 @@
+import os
+
 import uvicorn
 
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+# Отдельный порт с метриками всех воркеров; 0 — только /metrics на порту API
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+# Автоперезагрузка при изменении кода — только для локальной разработки (с одним воркером)
+API_RELOAD = os.getenv("API_RELOAD", "").lower() in ("1", "true", "yes")
+
 if __name__ == "__main__":
-    uvicorn.run("api:app", host="0.0.0.0", port=8000, reload=True)
+    if API_WORKERS > 1 or METRICS_PORT:
+        # Каждый воркер uvicorn пишет метрики в общий каталог, /metrics суммирует их.
+        # Переменная должна быть задана до первого импорта prometheus_client.
+        os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/prometheus-api")
+    from app.metrics_exporter import prepare_multiproc_dir, start_metrics_server
+    prepare_multiproc_dir()
+    if METRICS_PORT:
+        start_metrics_server(METRICS_PORT)
+    uvicorn.run(
+        "routes.api:app",
+        host=API_HOST,
+        port=API_PORT,
+        workers=API_WORKERS,
+        reload=API_RELOAD and API_WORKERS == 1,
+    )
@@ -0,0 +1,2 @@
+ALTER TABLE items ADD COLUMN seller_id INTEGER REFERENCES sellers(id) ON DELETE SET NULL;
+CREATE INDEX IF NOT EXISTS ix_items_seller_id ON items (seller_id);
@@ -0,0 +1,23 @@
+CREATE TABLE IF NOT EXISTS item_features (
+    item_id INTEGER PRIMARY KEY REFERENCES items(id) ON DELETE CASCADE,
+    schema_version INTEGER NOT NULL,
+    f_is_verified_seller DOUBLE PRECISION NOT NULL,
+    f_images_qty DOUBLE PRECISION NOT NULL,
+    f_description_length DOUBLE PRECISION NOT NULL,
+    f_category DOUBLE PRECISION NOT NULL
+);
+
+-- Заполнение для уже существующих объявлений (FEATURE_SCHEMA v1)
+INSERT INTO item_features (
+    item_id, schema_version, f_is_verified_seller, f_images_qty, f_description_length, f_category
+)
+SELECT
+    items.id,
+    1,
+    CASE WHEN sellers.is_verified_seller THEN 1.0 ELSE 0.0 END,
+    LEAST(items.images_qty, 10) / 10.0,
+    length(items.description) / 1000.0,
+    items.category / 100.0
+FROM items
+LEFT JOIN sellers ON sellers.id = items.seller_id
+ON CONFLICT (item_id) DO NOTHING;
@@ -0,0 +1,4 @@
+-- Очередь задач в Postgres (QUEUE_BACKEND=postgres): воркер забирает pending-строки
+-- с арендой claimed_at, просроченная аренда означает, что воркер упал
+ALTER TABLE moderation_results ADD COLUMN claimed_at TIMESTAMP WITH TIME ZONE;
+CREATE INDEX IF NOT EXISTS ix_moderation_results_pending ON moderation_results (id) WHERE status = 'pending';
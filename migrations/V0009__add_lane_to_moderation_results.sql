@@ -0,0 +1,5 @@
+-- Полоса приоритета задачи (interactive, bulk, retry): очередь QUEUE_BACKEND=postgres
+-- забирает pending-строки каждой полосы отдельно, по весам
+ALTER TABLE moderation_results ADD COLUMN lane VARCHAR NOT NULL DEFAULT 'interactive';
+DROP INDEX IF EXISTS ix_moderation_results_pending;
+CREATE INDEX IF NOT EXISTS ix_moderation_results_pending ON moderation_results (lane, id) WHERE status = 'pending';
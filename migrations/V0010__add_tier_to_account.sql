@@ -0,0 +1,2 @@
+-- Тариф аккаунта: по нему выбираются лимиты частоты запросов (RATE_LIMIT_TIERS)
+ALTER TABLE account ADD COLUMN tier TEXT NOT NULL DEFAULT 'free';
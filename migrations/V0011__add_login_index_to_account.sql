@@ -0,0 +1,2 @@
+-- Вход ищет аккаунт по логину, а пароль сверяет уже в приложении
+CREATE INDEX IF NOT EXISTS ix_account_login ON account (login);
@@ -0,0 +1,35 @@
+-- Вектор в item_features пишет приложение (create_item, set_verified). Любая другая запись
+-- в items или sellers удаляет вектор затронутых объявлений: get_feature_matrix пересчитает
+-- его из исходных колонок при следующем чтении
+CREATE OR REPLACE FUNCTION invalidate_item_features() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM item_features WHERE item_id = NEW.id;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION invalidate_seller_item_features() RETURNS trigger AS $$
+BEGIN
+    DELETE FROM item_features WHERE item_id IN (SELECT id FROM items WHERE seller_id = NEW.id);
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS items_invalidate_features ON items;
+CREATE TRIGGER items_invalidate_features
+AFTER UPDATE OF description, images_qty, category, seller_id ON items
+FOR EACH ROW
+WHEN (
+    OLD.description IS DISTINCT FROM NEW.description
+    OR OLD.images_qty IS DISTINCT FROM NEW.images_qty
+    OR OLD.category IS DISTINCT FROM NEW.category
+    OR OLD.seller_id IS DISTINCT FROM NEW.seller_id
+)
+EXECUTE FUNCTION invalidate_item_features();
+
+DROP TRIGGER IF EXISTS sellers_invalidate_item_features ON sellers;
+CREATE TRIGGER sellers_invalidate_item_features
+AFTER UPDATE OF is_verified_seller ON sellers
+FOR EACH ROW
+WHEN (OLD.is_verified_seller IS DISTINCT FROM NEW.is_verified_seller)
+EXECUTE FUNCTION invalidate_seller_item_features();
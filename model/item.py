@@ -1,8 +1,9 @@
 from pydantic import BaseModel, Field, StrictInt
-from typing import Annotated
+from typing import Annotated, Optional
 
 class Item(BaseModel):
     name: Annotated[str, Field(min_length=1)]
     description: Annotated[str, Field(min_length=1)]
     category: Annotated[StrictInt, Field(ge=0)]
     images_qty: Annotated[StrictInt, Field(ge=0)] 
+    seller_id: Optional[Annotated[StrictInt, Field(ge=0)]] = None
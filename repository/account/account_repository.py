@@ -1,76 +1,146 @@
-import hashlib
-from types import SimpleNamespace
+import logging
 
-from sqlalchemy import text
+from sqlalchemy import text, Boolean
 
+from app.instrumentation import db_query
+from repository.account.account_tier_cache import account_tier_cache
+from repository.records import AccountRecord, AccountStatus
+from service.passwords import password_hasher
 
-class AccountRepository:
-    def __init__(self, db):
-        self.db = db
+logger = logging.getLogger(__name__)
 
-    def hash_password(self, password: str) -> str:
-        return hashlib.md5(password.encode()).hexdigest()
+# Порядок колонок совпадает с полями AccountRecord
+ACCOUNT_COLUMNS = "id, login, password, is_blocked, tier"
 
-    def to_bool(self, val):
-        if isinstance(val, str):
-            return val.lower() != "false"
-        return bool(val)
 
-    def to_obj(self, row):
-        if row is None:
-            return None
-        d = dict(row)
-        d["is_blocked"] = self.to_bool(d["is_blocked"])
-        return SimpleNamespace(**d)
+class AccountRepository:
+    def __init__(self, db, revoked_accounts=None, hasher=password_hasher, tier_cache=account_tier_cache):
+        self.db = db
+        # RevokedAccounts: блокировка и удаление через этот репозиторий отзывают выданные токены в
+        # течение REVOKED_ACCOUNTS_REFRESH_INTERVAL. Блокировка прямо в БД доходит до проверки токенов
+        # только по истечении ACCOUNT_TIER_CACHE_TTL (или после перезапуска, когда множество засевается)
+        self.revoked_accounts = revoked_accounts
+        self.hasher = hasher
+        self.tier_cache = tier_cache
 
     async def create_account(self, login: str, password: str):
+        return await self._insert_account(login, await self.hasher.hash_async(password))
+
+    @db_query("insert_account")
+    async def _insert_account(self, login: str, password_hash: str):
         result = await self.db.execute(
             text(
                 "INSERT INTO account (login, password, is_blocked) "
                 "VALUES (:login, :password, false) "
-                "RETURNING *"
-            ),
-            {"login": login, "password": self.hash_password(password)},
+                f"RETURNING {ACCOUNT_COLUMNS}"
+            ).columns(is_blocked=Boolean),
+            {"login": login, "password": password_hash},
         )
+        account = AccountRecord.from_row(result.first())
         await self.db.commit()
-        return self.to_obj(result.mappings().first())
+        return account
 
+    @db_query("select_account")
     async def get_by_id(self, account_id: int):
         result = await self.db.execute(
-            text("SELECT * FROM account WHERE id = :id LIMIT 1"),
+            text(f"SELECT {ACCOUNT_COLUMNS} FROM account WHERE id = :id LIMIT 1").columns(is_blocked=Boolean),
             {"id": account_id},
         )
-        return self.to_obj(result.mappings().first())
+        return AccountRecord.from_row(result.first())
 
+    @db_query("select_account_status")
+    async def get_status(self, account_id: int):
+        """What the auth check needs on every request, without the password hash."""
+        result = await self.db.execute(
+            text("SELECT id, login, is_blocked, tier FROM account WHERE id = :id LIMIT 1").columns(is_blocked=Boolean),
+            {"id": account_id},
+        )
+        account = AccountStatus.from_row(result.first())
+        if account is not None and not account.is_blocked and self.tier_cache is not None:
+            self.tier_cache.put(account.id, account.tier)
+        return account
+
+    @db_query("delete_account")
     async def delete_account(self, account_id: int) -> bool:
-        account = await self.get_by_id(account_id)
-        if account is None:
-            return False
-        await self.db.execute(
-            text("DELETE FROM account WHERE id = :id"),
+        result = await self.db.execute(
+            text("DELETE FROM account WHERE id = :id RETURNING id"),
             {"id": account_id},
         )
+        deleted = result.first() is not None
         await self.db.commit()
-        return True
+        if deleted:
+            await self._revoke(account_id)
+        return deleted
 
+    @db_query("block_account")
     async def block_account(self, account_id: int):
         result = await self.db.execute(
             text(
                 "UPDATE account SET is_blocked = true "
-                "WHERE id = :id RETURNING *"
-            ),
+                f"WHERE id = :id RETURNING {ACCOUNT_COLUMNS}"
+            ).columns(is_blocked=Boolean),
             {"id": account_id},
         )
+        account = AccountRecord.from_row(result.first())
         await self.db.commit()
-        return self.to_obj(result.mappings().first())
+        if account is not None:
+            await self._revoke(account.id)
+        return account
+
+    async def _revoke(self, account_id: int) -> None:
+        if self.tier_cache is not None:
+            self.tier_cache.invalidate(account_id)
+        if self.revoked_accounts is None:
+            return
+        try:
+            await self.revoked_accounts.revoke(account_id)
+        except Exception as e:
+            # Изменение в БД уже закоммичено: без Redis токены отзовутся по истечении ACCOUNT_TIER_CACHE_TTL
+            logger.error(f"Failed to revoke tokens of account {account_id}: {e}")
+
+    @db_query("select_blocked_account_ids")
+    async def get_blocked_ids(self) -> list:
+        """Ids of blocked accounts, to seed the revocation set."""
+        result = await self.db.execute(text("SELECT id FROM account WHERE is_blocked"))
+        return [row[0] for row in result.all()]
+
+    @db_query("select_accounts_by_login")
+    async def get_by_login(self, login: str) -> list:
+        """Accounts with the login, oldest first: logins are not unique."""
+        result = await self.db.execute(
+            text(f"SELECT {ACCOUNT_COLUMNS} FROM account WHERE login = :login ORDER BY id").columns(is_blocked=Boolean),
+            {"login": login},
+        )
+        return [AccountRecord.from_row(row) for row in result.all()]
 
     async def get_by_login_and_password(self, login: str, password: str):
+        """The first account with the login whose hash `password` matches, otherwise None."""
+        accounts = await self.get_by_login(login)
+        if not accounts:
+            # Для несуществующего логина хеш всё равно считается: время ответа не выдаёт, есть ли логин
+            await self.hasher.verify_async(password, await self.hasher.dummy_hash())
+            return None
+        for account in accounts:
+            if await self.hasher.verify_async(password, account.password):
+                return account
+        return None
+
+    async def rehash_password(self, account, password: str) -> bool:
+        """
+        Re-hashes the password of a just verified `account` if its hash is legacy MD5 or
+        was made with older parameters. Returns True if the hash was replaced.
+        """
+        if not self.hasher.needs_rehash(account.password):
+            return False
+        return await self._replace_password_hash(account.id, account.password, await self.hasher.hash_async(password))
+
+    @db_query("update_account_password")
+    async def _replace_password_hash(self, account_id: int, old_hash: str, new_hash: str) -> bool:
+        # Условие на старый хеш: одновременная смена пароля не перезаписывается
         result = await self.db.execute(
-            text(
-                "SELECT * FROM account "
-                "WHERE login = :login AND password = :password "
-                "LIMIT 1"
-            ),
-            {"login": login, "password": self.hash_password(password)},
+            text("UPDATE account SET password = :new_hash WHERE id = :id AND password = :old_hash RETURNING id"),
+            {"id": account_id, "old_hash": old_hash, "new_hash": new_hash},
         )
-        return self.to_obj(result.mappings().first())
+        replaced = result.first() is not None
+        await self.db.commit()
+        return replaced
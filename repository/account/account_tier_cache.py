@@ -0,0 +1,50 @@
+import os
+import time
+
+# Через сколько секунд смена тарифа в БД доходит до проверки токенов
+ACCOUNT_TIER_CACHE_TTL = float(os.getenv("ACCOUNT_TIER_CACHE_TTL", "60"))
+ACCOUNT_TIER_CACHE_MAX_SIZE = int(os.getenv("ACCOUNT_TIER_CACHE_MAX_SIZE", "100000"))
+
+MISSING = object()
+
+
+class AccountTierCache:
+    """
+    Per-process cache of account tiers, filled by AccountRepository.get_status.
+
+    The tier is not taken from the token: a token outlives a tier change. Entries
+    expire after `ttl` seconds, so a change made in the database is seen by every
+    process within `ttl`.
+    """
+    def __init__(self, ttl: float = ACCOUNT_TIER_CACHE_TTL, max_size: int = ACCOUNT_TIER_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+
+    def get(self, account_id):
+        entry = self._entries.get(account_id)
+        if entry is None:
+            return MISSING
+        tier, expires_at = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(account_id, None)
+            return MISSING
+        return tier
+
+    def put(self, account_id, tier: str):
+        if account_id not in self._entries and len(self._entries) >= self.max_size:
+            # Словарь хранит порядок вставки: вытесняем самую старую запись
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[account_id] = (tier, time.monotonic() + self.ttl)
+
+    def invalidate(self, account_id=None):
+        if account_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(account_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+account_tier_cache = AccountTierCache()
@@ -0,0 +1,59 @@
+import hashlib
+
+from redis.exceptions import NoScriptError
+
+from app.clients.redis import get_redis_connection
+
+RATE_LIMIT_KEY_PREFIX = "rate-limit"
+
+# Корзина — hash {tokens, ts}. Время берётся из Redis, а не из процесса API, чтобы
+# расхождение часов между серверами не давало лишних токенов. Скрипт выполняется
+# атомарно: пополнение, проверка и списание не перемешиваются между процессами
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {granted, tostring(tokens)}
+"""
+
+
+def bucket_key(account_id, endpoint: str) -> str:
+    return f"{RATE_LIMIT_KEY_PREFIX}:{endpoint}:{account_id}"
+
+
+class RateLimitRepository:
+    """
+    Token buckets in Redis, one per account and endpoint.
+
+    A bucket holds up to `burst` tokens and refills at `rate` tokens per second;
+    a key that has expired is a full bucket.
+    """
+    def __init__(self):
+        # Скрипт вызывается по SHA1 (EVALSHA): текст уходит в Redis, только если его там ещё нет
+        self.script_sha = hashlib.sha1(TOKEN_BUCKET_SCRIPT.encode()).hexdigest()
+
+    async def take(self, account_id, endpoint: str, rate: float, burst: int, requested: int = 1):
+        """
+        Takes up to `requested` tokens in one round trip. Returns (granted, retry_after):
+        how many tokens were taken and, when none were, seconds until the next one.
+        """
+        key = bucket_key(account_id, endpoint)
+        async with get_redis_connection() as connection:
+            try:
+                granted, tokens = await connection.evalsha(self.script_sha, 1, key, rate, burst, requested)
+            except NoScriptError:
+                # Новый или перезапущенный Redis: EVAL выполняет скрипт и кладёт его в кэш скриптов
+                granted, tokens = await connection.eval(TOKEN_BUCKET_SCRIPT, 1, key, rate, burst, requested)
+        granted = int(granted)
+        retry_after = 0.0 if granted else max(0.0, (1 - float(tokens)) / rate)
+        return granted, retry_after
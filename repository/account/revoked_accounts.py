@@ -0,0 +1,80 @@
+import asyncio
+import logging
+import os
+
+from app.clients.redis import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+REVOKED_ACCOUNTS_KEY = "revoked-accounts"
+# Счётчик изменений множества: процессы перечитывают множество, только когда он сдвинулся
+REVOKED_ACCOUNTS_VERSION_KEY = "revoked-accounts-version"
+# Как быстро блокировка из другого процесса доходит до проверки токенов
+REVOKED_ACCOUNTS_REFRESH_INTERVAL = float(os.getenv("REVOKED_ACCOUNTS_REFRESH_INTERVAL", "2"))
+
+
+class RevokedAccounts:
+    """
+    Ids of blocked and deleted accounts: a Redis set mirrored in every process.
+
+    The auth check looks ids up in the in-process copy instead of reading the account
+    row on every request. The copy is re-read every `refresh_interval` seconds, and
+    only when the version counter next to the set has moved. Until the first read
+    succeeds `loaded` is False and callers have to check the database themselves.
+    """
+    def __init__(self, refresh_interval: float = REVOKED_ACCOUNTS_REFRESH_INTERVAL):
+        self.refresh_interval = refresh_interval
+        self.ids = frozenset()
+        self.loaded = False
+        self._version = None
+        self._task = None
+
+    def is_revoked(self, account_id) -> bool:
+        return account_id in self.ids
+
+    async def revoke(self, *account_ids) -> None:
+        if not account_ids:
+            return
+        async with get_redis_connection() as connection:
+            pipeline = connection.pipeline(transaction=True)
+            pipeline.sadd(REVOKED_ACCOUNTS_KEY, *account_ids)
+            pipeline.incr(REVOKED_ACCOUNTS_VERSION_KEY)
+            await pipeline.execute()
+        # В своём процессе блокировка действует сразу, не дожидаясь перечитывания
+        self.ids = self.ids | frozenset(account_ids)
+
+    async def refresh(self) -> None:
+        async with get_redis_connection() as connection:
+            version = await connection.get(REVOKED_ACCOUNTS_VERSION_KEY)
+            if self.loaded and version == self._version:
+                return
+            # Изменение между двумя чтениями сдвинет версию, и следующий refresh перечитает множество
+            members = await connection.smembers(REVOKED_ACCOUNTS_KEY)
+        self.ids = frozenset(int(account_id) for account_id in members)
+        self._version = version
+        self.loaded = True
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.warning(f"Failed to read revoked accounts: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+revoked_accounts = RevokedAccounts()
@@ -1,65 +1,162 @@
-import time
-from types import SimpleNamespace
+import numpy as np
+from sqlalchemy import text, bindparam, Boolean
+from app.instrumentation import db_query, stage, FEATURES
+from repository.records import ItemRecord
+from repository.seller.seller_cache import seller_verification_cache
+from service.features import FEATURE_SCHEMA
 
-from sqlalchemy import text
-from app.metrics import DB_QUERY_DURATION
+# Порядок колонок совпадает с полями ItemRecord
+ITEM_COLUMNS = "items.id, items.name, items.description, items.category, items.images_qty, items.is_closed, items.seller_id"
+
+GET_ITEM_QUERY = text(
+    f"SELECT {ITEM_COLUMNS}, sellers.is_verified_seller FROM items "
+    "LEFT JOIN sellers ON sellers.id = items.seller_id "
+    "WHERE items.id = :id LIMIT 1"
+).columns(is_closed=Boolean, is_verified_seller=Boolean)
+
+INSERT_ITEM_QUERY = text(
+    "INSERT INTO items (name, description, category, images_qty, seller_id) "
+    "VALUES (:name, :description, :category, :images_qty, :seller_id) "
+    f"RETURNING {ITEM_COLUMNS.replace('items.', '')}"
+).columns(is_closed=Boolean)
+
+CLOSE_ITEM_QUERY = text(
+    "UPDATE items SET is_closed = true "
+    f"WHERE id = :id RETURNING {ITEM_COLUMNS.replace('items.', '')}"
+).columns(is_closed=Boolean)
+
+# Колонки идут в порядке FEATURE_SCHEMA.columns, первой — id объявления
+FEATURE_ROWS_QUERY = text(
+    "SELECT items.id, sellers.is_verified_seller, items.images_qty, "
+    "length(items.description) AS description_length, items.category "
+    "FROM items LEFT JOIN sellers ON sellers.id = items.seller_id "
+    "WHERE items.id IN :ids"
+).bindparams(bindparam("ids", expanding=True))
+
+STORED_FEATURES_QUERY = text(
+    f"SELECT item_id, {', '.join(FEATURE_SCHEMA.store_columns)} FROM item_features "
+    "WHERE item_id IN :ids AND schema_version = :version"
+).bindparams(bindparam("ids", expanding=True))
+
+UPSERT_FEATURES_QUERY = text(
+    f"INSERT INTO item_features (item_id, schema_version, {', '.join(FEATURE_SCHEMA.store_columns)}) "
+    f"VALUES (:item_id, :schema_version, {', '.join(':' + c for c in FEATURE_SCHEMA.store_columns)}) "
+    "ON CONFLICT (item_id) DO UPDATE SET schema_version = excluded.schema_version, "
+    + ", ".join(f"{c} = excluded.{c}" for c in FEATURE_SCHEMA.store_columns)
+)
+
+OPEN_ITEM_IDS_QUERY = text(
+    "SELECT id FROM items WHERE id IN :ids AND NOT is_closed"
+).bindparams(bindparam("ids", expanding=True))
 
 class ItemRepository:
-    def __init__(self, db):
+    def __init__(self, db, seller_cache=seller_verification_cache):
         self.db = db
+        self.seller_cache = seller_cache
 
-    def to_bool(self, val):
-        if isinstance(val, str):
-            return val.lower() != "false"
-        return bool(val)
+    @db_query("select_item")
+    async def get_item(self, id):
+        """Item together with the verification flag of its seller, in one query."""
+        result = await self.db.execute(GET_ITEM_QUERY, {"id": id})
+        item = ItemRecord.from_row(result.first())
+        if item is not None and item.is_verified_seller is not None:
+            self.seller_cache.put(item.seller_id, item.is_verified_seller)
+        return item
 
-    def to_obj(self, row):
-        if row is None:
-            return None
-        d = dict(row)
-        d["is_closed"] = self.to_bool(d.get("is_closed", False))
-        return SimpleNamespace(**d)
+    @db_query("select_open_item_ids")
+    async def get_open_ids(self, ids):
+        """Ids from `ids` of items that exist and are not closed."""
+        if not ids:
+            return []
+        result = await self.db.execute(OPEN_ITEM_IDS_QUERY, {"ids": list(ids)})
+        return [row[0] for row in result.all()]
 
-    async def get_item(self, id):
-        start = time.perf_counter()
-        result = await self.db.execute(
-            text("SELECT * FROM items WHERE id = :id LIMIT 1"),
-            {"id": id},
+    @db_query("select_item_features")
+    async def get_feature_rows(self, ids):
+        """Raw feature rows (id + FEATURE_SCHEMA.columns) for a batch of items, without descriptions."""
+        result = await self.db.execute(FEATURE_ROWS_QUERY, {"ids": list(ids)})
+        return result.all()
+
+    @db_query("upsert_item_features")
+    async def upsert_features(self, item_ids, matrix, commit: bool = True):
+        await self.db.execute(
+            UPSERT_FEATURES_QUERY,
+            [
+                {
+                    "item_id": item_id,
+                    "schema_version": FEATURE_SCHEMA.version,
+                    **dict(zip(FEATURE_SCHEMA.store_columns, map(float, vector))),
+                }
+                for item_id, vector in zip(item_ids, matrix)
+            ],
         )
-        DB_QUERY_DURATION.labels(query_type="select_item").observe(time.perf_counter() - start)
-        return self.to_obj(result.mappings().first())
+        if commit:
+            await self.db.commit()
+
+    async def refresh_features(self, ids, commit: bool = True):
+        """
+        Recomputes the normalized feature vectors of the items and upserts them into item_features.
+
+        Returns:
+            tuple: ids of the items that exist and their (n, len(FEATURE_SCHEMA)) float32 matrix
+        """
+        rows = await self.get_feature_rows(ids)
+        item_ids = [row[0] for row in rows]
+        with stage(FEATURES):
+            matrix = FEATURE_SCHEMA.build_matrix(rows, first_column=1)
+        if item_ids:
+            await self.upsert_features(item_ids, matrix, commit=commit)
+        return item_ids, matrix
+
+    @db_query("select_stored_features")
+    async def get_stored_features(self, ids):
+        result = await self.db.execute(STORED_FEATURES_QUERY, {"ids": ids, "version": FEATURE_SCHEMA.version})
+        return result.all()
+
+    async def get_feature_matrix(self, ids):
+        """
+        Ready-to-score feature vectors from item_features, without touching item descriptions.
 
+        Items missing from the store or stored under another schema version are recomputed
+        from the raw columns and written back.
+
+        Returns:
+            tuple: ids of the items that exist and their (n, len(FEATURE_SCHEMA)) float32 matrix
+        """
+        ids = list(ids)
+        rows = await self.get_stored_features(ids)
+        item_ids = [row[0] for row in rows]
+        with stage(FEATURES):
+            matrix = np.array([row[1:] for row in rows], dtype=np.float32).reshape(len(rows), len(FEATURE_SCHEMA))
+        missing = set(ids).difference(item_ids)
+        if missing:
+            refreshed_ids, refreshed = await self.refresh_features(sorted(missing))
+            item_ids += refreshed_ids
+            matrix = np.concatenate([matrix, refreshed])
+        return item_ids, matrix
+
+    @db_query("insert_item")
     async def create_item(self, item):
-        start = time.perf_counter()
         result = await self.db.execute(
-            text(
-                "INSERT INTO items (name, description, category, images_qty) "
-                "VALUES (:name, :description, :category, :images_qty) "
-                "RETURNING *"
-            ),
+            INSERT_ITEM_QUERY,
             {
                 "name": item.name,
                 "description": item.description,
                 "category": item.category,
                 "images_qty": item.images_qty,
+                "seller_id": getattr(item, "seller_id", None),
             },
         )
+        created = ItemRecord.from_row(result.first())
+        # Вектор признаков пишется в той же транзакции, что и объявление
+        await self.refresh_features([created.id], commit=False)
         await self.db.commit()
-        DB_QUERY_DURATION.labels(query_type="insert_item").observe(time.perf_counter() - start)
-        return self.to_obj(result.mappings().first())
+        return created
 
+    @db_query("update_item")
     async def close_item(self, item_id):
-        existing = await self.get_item(item_id)
-        if existing is None:
-            return None
-        start = time.perf_counter()
-        result = await self.db.execute(
-            text(
-                "UPDATE items SET is_closed = true "
-                "WHERE id = :id RETURNING *"
-            ),
-            {"id": item_id},
-        )
+        """Closed item, or None if there is no such item."""
+        result = await self.db.execute(CLOSE_ITEM_QUERY, {"id": item_id})
+        closed = ItemRecord.from_row(result.first())
         await self.db.commit()
-        DB_QUERY_DURATION.labels(query_type="update_item").observe(time.perf_counter() - start)
-        return self.to_obj(result.mappings().first())
+        return closed
@@ -1,5 +1,6 @@
 from pathlib import Path
 from repository.model.model_repository import ModelRepository
+from service.features import FEATURE_SCHEMA
 import pickle
 from sklearn.linear_model import LogisticRegression
 import numpy as np
@@ -8,14 +9,15 @@ class LocalModelRepository(ModelRepository):
     def train_model(self, path=""):
         """Обучает простую модель на синтетических данных."""
         np.random.seed(42)
-        # Признаки: [is_verified_seller, images_qty, description_length, category]
-        X = np.random.rand(1000, 4)
+        # Признаки и их порядок задаются общей со слоем сервинга схемой FEATURE_SCHEMA
+        X = np.random.rand(1000, len(FEATURE_SCHEMA))
         # Целевая переменная: 1 = нарушение, 0 = нет нарушения
         y = (X[:, 0] < 0.3) & (X[:, 1] < 0.2)
         y = y.astype(int)
         
         model = LogisticRegression()
         model.fit(X, y)
+        FEATURE_SCHEMA.tag_model(model)
         return model
 
     def save_model(self, model, path="model.pkl"):
@@ -36,3 +38,6 @@ class LocalModelRepository(ModelRepository):
     
     def predict(self, input, model):
         return model.predict_proba(np.array(input, dtype=float).reshape(1, -1))[0]
+
+    def predict_batch(self, features, model):
+        return model.predict_proba(features)
@@ -1,49 +1,77 @@
 from pathlib import Path
 from repository.model.model_repository import ModelRepository
-from sklearn.linear_model import LogisticRegression
+from service.features import FEATURE_SCHEMA
 import logging
-import mlflow
 import numpy as np
-from mlflow.tracking import MlflowClient
 import uuid
 
 logger = logging.getLogger(__name__)
 
 class MlflowModelRepository(ModelRepository):
+    """
+    Models in the MLflow registry.
+
+    mlflow and sklearn take seconds to import, so they are imported on first use, and
+    the experiment is set up on the first call that needs MLflow: constructing the
+    repository at import time makes no network calls.
+    """
     def __init__(self, tracking_uri, exp_name="my_name"):
-        mlflow.set_tracking_uri(tracking_uri)
-        self.mlflow_client = MlflowClient(tracking_uri)
-        self.mlflow_client = MlflowClient(tracking_uri)
-        exp = mlflow.get_experiment_by_name(exp_name)
+        self.tracking_uri = tracking_uri
+        self.exp_name = exp_name
+        self._mlflow_client = None
+
+    @property
+    def mlflow_client(self):
+        if self._mlflow_client is None:
+            self._mlflow_client = self._connect()
+        return self._mlflow_client
+
+    def _connect(self):
+        import mlflow
+        from mlflow.tracking import MlflowClient
+
+        mlflow.set_tracking_uri(self.tracking_uri)
+        client = MlflowClient(self.tracking_uri)
+        exp = mlflow.get_experiment_by_name(self.exp_name)
         if exp is None:
-            mlflow.create_experiment(exp_name)
+            mlflow.create_experiment(self.exp_name)
         else:
             if exp.lifecycle_stage == "deleted":
-                self.mlflow_client.restore_experiment(exp.experiment_id)
+                client.restore_experiment(exp.experiment_id)
 
-        mlflow.set_experiment(exp_name)
+        mlflow.set_experiment(self.exp_name)
+        return client
 
     def train_model(self, path="logreg"):
         """Обучает простую модель на синтетических данных."""
+        import mlflow
+        from sklearn.linear_model import LogisticRegression
+
+        client = self.mlflow_client
         np.random.seed(42)
-        # Признаки: [is_verified_seller, images_qty, description_length, category]
-        X = np.random.rand(1000, 4)
+        # Признаки и их порядок задаются общей со слоем сервинга схемой FEATURE_SCHEMA
+        X = np.random.rand(1000, len(FEATURE_SCHEMA))
         # Целевая переменная: 1 = нарушение, 0 = нет нарушения
         y = (X[:, 0] < 0.3) & (X[:, 1] < 0.2)
         y = y.astype(int)
         
         model = LogisticRegression()
         model.fit(X, y)
+        FEATURE_SCHEMA.tag_model(model)
         run_name = f"train_{uuid.uuid4().hex[:8]}"
         with mlflow.start_run(run_name=run_name) as run:
             try:
-                mlflow.log_params({"model_class": "LogisticRegression"})
+                mlflow.log_params({
+                    "model_class": "LogisticRegression",
+                    "feature_schema_version": FEATURE_SCHEMA.version,
+                    "features": ",".join(FEATURE_SCHEMA.names),
+                })
                 train_accuracy = model.score(X, y)
                 mlflow.log_metric("train_accuracy", train_accuracy)
                 mlflow.sklearn.log_model(model, artifact_path="main_model")
                 model_uri = f"runs:/{run.info.run_id}/main_model"
                 version = mlflow.register_model(model_uri, path)
-                self.mlflow_client.transition_model_version_stage(
+                client.transition_model_version_stage(
                     name=path,
                     version=version.version,
                     stage="Production",
@@ -54,13 +82,16 @@ class MlflowModelRepository(ModelRepository):
             return model
 
     def save_model(self, model, path="logreg"):
+        import mlflow
+
+        client = self.mlflow_client
         run_name = f"save_{uuid.uuid4().hex[:8]}"
         with mlflow.start_run(run_name=run_name) as run:
             try:
                 mlflow.sklearn.log_model(model, artifact_path="main_model")
                 model_uri = f"runs:/{run.info.run_id}/main_model"
                 version = mlflow.register_model(model_uri, path)
-                self.mlflow_client.transition_model_version_stage(
+                client.transition_model_version_stage(
                     name=path,
                     version=version.version,
                     stage="Production",
@@ -70,8 +101,12 @@ class MlflowModelRepository(ModelRepository):
                 raise RuntimeError(f'Failed to save MlFlow model. Reason: {str(e)}')
 
     def load_model(self, path="logreg"):
+        import mlflow
+
         model_uri = f"models:/{path}/Production"
         try:
+            # Подключение к MLflow (tracking URI, эксперимент) при первом обращении
+            self.mlflow_client
             model = mlflow.sklearn.load_model(model_uri)
             return model
         except Exception as e:
@@ -86,3 +121,6 @@ class MlflowModelRepository(ModelRepository):
     
     def predict(self, input, model):
         return model.predict_proba(np.array(input, dtype=float).reshape(1, -1))[0]
+
+    def predict_batch(self, features, model):
+        return model.predict_proba(features)
@@ -14,3 +14,6 @@ class ModelRepository:
 
     def predict(self, input, model):
         pass
+
+    def predict_batch(self, features, model):
+        pass
@@ -0,0 +1,33 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class FinishedTaskBuffer:
+    """
+    Terminal task results collected while the worker processes one consumer batch.
+
+    `flush` writes them to the Redis cache and publishes their completion events in one
+    pipeline, so the API serves finished tasks from the cache without re-reading Postgres.
+    """
+    def __init__(self, redis_repo):
+        self.redis_repo = redis_repo
+        self._records = {}
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record) -> None:
+        self._records[record.id] = record
+
+    async def flush(self) -> int:
+        records, self._records = list(self._records.values()), {}
+        if not records:
+            return 0
+        try:
+            await self.redis_repo.set_finished_tasks(records)
+        except Exception as e:
+            # Результаты уже в БД: API прочитает их оттуда, ожидающие клиенты — по таймауту
+            logger.warning(f"Failed to cache {len(records)} finished tasks: {e}")
+            return 0
+        return len(records)
@@ -0,0 +1,59 @@
+import os
+import time
+from collections import Counter
+
+from app.clients.redis import get_redis_connection
+
+HOT_ITEMS_KEY = "hot-items"
+# Счётчики копятся в процессе и сбрасываются в Redis одной пачкой
+HOT_ITEMS_FLUSH_SIZE = int(os.getenv("HOT_ITEMS_FLUSH_SIZE", "100"))
+HOT_ITEMS_FLUSH_INTERVAL = float(os.getenv("HOT_ITEMS_FLUSH_INTERVAL", "5"))
+HOT_ITEMS_TTL_SECONDS = int(os.getenv("HOT_ITEMS_TTL_SECONDS", str(24 * 3600)))
+
+
+class HotItemsRepository:
+    """
+    Access counters of items in a Redis sorted set, used to pick what to pre-warm.
+
+    `record` only bumps an in-process counter; the buffer goes to Redis in one pipeline
+    once it holds `flush_size` accesses or `flush_interval` seconds have passed, so a
+    request pays for a Redis round trip at most once per flush.
+    """
+    def __init__(self, flush_size: int = HOT_ITEMS_FLUSH_SIZE, flush_interval: float = HOT_ITEMS_FLUSH_INTERVAL):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._pending = Counter()
+        self._pending_total = 0
+        self._last_flush = time.monotonic()
+
+    async def record(self, item_id) -> None:
+        if item_id is None:
+            return
+        self._pending[item_id] += 1
+        self._pending_total += 1
+        if self._pending_total >= self.flush_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            await self.flush()
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, Counter()
+        self._pending_total = 0
+        self._last_flush = time.monotonic()
+        if not pending:
+            return
+        async with get_redis_connection() as connection:
+            pipeline = connection.pipeline(transaction=False)
+            for item_id, count in pending.items():
+                pipeline.zincrby(HOT_ITEMS_KEY, count, item_id)
+            pipeline.expire(HOT_ITEMS_KEY, HOT_ITEMS_TTL_SECONDS)
+            await pipeline.execute()
+
+    async def top(self, limit: int) -> list:
+        """Ids of the `limit` most accessed items, hottest first."""
+        if limit <= 0:
+            return []
+        async with get_redis_connection() as connection:
+            ids = await connection.zrevrange(HOT_ITEMS_KEY, 0, limit - 1)
+        return [int(item_id) for item_id in ids]
+
+
+hot_items_repository = HotItemsRepository()
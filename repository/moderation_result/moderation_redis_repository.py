@@ -1,6 +1,11 @@
+import json
 from datetime import timedelta
 from app.clients.redis import get_redis_connection
-from json import loads, dumps
+from repository.records import ModerationRecord, RenderedResult, render_moderation_result
+from app.instrumentation import timed, CACHE_LOOKUP, CACHE_WRITE
+
+# Канал pub/sub, в который воркер сообщает о завершённых задачах
+TASK_EVENTS_CHANNEL = 'moderation-task-events'
 
 class ModerationRedisRepository:
     def __init__(self):
@@ -8,65 +13,156 @@ class ModerationRedisRepository:
         self._TTL_SECONDS = int(self._TTL.total_seconds())
         self.task_prefix = 'task-'
         self.item_prefix = 'item-'
+        # Готовый ответ /moderation_result для завершённой задачи: {item_id, probability, body}
+        self.response_prefix = 'task-response-'
 
-    def serialize(self, data):
+    def to_record(self, data) -> ModerationRecord:
+        if isinstance(data, ModerationRecord):
+            return data
         if hasattr(data, 'to_dict'):
-            return dumps(data.to_dict())
-        if hasattr(data, 'model_dump'):
-            return dumps(data.model_dump())
+            return ModerationRecord.from_dict(data.to_dict())
         if isinstance(data, dict):
-            return dumps(data)
-        if hasattr(data, '__dict__'):
-            return dumps(vars(data), default=str)
-        return dumps(data)
+            return ModerationRecord.from_dict(data)
+        return ModerationRecord.from_dict(vars(data))
+
+    async def ping(self) -> bool:
+        async with get_redis_connection() as connection:
+            return await connection.ping()
 
+    @timed(CACHE_LOOKUP)
     async def get_moderation(self, id):
         async with get_redis_connection() as connection:
-            row = await connection.get(f'{self.task_prefix}{id}')
-            if row:
-                return loads(row)
-            return None
+            return ModerationRecord.from_cache(await connection.get(f'{self.task_prefix}{id}'))
     
+    @timed(CACHE_LOOKUP)
     async def get_moderation_for_item(self, item_id):
         async with get_redis_connection() as connection:
-            row = await connection.get(f'{self.item_prefix}{item_id}')
-            if row:
-                return loads(row)
-            return None
+            return ModerationRecord.from_cache(await connection.get(f'{self.item_prefix}{item_id}'))
     
+    @timed(CACHE_LOOKUP)
+    async def get_rendered_result(self, id):
+        """RenderedResult of a finished task, or None if it isn't cached."""
+        async with get_redis_connection() as connection:
+            item_id, probability, body = await connection.hmget(
+                f'{self.response_prefix}{id}', 'item_id', 'probability', 'body',
+            )
+        if body is None:
+            return None
+        return RenderedResult(int(item_id) if item_id else None, float(probability) if probability else None, body)
+
+    @timed(CACHE_WRITE)
     async def set_moderation(self, id, data):
+        record = self.to_record(data)
+        serialized = record.to_cache()
         async with get_redis_connection() as connection:
             task_id = f'{self.task_prefix}{id}'
-            serialized = self.serialize(data)
-            item_id_value = None
-            if hasattr(data, 'item_id'):
-                item_id_value = data.item_id
-            elif isinstance(data, dict) and 'item_id' in data:
-                item_id_value = data['item_id']
-
             pipeline = connection.pipeline()
             pipeline.set(name=task_id, value=serialized)
             pipeline.expire(task_id, self._TTL_SECONDS)
-            if item_id_value is not None:
-                item_key = f'{self.item_prefix}{item_id_value}'
+            if record.item_id is not None:
+                item_key = f'{self.item_prefix}{record.item_id}'
                 pipeline.set(name=item_key, value=serialized)
                 pipeline.expire(item_key, self._TTL_SECONDS)
+            self.queue_rendered_result(pipeline, record._replace(id=id))
+            await pipeline.execute()
+
+    def queue_rendered_result(self, pipeline, record) -> None:
+        # Результат завершённой задачи больше не меняется: ответ рендерится один раз при записи
+        if record.id is None or record.status in (None, 'pending'):
+            return
+        key = f'{self.response_prefix}{record.id}'
+        pipeline.hset(key, mapping={
+            'item_id': '' if record.item_id is None else record.item_id,
+            'probability': '' if record.probability is None else record.probability,
+            'body': render_moderation_result(record),
+        })
+        pipeline.expire(key, self._TTL_SECONDS)
+
+    def queue_moderation(self, pipeline, data) -> None:
+        record = self.to_record(data)
+        serialized = record.to_cache()
+        pipeline.set(f'{self.task_prefix}{record.id}', serialized, ex=self._TTL_SECONDS)
+        if record.item_id is not None:
+            pipeline.set(f'{self.item_prefix}{record.item_id}', serialized, ex=self._TTL_SECONDS)
+        self.queue_rendered_result(pipeline, record)
+
+    @timed(CACHE_WRITE)
+    async def set_moderations(self, records) -> None:
+        """Caches many task results in one pipeline (task-{id} and item-{item_id} keys)."""
+        if not records:
+            return
+        async with get_redis_connection() as connection:
+            pipeline = connection.pipeline(transaction=False)
+            for data in records:
+                self.queue_moderation(pipeline, data)
+            await pipeline.execute()
+
+    @timed(CACHE_WRITE)
+    async def set_finished_tasks(self, records) -> None:
+        """
+        Caches terminal task results and publishes their events in one pipeline.
+        Commands run in order, so a client woken by the event already reads the result from the cache.
+        """
+        if not records:
+            return
+        async with get_redis_connection() as connection:
+            pipeline = connection.pipeline(transaction=False)
+            for data in records:
+                self.queue_moderation(pipeline, data)
+            for data in records:
+                record = self.to_record(data)
+                pipeline.publish(TASK_EVENTS_CHANNEL, self.task_event(record.id, record.status))
             await pipeline.execute()
 
+    def prediction_record(self, item_id, data) -> ModerationRecord:
+        # Синхронное предсказание хранится как завершённая задача без id
+        return ModerationRecord(
+            id=None,
+            item_id=item_id,
+            status="completed",
+            is_violation=data.is_violation,
+            probability=data.probability,
+        )
+
+    @timed(CACHE_WRITE)
     async def set_prediction_for_item(self, item_id, data):
+        record = self.prediction_record(item_id, data)
         async with get_redis_connection() as connection:
             item_key = f'{self.item_prefix}{item_id}'
-            serialized = self.serialize(data)
-            await connection.set(item_key, serialized, ex=self._TTL_SECONDS)
+            await connection.set(item_key, record.to_cache(), ex=self._TTL_SECONDS)
     
+    @timed(CACHE_WRITE)
+    async def set_predictions_for_items(self, predictions) -> None:
+        """Caches many (item_id, prediction) pairs in one pipeline."""
+        if not predictions:
+            return
+        async with get_redis_connection() as connection:
+            pipeline = connection.pipeline(transaction=False)
+            for item_id, data in predictions:
+                record = self.prediction_record(item_id, data)
+                pipeline.set(f'{self.item_prefix}{item_id}', record.to_cache(), ex=self._TTL_SECONDS)
+            await pipeline.execute()
+
+    def task_event(self, task_id, status) -> str:
+        return json.dumps({'task_id': task_id, 'status': status})
+
+    @timed(CACHE_WRITE)
+    async def publish_task_event(self, task_id, status) -> None:
+        """Notifies API processes waiting on the task that its status has changed."""
+        async with get_redis_connection() as connection:
+            await connection.publish(TASK_EVENTS_CHANNEL, self.task_event(task_id, status))
+
+    @timed(CACHE_WRITE)
     async def delete(self, id) -> None:
         async with get_redis_connection() as connection:
             await connection.delete(id)
 
+    @timed(CACHE_WRITE)
     async def delete_for_item(self, item_id, task_ids) -> None:
         async with get_redis_connection() as connection:
             keys = [f'{self.item_prefix}{item_id}']
             keys.extend(f'{self.task_prefix}{tid}' for tid in task_ids)
+            keys.extend(f'{self.response_prefix}{tid}' for tid in task_ids)
             pipeline = connection.pipeline()
             for key in keys:
                 pipeline.delete(key)
@@ -1,77 +1,259 @@
-import time
-from datetime import datetime, timezone
-from types import SimpleNamespace
+import logging
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+from sqlalchemy import text, bindparam, Boolean, DateTime
+from app.clients.lanes import INTERACTIVE
+from app.instrumentation import db_query
+from dto.response import PredictResponse
+from repository.records import ModerationRecord, PendingTask, TaskOutcome, ClaimedTask
+
+logger = logging.getLogger(__name__)
+
+# Статусы, после которых задача больше не меняется
+FINISHED_STATUSES = ("completed", "failed")
+
+# Порядок колонок совпадает с полями ModerationRecord
+MODERATION_COLUMNS = (
+    "id, item_id, status, is_violation, probability, error_message, retry_count, created_at, processed_at"
+)
+# Строк в одном UPDATE из update_tasks: ограничивает число параметров запроса
+UPDATE_TASKS_CHUNK_SIZE = 1000
+
+
+def qualified_columns(table):
+    return ", ".join(f"{table}.{column.strip()}" for column in MODERATION_COLUMNS.split(","))
+
+MODERATION_TYPES = dict(is_violation=Boolean, created_at=DateTime(timezone=True), processed_at=DateTime(timezone=True))
+
+GET_MODERATION_QUERY = text(
+    f"SELECT {MODERATION_COLUMNS} FROM moderation_results WHERE id = :id LIMIT 1"
+).columns(**MODERATION_TYPES)
+
+GET_MODERATION_FOR_ITEM_QUERY = text(
+    f"SELECT {MODERATION_COLUMNS} FROM moderation_results WHERE item_id = :item_id LIMIT 1"
+).columns(**MODERATION_TYPES)
+
+INSERT_MODERATION_QUERY = text(
+    "INSERT INTO moderation_results (item_id, status, retry_count, lane) "
+    "VALUES (:item_id, 'pending', 0, :lane) "
+    f"RETURNING {MODERATION_COLUMNS}"
+).columns(**MODERATION_TYPES)
+
+LATEST_PENDING_QUERY = text(
+    "SELECT id FROM moderation_results "
+    "WHERE item_id = :item_id AND status = 'pending' "
+    "ORDER BY id DESC LIMIT 1"
+)
+
+# Последние завершённые результаты по открытым объявлениям — кандидаты для прогрева кэша
+RECENT_COMPLETED_QUERY = text(
+    f"SELECT {qualified_columns('m')} "
+    "FROM moderation_results m JOIN items i ON i.id = m.item_id "
+    "WHERE m.status = 'completed' AND NOT i.is_closed "
+    "ORDER BY m.processed_at DESC, m.id DESC LIMIT :limit"
+).columns(**MODERATION_TYPES)
+
+COMPLETED_FOR_ITEMS_QUERY = text(
+    f"SELECT {MODERATION_COLUMNS} FROM moderation_results "
+    "WHERE item_id IN :item_ids AND status = 'completed' ORDER BY id"
+).columns(**MODERATION_TYPES).bindparams(bindparam("item_ids", expanding=True))
+
+UPDATE_MODERATION_QUERY = text(
+    "UPDATE moderation_results SET "
+    "status = :status, "
+    "is_violation = :is_violation, "
+    "probability = :probability, "
+    "error_message = :error_message, "
+    "retry_count = COALESCE(:retry_count, retry_count), "
+    "processed_at = :processed_at "
+    "WHERE id = :id "
+    f"RETURNING {MODERATION_COLUMNS}"
+).columns(**MODERATION_TYPES)
+
+LATEST_PENDING_FOR_ITEMS_QUERY = text(
+    "SELECT item_id, MAX(id) FROM moderation_results "
+    "WHERE item_id IN :item_ids AND status = 'pending' GROUP BY item_id"
+).bindparams(bindparam("item_ids", expanding=True))
+
+
+# Аренда задач очереди QUEUE_BACKEND=postgres. SKIP LOCKED пропускает строки, которые
+# прямо сейчас забирает другой воркер, поэтому воркеры не ждут друг друга
+CLAIM_PENDING_SQL = (
+    "UPDATE moderation_results SET claimed_at = :now "
+    "WHERE id IN ("
+    "SELECT id FROM moderation_results "
+    "WHERE status = 'pending' AND lane = :lane AND (claimed_at IS NULL OR claimed_at < :expired) "
+    "ORDER BY id LIMIT :limit{lock}"
+    ") RETURNING id, item_id, retry_count, created_at"
+)
+CLAIM_PENDING_QUERY = text(
+    CLAIM_PENDING_SQL.format(lock=" FOR UPDATE SKIP LOCKED")
+).columns(created_at=DateTime(timezone=True))
+# В sqlite (тесты) нет FOR UPDATE: запись в нём и так идёт по одной
+CLAIM_PENDING_QUERY_SQLITE = text(CLAIM_PENDING_SQL.format(lock="")).columns(created_at=DateTime(timezone=True))
+
+# Перенос задачи в другую полосу (retry) со снятием аренды
+REQUEUE_TASK_QUERY = text(
+    "UPDATE moderation_results SET lane = :lane, claimed_at = NULL "
+    "WHERE id = :id AND status = 'pending' "
+    "RETURNING id"
+)
+
+PENDING_BY_LANE_QUERY = text(
+    "SELECT lane, COUNT(*) FROM moderation_results WHERE status = 'pending' GROUP BY lane"
+)
+
+
+@lru_cache(maxsize=64)
+def update_tasks_query(size: int):
+    """
+    UPDATE of `size` tasks in one statement, joined with a VALUES list of their outcomes.
+    The casts in each row give the bound parameters their column types in Postgres.
+    """
+    rows = ", ".join(
+        f"(CAST(:task_id_{i} AS INTEGER), :status_{i}, CAST(:is_violation_{i} AS BOOLEAN), "
+        f"CAST(:probability_{i} AS FLOAT), :error_message_{i}, CAST(:retry_count_{i} AS INTEGER))"
+        for i in range(size)
+    )
+    return text(
+        "WITH outcomes (id, status, is_violation, probability, error_message, retry_count) "
+        f"AS (VALUES {rows}) "
+        "UPDATE moderation_results SET "
+        "status = outcomes.status, "
+        "is_violation = outcomes.is_violation, "
+        "probability = outcomes.probability, "
+        "error_message = outcomes.error_message, "
+        "retry_count = COALESCE(outcomes.retry_count, moderation_results.retry_count), "
+        "processed_at = :processed_at "
+        "FROM outcomes WHERE moderation_results.id = outcomes.id "
+        f"RETURNING {qualified_columns('moderation_results')}"
+    ).columns(**MODERATION_TYPES)
 
-from sqlalchemy import text
-from app.metrics import DB_QUERY_DURATION
 
 class ModerationResultRepository:
-    def __init__(self, db, redis_repo=None):
+    def __init__(self, db, redis_repo=None, finished_tasks=None):
         self.db = db
         self.redis_repo = redis_repo
-
-    def to_bool(self, val):
-        if isinstance(val, str):
-            return val.lower() != "false"
-        return bool(val)
-
-    def to_obj(self, row):
-        if row is None:
-            return None
-        d = dict(row)
-        if "is_violation" in d and d["is_violation"] is not None:
-            d["is_violation"] = self.to_bool(d["is_violation"])
-        return SimpleNamespace(**d)
+        # Буфер завершённых задач (FinishedTaskBuffer) вместо записи в Redis на каждую задачу
+        self.finished_tasks = finished_tasks
 
     def is_completed(self, result):
-        if isinstance(result, dict):
-            return result.get("status") == "completed"
-        return getattr(result, "status", None) == "completed"
+        return result.status == "completed"
 
+    @db_query("select_moderation")
     async def get_moderation(self, id):
-        start = time.perf_counter()
-        result = await self.db.execute(
-            text("SELECT * FROM moderation_results WHERE id = :id LIMIT 1"),
-            {"id": id},
-        )
-        DB_QUERY_DURATION.labels(query_type="select_moderation").observe(time.perf_counter() - start)
-        return self.to_obj(result.mappings().first())
+        result = await self.db.execute(GET_MODERATION_QUERY, {"id": id})
+        return ModerationRecord.from_row(result.first())
 
+    @db_query("select_moderation_by_item")
     async def get_moderation_for_item(self, item_id):
-        start = time.perf_counter()
-        result = await self.db.execute(
-            text("SELECT * FROM moderation_results WHERE item_id = :item_id LIMIT 1"),
-            {"item_id": item_id},
-        )
-        DB_QUERY_DURATION.labels(query_type="select_moderation_by_item").observe(time.perf_counter() - start)
-        return self.to_obj(result.mappings().first())
+        result = await self.db.execute(GET_MODERATION_FOR_ITEM_QUERY, {"item_id": item_id})
+        return ModerationRecord.from_row(result.first())
 
-    async def create_moderation(self, item_id):
-        start = time.perf_counter()
-        result = await self.db.execute(
-            text(
-                "INSERT INTO moderation_results (item_id, status, retry_count) "
-                "VALUES (:item_id, 'pending', 0) "
-                "RETURNING *"
-            ),
-            {"item_id": item_id},
-        )
+    @db_query("select_recent_completed")
+    async def get_recent_completed(self, limit):
+        result = await self.db.execute(RECENT_COMPLETED_QUERY, {"limit": limit})
+        return [ModerationRecord.from_row(row) for row in result.all()]
+
+    @db_query("select_completed_for_items")
+    async def get_completed_for_items(self, item_ids):
+        """Latest completed result of every item in `item_ids` that has one: {item_id: record}."""
+        if not item_ids:
+            return {}
+        result = await self.db.execute(COMPLETED_FOR_ITEMS_QUERY, {"item_ids": list(item_ids)})
+        # Строки отсортированы по id: последняя запись объявления перезаписывает предыдущие
+        return {record.item_id: record for record in map(ModerationRecord.from_row, result.all())}
+
+    @db_query("insert_moderation")
+    async def create_moderation(self, item_id, lane=INTERACTIVE):
+        result = await self.db.execute(INSERT_MODERATION_QUERY, {"item_id": item_id, "lane": lane})
+        task = ModerationRecord.from_row(result.first())
         await self.db.commit()
-        DB_QUERY_DURATION.labels(query_type="insert_moderation").observe(time.perf_counter() - start)
-        return self.to_obj(result.mappings().first())
+        return task
 
+    @db_query("select_latest_pending")
     async def get_latest_pending(self, db, item_id):
-        result = await db.execute(
-            text(
-                "SELECT * FROM moderation_results "
-                "WHERE item_id = :item_id AND status = 'pending' "
-                "ORDER BY id DESC LIMIT 1"
-            ),
-            {"item_id": item_id},
-        )
-        return self.to_obj(result.mappings().first())
+        result = await db.execute(LATEST_PENDING_QUERY, {"item_id": item_id})
+        return PendingTask.from_row(result.first())
+
+    @db_query("select_latest_pending_for_items")
+    async def get_latest_pending_for_items(self, db, item_ids):
+        """Id of the latest pending task of every item in `item_ids` that has one: {item_id: task_id}."""
+        if not item_ids:
+            return {}
+        result = await db.execute(LATEST_PENDING_FOR_ITEMS_QUERY, {"item_ids": list(item_ids)})
+        return {item_id: task_id for item_id, task_id in result.all()}
+
+    @db_query("claim_pending")
+    async def claim_pending(self, db, limit, lease_seconds, lane=INTERACTIVE):
+        """
+        Claims up to `limit` oldest pending tasks of `lane` that no worker holds, or whose
+        lease of `lease_seconds` has expired, and commits the claim.
+        """
+        now = datetime.now(timezone.utc)
+        query = CLAIM_PENDING_QUERY_SQLITE if db.bind.dialect.name == "sqlite" else CLAIM_PENDING_QUERY
+        result = await db.execute(query, {
+            "now": now,
+            "expired": now - timedelta(seconds=lease_seconds),
+            "limit": limit,
+            "lane": lane,
+        })
+        tasks = sorted(map(ClaimedTask.from_row, result.all()))
+        await db.commit()
+        return tasks
+
+    @db_query("requeue_task")
+    async def requeue_task(self, db, task_id, lane):
+        """
+        Moves a pending task to `lane` and releases its claim.
+
+        Returns:
+            bool: False if the task is no longer pending
+        """
+        result = await db.execute(REQUEUE_TASK_QUERY, {"id": task_id, "lane": lane})
+        moved = result.first() is not None
+        await db.commit()
+        return moved
+
+    @db_query("count_pending_by_lane")
+    async def count_pending_by_lane(self):
+        """Number of pending tasks in every lane that has any: {lane: count}."""
+        result = await self.db.execute(PENDING_BY_LANE_QUERY)
+        return {lane: count for lane, count in result.all()}
+
+    @db_query("update_moderations")
+    async def update_moderations(self, db, outcomes):
+        now = datetime.now(timezone.utc)
+        records = []
+        for offset in range(0, len(outcomes), UPDATE_TASKS_CHUNK_SIZE):
+            chunk = outcomes[offset:offset + UPDATE_TASKS_CHUNK_SIZE]
+            params = {"processed_at": now}
+            for i, outcome in enumerate(chunk):
+                for field, value in zip(TaskOutcome._fields, outcome):
+                    params[f"{field}_{i}"] = value
+            result = await db.execute(update_tasks_query(len(chunk)), params)
+            records.extend(map(ModerationRecord.from_row, result.all()))
+        await db.commit()
+        return records
 
-    async def update_task(
+    async def update_tasks(self, db, outcomes):
+        """
+        Applies many TaskOutcome in one transaction: one UPDATE per UPDATE_TASKS_CHUNK_SIZE
+        outcomes and a single commit, instead of a statement and a commit per task.
+
+        Returns:
+            list: updated ModerationRecord, in no particular order
+        """
+        outcomes = [TaskOutcome(*outcome) for outcome in outcomes]
+        if not outcomes:
+            return []
+        records = await self.update_moderations(db, outcomes)
+        await self.notify_finished([record for record in records if record.status in FINISHED_STATUSES])
+        return records
+
+    @db_query("update_moderation")
+    async def update_moderation(
         self,
         db,
         task_id,
@@ -82,17 +264,8 @@ class ModerationResultRepository:
         retry_count=None,
     ):
         now = datetime.now(timezone.utc)
-        await db.execute(
-            text(
-                "UPDATE moderation_results SET "
-                "status = :status, "
-                "is_violation = :is_violation, "
-                "probability = :probability, "
-                "error_message = :error_message, "
-                "retry_count = COALESCE(:retry_count, retry_count), "
-                "processed_at = :processed_at "
-                "WHERE id = :id"
-            ),
+        result = await db.execute(
+            UPDATE_MODERATION_QUERY,
             {
                 "id": task_id,
                 "status": status,
@@ -103,8 +276,33 @@ class ModerationResultRepository:
                 "processed_at": now,
             },
         )
+        record = ModerationRecord.from_row(result.first())
         await db.commit()
+        return record
 
+    async def update_task(self, db, task_id, status, **fields):
+        record = await self.update_moderation(db, task_id, status, **fields)
+        if record is not None and status in FINISHED_STATUSES:
+            await self.notify_finished([record])
+        return record
+
+    async def notify_finished(self, records):
+        if not records:
+            return
+        if self.finished_tasks is not None:
+            # Воркер копит результаты и пишет их в Redis одним pipeline на пачку сообщений
+            for record in records:
+                self.finished_tasks.add(record)
+            return
+        if self.redis_repo is None:
+            return
+        try:
+            await self.redis_repo.set_finished_tasks(records)
+        except Exception as e:
+            # Без уведомления ожидающие клиенты дочитают статус из БД по таймауту
+            logger.warning(f"Failed to cache {len(records)} finished tasks: {e}")
+
+    @db_query("increment_retry_count")
     async def increment_retry_count(self, db, task_id):
         result = await db.execute(
             text(
@@ -121,6 +319,7 @@ class ModerationResultRepository:
             return None
         return row["retry_count"]
 
+    @db_query("delete_moderations")
     async def delete_moderations_for_item(self, item_id):
         result = await self.db.execute(
             text("SELECT id FROM moderation_results WHERE item_id = :item_id"),
@@ -135,6 +334,10 @@ class ModerationResultRepository:
             await self.db.commit()
         return task_ids
 
+    async def release_connection(self):
+        # Соединение возвращается в пул на время долгого ожидания; сессия возьмёт новое при следующем запросе
+        await self.db.close()
+
     async def get_completed_for_item(self, item_id):
         if self.redis_repo is not None:
             cached = await self.redis_repo.get_moderation_for_item(item_id)
@@ -145,12 +348,17 @@ class ModerationResultRepository:
             return result
         return None
 
+    async def get_rendered_result(self, task_id):
+        """RenderedResult of a finished task from the cache, or None."""
+        if self.redis_repo is None:
+            return None
+        return await self.redis_repo.get_rendered_result(task_id)
+
     async def get_result(self, task_id):
         if self.redis_repo is not None:
             cached = await self.redis_repo.get_moderation(task_id)
             if cached is not None:
-                status = cached.get("status") if isinstance(cached, dict) else getattr(cached, "status", None)
-                if status not in (None, "pending"):
+                if cached.status not in (None, "pending"):
                     return cached
 
         result = await self.get_moderation(task_id)
@@ -158,8 +366,8 @@ class ModerationResultRepository:
             await self.redis_repo.set_moderation(task_id, result)
         return result
 
-    async def create_and_cache(self, item_id):
-        task = await self.create_moderation(item_id)
+    async def create_and_cache(self, item_id, lane=INTERACTIVE):
+        task = await self.create_moderation(item_id, lane)
         if self.redis_repo is not None:
             await self.redis_repo.set_moderation(task.id, task)
         return task
@@ -167,10 +375,10 @@ class ModerationResultRepository:
     async def save_to_cache(self, item_id, result):
         if result is None or self.redis_repo is None:
             return
-        if hasattr(result, 'id') and hasattr(result, 'item_id'):
-            await self.redis_repo.set_moderation(result.id, result)
-        else:
+        if isinstance(result, PredictResponse):
             await self.redis_repo.set_prediction_for_item(item_id, result)
+        else:
+            await self.redis_repo.set_moderation(result.id, result)
 
     async def delete_for_item(self, item_id):
         task_ids = await self.delete_moderations_for_item(item_id)
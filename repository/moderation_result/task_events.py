@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+import os
+from contextlib import asynccontextmanager
+
+from app.clients.redis import get_redis_connection
+from repository.moderation_result.moderation_redis_repository import TASK_EVENTS_CHANNEL
+
+logger = logging.getLogger(__name__)
+
+# Сколько ждать подписки на канал, прежде чем отвечать без неё
+TASK_EVENTS_READY_TIMEOUT = float(os.getenv("TASK_EVENTS_READY_TIMEOUT", "1"))
+TASK_EVENTS_RECONNECT_DELAY = float(os.getenv("TASK_EVENTS_RECONNECT_DELAY", "1"))
+# Пока подписки нет, ожидающие перечитывают статус с этим интервалом
+TASK_EVENTS_FALLBACK_POLL = float(os.getenv("TASK_EVENTS_FALLBACK_POLL", "1"))
+
+
+class TaskSubscription:
+    """Task ids one request waits on; woken by TaskEventListener."""
+    def __init__(self, listener, task_ids):
+        self.listener = listener
+        self.task_ids = frozenset(task_ids)
+        self._finished = set()
+        self._wakeup = asyncio.Event()
+
+    def notify(self, task_id) -> None:
+        self._finished.add(task_id)
+        self._wakeup.set()
+
+    def notify_all(self) -> None:
+        self._finished.update(self.task_ids)
+        self._wakeup.set()
+
+    async def wait(self, timeout: float) -> set:
+        """
+        Waits up to `timeout` seconds for events.
+
+        Returns:
+            set: ids of the tasks that may have finished since the previous call; empty if
+                 nothing happened. Without a live subscription the wait is cut to
+                 TASK_EVENTS_FALLBACK_POLL and all ids are returned, so they are re-read.
+        """
+        connected = self.listener.connected
+        if not connected:
+            timeout = min(timeout, self.listener.fallback_poll)
+        if not self._finished:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                if not connected:
+                    return set(self.task_ids)
+        finished, self._finished = self._finished, set()
+        self._wakeup.clear()
+        return finished
+
+
+class TaskEventListener:
+    """
+    One Redis pub/sub subscription per process, shared by all waiting requests.
+
+    The subscriber task starts on the first `subscribe` and dispatches task ids from
+    TASK_EVENTS_CHANNEL to the subscriptions waiting on them. When the connection drops,
+    every subscription is woken up and polls until the listener is subscribed again,
+    so events published in between are not missed.
+    """
+    def __init__(
+        self,
+        channel: str = TASK_EVENTS_CHANNEL,
+        ready_timeout: float = TASK_EVENTS_READY_TIMEOUT,
+        reconnect_delay: float = TASK_EVENTS_RECONNECT_DELAY,
+        fallback_poll: float = TASK_EVENTS_FALLBACK_POLL,
+    ):
+        self.channel = channel
+        self.ready_timeout = ready_timeout
+        self.reconnect_delay = reconnect_delay
+        self.fallback_poll = fallback_poll
+        self._subscriptions = {}
+        self._task = None
+        self._connected = None
+
+    @property
+    def connected(self) -> bool:
+        return self._connected is not None and self._connected.is_set()
+
+    @asynccontextmanager
+    async def subscribe(self, task_ids):
+        subscription = TaskSubscription(self, task_ids)
+        for task_id in subscription.task_ids:
+            self._subscriptions.setdefault(task_id, set()).add(subscription)
+        try:
+            await self.start()
+            yield subscription
+        finally:
+            for task_id in subscription.task_ids:
+                waiting = self._subscriptions.get(task_id)
+                if waiting is not None:
+                    waiting.discard(subscription)
+                    if not waiting:
+                        del self._subscriptions[task_id]
+
+    async def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._connected = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+        if not self.connected:
+            try:
+                await asyncio.wait_for(self._connected.wait(), self.ready_timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Not subscribed to {self.channel} after {self.ready_timeout}s, falling back to polling")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def dispatch(self, data) -> None:
+        try:
+            task_id = int(json.loads(data)["task_id"])
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Malformed task event {data!r}: {e}")
+            return
+        for subscription in self._subscriptions.get(task_id, ()):
+            subscription.notify(task_id)
+
+    def wake_all(self) -> None:
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.notify_all()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                async with get_redis_connection() as connection:
+                    async with connection.pubsub() as pubsub:
+                        await pubsub.subscribe(self.channel)
+                        self._connected.set()
+                        async for message in pubsub.listen():
+                            if message["type"] == "message":
+                                self.dispatch(message["data"])
+            except Exception as e:
+                logger.warning(f"Task events subscription to {self.channel} lost: {e}")
+            self._connected.clear()
+            self.wake_all()
+            await asyncio.sleep(self.reconnect_delay)
+
+
+task_event_listener = TaskEventListener()
@@ -0,0 +1,181 @@
+from datetime import datetime
+from json import dumps, loads
+from typing import NamedTuple, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson необязателен: без него тот же JSON даёт стандартный модуль
+    orjson = None
+
+
+def compact_json(content) -> bytes:
+    """Compact JSON of plain data, the same bytes FastAPI's JSONResponse would produce."""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def _isoformat(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _parse_datetime(value):
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class ItemRecord(NamedTuple):
+    """Item row as selected by ItemRepository, column order matches ITEM_COLUMNS."""
+    id: int
+    name: str
+    description: str
+    category: int
+    images_qty: int
+    is_closed: bool
+    seller_id: Optional[int] = None
+    is_verified_seller: Optional[bool] = None
+
+    @classmethod
+    def from_row(cls, row):
+        return None if row is None else cls(*row)
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class ModerationRecord(NamedTuple):
+    """
+    Moderation task row, column order matches MODERATION_COLUMNS.
+
+    Also the value type of the Redis cache: `to_cache` writes the fields as a compact
+    JSON array in the same order and `from_cache` reads it back positionally. Cached
+    predictions of /simple_predict have no task and are stored with id=None.
+    """
+    id: Optional[int]
+    item_id: int
+    status: str
+    is_violation: Optional[bool] = None
+    probability: Optional[float] = None
+    error_message: Optional[str] = None
+    retry_count: int = 0
+    created_at: Optional[datetime] = None
+    processed_at: Optional[datetime] = None
+
+    @classmethod
+    def from_row(cls, row):
+        return None if row is None else cls(*row)
+
+    def to_dict(self):
+        d = self._asdict()
+        d["created_at"] = _isoformat(self.created_at)
+        d["processed_at"] = _isoformat(self.processed_at)
+        return d
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(*(d.get(field, cls._field_defaults.get(field)) for field in cls._fields))
+
+    def to_cache(self) -> str:
+        return dumps([*self[:7], _isoformat(self.created_at), _isoformat(self.processed_at)])
+
+    @classmethod
+    def from_cache(cls, raw):
+        if raw is None:
+            return None
+        data = loads(raw)
+        # Записи в старом формате (JSON-объект) живут в кэше не дольше TTL
+        record = cls._make(data) if isinstance(data, list) else cls.from_dict(data)
+        if record.created_at is None and record.processed_at is None:
+            return record
+        return record._replace(
+            created_at=_parse_datetime(record.created_at),
+            processed_at=_parse_datetime(record.processed_at),
+        )
+
+
+def moderation_result_body(task) -> dict:
+    """Fields of ModerationResultResponse, from a ModerationRecord."""
+    return {
+        "task_id": task.id,
+        "status": task.status,
+        "is_violation": task.is_violation,
+        "probability": task.probability,
+    }
+
+
+def render_moderation_result(task) -> str:
+    return compact_json(moderation_result_body(task)).decode()
+
+
+class RenderedResult(NamedTuple):
+    """Cached /moderation_result response of a finished task, rendered when it was cached."""
+    item_id: Optional[int]
+    probability: Optional[float]
+    body: str
+
+
+class PendingTask(NamedTuple):
+    """The only thing the worker needs from a pending task is its id."""
+    id: int
+
+    @classmethod
+    def from_row(cls, row):
+        return None if row is None else cls(*row)
+
+
+class TaskOutcome(NamedTuple):
+    """Result of processing one task, as applied by ModerationResultRepository.update_tasks."""
+    task_id: int
+    status: str
+    is_violation: Optional[bool] = None
+    probability: Optional[float] = None
+    error_message: Optional[str] = None
+    # None оставляет счётчик попыток как есть
+    retry_count: Optional[int] = None
+
+
+class ClaimedTask(NamedTuple):
+    """Pending task claimed by a worker from the Postgres queue."""
+    id: int
+    item_id: int
+    retry_count: int
+    created_at: datetime
+
+    @classmethod
+    def from_row(cls, row):
+        return None if row is None else cls(*row)
+
+
+class AccountRecord(NamedTuple):
+    id: int
+    login: str
+    password: str
+    is_blocked: bool
+    tier: str = "free"
+
+    @classmethod
+    def from_row(cls, row):
+        return None if row is None else cls(*row)
+
+    def to_dict(self):
+        return self._asdict()
+
+
+class AccountStatus(NamedTuple):
+    """Projection used by the auth check on every request: no password hash."""
+    id: int
+    login: str
+    is_blocked: bool
+    tier: str = "free"
+
+    @classmethod
+    def from_row(cls, row):
+        return None if row is None else cls(*row)
+
+
+class SellerRecord(NamedTuple):
+    id: int
+    is_verified_seller: bool
+
+    @classmethod
+    def from_row(cls, row):
+        return None if row is None else cls(*row)
@@ -0,0 +1,50 @@
+import os
+import time
+
+SELLER_CACHE_TTL = float(os.getenv("SELLER_CACHE_TTL", "60"))
+SELLER_CACHE_MAX_SIZE = int(os.getenv("SELLER_CACHE_MAX_SIZE", "100000"))
+
+MISSING = object()
+
+
+class SellerVerificationCache:
+    """
+    Per-process cache of seller verification flags.
+
+    Entries expire after `ttl` seconds so that changes made by other processes become
+    visible; changes made through SellerRepository in this process invalidate at once.
+    """
+    def __init__(self, ttl: float = SELLER_CACHE_TTL, max_size: int = SELLER_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = {}
+
+    def get(self, seller_id):
+        entry = self._entries.get(seller_id)
+        if entry is None:
+            return MISSING
+        is_verified, expires_at = entry
+        if expires_at < time.monotonic():
+            self._entries.pop(seller_id, None)
+            return MISSING
+        return is_verified
+
+    def put(self, seller_id, is_verified: bool):
+        if seller_id is None:
+            return
+        if seller_id not in self._entries and len(self._entries) >= self.max_size:
+            # Словарь хранит порядок вставки: вытесняем самую старую запись
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[seller_id] = (is_verified, time.monotonic() + self.ttl)
+
+    def invalidate(self, seller_id=None):
+        if seller_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(seller_id, None)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+seller_verification_cache = SellerVerificationCache()
@@ -1,41 +1,69 @@
-from types import SimpleNamespace
+from sqlalchemy import text, Boolean
 
-from sqlalchemy import text
+from app.instrumentation import db_query
+from repository.records import SellerRecord
+from repository.seller.seller_cache import seller_verification_cache, MISSING
+from service.features import FEATURE_SCHEMA
 
 
 class SellerRepository:
-    def __init__(self, db):
+    def __init__(self, db, cache=seller_verification_cache):
         self.db = db
+        self.cache = cache
 
-    def to_bool(self, val):
-        if isinstance(val, str):
-            return val.lower() != "false"
-        return bool(val)
-
-    def to_obj(self, row):
-        if row is None:
-            return None
-        d = dict(row)
-        d["is_verified_seller"] = self._to_bool(d["is_verified_seller"])
-        return SimpleNamespace(**d)
-
+    @db_query("select_seller")
     async def get_seller(self, id):
         result = await self.db.execute(
-            text("SELECT * FROM sellers WHERE id = :id LIMIT 1"),
+            text("SELECT id, is_verified_seller FROM sellers WHERE id = :id LIMIT 1").columns(is_verified_seller=Boolean),
             {"id": id},
         )
-        return self.to_obj(result.mappings().first())
+        seller = SellerRecord.from_row(result.first())
+        if seller is not None:
+            self.cache.put(seller.id, seller.is_verified_seller)
+        return seller
+
+    async def is_verified(self, seller_id):
+        """Verification flag of the seller, from the per-process cache when possible; None if unknown."""
+        cached = self.cache.get(seller_id)
+        if cached is not MISSING:
+            return cached
+        seller = await self.get_seller(seller_id)
+        return seller.is_verified_seller if seller is not None else None
 
+    @db_query("insert_seller")
     async def create_seller(self, seller):
         result = await self.db.execute(
             text(
                 "INSERT INTO sellers (is_verified_seller) "
                 "VALUES (:is_verified_seller) "
-                "RETURNING *"
-            ),
+                "RETURNING id, is_verified_seller"
+            ).columns(is_verified_seller=Boolean),
             {"is_verified_seller": seller.is_verified_seller},
         )
         await self.db.commit()
-        row = self.to_obj(result.mappings().first())
+        row = SellerRecord.from_row(result.first())
+        self.cache.put(row.id, row.is_verified_seller)
         seller.id = row.id
         return seller
+
+    @db_query("update_seller")
+    async def set_verified(self, seller_id, is_verified: bool):
+        result = await self.db.execute(
+            text(
+                "UPDATE sellers SET is_verified_seller = :is_verified_seller "
+                "WHERE id = :id RETURNING id, is_verified_seller"
+            ).columns(is_verified_seller=Boolean),
+            {"id": seller_id, "is_verified_seller": is_verified},
+        )
+        seller = SellerRecord.from_row(result.first())
+        # Признак продавца уже лежит в item_features всех его объявлений
+        await self.db.execute(
+            text(
+                "UPDATE item_features SET f_is_verified_seller = :value "
+                "WHERE item_id IN (SELECT id FROM items WHERE seller_id = :id)"
+            ),
+            {"id": seller_id, "value": FEATURE_SCHEMA.spec("is_verified_seller").scalar(is_verified)},
+        )
+        await self.db.commit()
+        self.cache.invalidate(seller_id)
+        return seller
@@ -1,32 +1,53 @@
 import asyncio
+import json
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, HTTPException, Depends, Request
-from fastapi.responses import JSONResponse
+from typing import Literal
+from fastapi import FastAPI, HTTPException, Depends, Request, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from dto.request import PredictRequest
 from dto.auth import LoginRequest
-from dto.response import AsyncPredictResponse, ModerationResultResponse
+from dto.response import AsyncPredictResponse, ModerationResultResponse, PredictResponse
 from service.model_service import ModelService
 from service.moderation_service import ModerationService
-from service.auth_service import AuthService
+from service.auth_service import AuthService, VerifiedTokenCache
+from service.passwords import password_hasher
 from repository.model.mlflow_repository import MlflowModelRepository
 from repository.item.item_repository import ItemRepository
 from repository.moderation_result.moderation_result_repository import ModerationResultRepository
 from repository.account.account_repository import AccountRepository
+from repository.account.revoked_accounts import revoked_accounts
+from repository.account.account_tier_cache import account_tier_cache, MISSING as TIER_MISSING
+from repository.seller.seller_repository import SellerRepository
 import logging
-import mlflow
 import os
-import sentry_sdk
 from starlette.concurrency import run_in_threadpool
-from db.database import get_db, session_maker, engine, Base
+from db.database import get_db, session_maker, engine, Base, DB_MAX_OVERFLOW
 import db.tables.item
 import db.tables.seller 
 import db.tables.moderation_result
 import db.tables.account
+import db.tables.item_features
 from utils import load_synthetic_data
-from app.clients.kafka import KafkaProducer
-from app.clients.settings import KAFKA_BOOTSTRAP
+from app.clients.queue import create_queue_producer
+from app.clients.lanes import INTERACTIVE, BULK
+from app.clients.settings import KAFKA_BOOTSTRAP, QUEUE_BACKEND, INFERENCE_BACKEND, INFERENCE_WORKERS
+from service.inference_executor import create_inference_executor
 from repository.moderation_result.moderation_redis_repository import ModerationRedisRepository
-from app.clients.middleware import PrometheusMiddleware, generate_latest, CONTENT_TYPE_LATEST
+from repository.moderation_result.hot_items_repository import hot_items_repository
+from repository.moderation_result.task_events import task_event_listener
+from service.cache_warmer import CacheWarmer
+from app.clients.middleware import PrometheusMiddleware
+from app.admission import create_admission_controller, inference_queue_check, db_pool_check, QueueLagMonitor
+from app.rate_limit import RateLimiter
+from app.responses import FastJSONResponse, RenderedJSONResponse, prediction_body, moderation_result_body
+from repository.records import AccountStatus
+from app.instrumentation import stage, AUTH
+from app.logs import configure_logging, log_event
+from app.tracing import init_sentry, capture_exception
+from app.startup import StartupState
+from app.health import run_checks, ping_database
+from service.features import FEATURE_SCHEMA
+from app.metrics_exporter import collect_latest, CONTENT_TYPE_LATEST
 from app.metrics import (
     PREDICTIONS_TOTAL,
     PREDICTION_DURATION,
@@ -41,89 +62,238 @@ from app.exceptions import (
     InvalidCredentialsError,
     AccountBlockedError,
     InvalidTokenError,
+    ProfilerBusyError,
+    PasswordHashingBusyError,
 )
+from app import profiling
 from fastapi import Response
 import time
 
 ML_MODEL = None
 MLFLOW_TRACKING_URI = os.getenv("MLFLOW_TRACKING_URI", "http://mlflow:5000")
 JWT_SECRET = os.getenv("JWT_SECRET", "secret-key")
+# Сколько последних результатов загрузить в кэш до готовности; 0 — не ждать прогрева
+READY_CACHE_WARMUP_ITEMS = int(os.getenv("READY_CACHE_WARMUP_ITEMS", "0"))
+# Запрос для прогревочного предсказания при старте
+WARMUP_REQUEST = PredictRequest(item_id=0, name="warmup", description="warmup", category=0, images_qty=0)
+# Ограничения long-poll и SSE для /moderation_result
+MODERATION_RESULT_MAX_WAIT = float(os.getenv("MODERATION_RESULT_MAX_WAIT", "30"))
+MODERATION_STREAM_MAX_SECONDS = float(os.getenv("MODERATION_STREAM_MAX_SECONDS", "300"))
+MODERATION_STREAM_MAX_TASKS = int(os.getenv("MODERATION_STREAM_MAX_TASKS", "100"))
+# Комментарий-пинг в SSE, чтобы прокси не закрывали молчащее соединение
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+# Id аккаунтов, которым доступны /admin/* (профилирование). Не логины: логин не уникален
+ADMIN_ACCOUNT_IDS = {int(account_id) for account_id in os.getenv("ADMIN_ACCOUNT_IDS", "").split(",") if account_id.strip()}
 logger = logging.getLogger(__name__)
-producer = KafkaProducer(KAFKA_BOOTSTRAP)
+producer = create_queue_producer(QUEUE_BACKEND, KAFKA_BOOTSTRAP, session_maker)
 redis_repo = ModerationRedisRepository()
+startup_state = StartupState()
+inference_executor = create_inference_executor(INFERENCE_BACKEND, INFERENCE_WORKERS)
+# Контроль допуска: при перегрузке запросы получают 429 с Retry-After, а не ждут в очередях
+queue_lag = QueueLagMonitor(session_maker)
+admit_predict = create_admission_controller("predict", {
+    "inference_queue": inference_queue_check(inference_executor),
+    "db_pool": db_pool_check(engine, DB_MAX_OVERFLOW),
+})
+admit_simple_predict = create_admission_controller("simple_predict", {
+    "inference_queue": inference_queue_check(inference_executor),
+    "db_pool": db_pool_check(engine, DB_MAX_OVERFLOW),
+})
+admit_async_predict = create_admission_controller("async_predict", {
+    "db_pool": db_pool_check(engine, DB_MAX_OVERFLOW),
+    "queue_lag": queue_lag.check(),
+})
+# Лимиты частоты запросов аккаунта по его тарифу: корзины токенов в Redis
+rate_limiter = RateLimiter()
 
 def get_model_service(db = Depends(get_db)):
     return ModelService(
         item_repository=ItemRepository(db), 
         model_repository=model_repository, 
-        model=ML_MODEL
+        model=ML_MODEL,
+        executor=inference_executor,
+        seller_repository=SellerRepository(db),
     )
 
 def get_moderation_service(db = Depends(get_db)):
     return ModerationService(
         item_repo=ItemRepository(db),
         moder_repo=ModerationResultRepository(db, redis_repo),
+        hot_items=hot_items_repository,
+        task_events=task_event_listener,
     )
 
 def get_auth_service(db = Depends(get_db)):
-    return AuthService(account_repo=AccountRepository(db), secret_key=JWT_SECRET)
+    return AuthService(account_repo=AccountRepository(db, revoked_accounts), secret_key=JWT_SECRET)
+
+# Один объект на процесс: проверенные токены запоминаются до истечения
+token_verifier = AuthService(account_repo=None, secret_key=JWT_SECRET, token_cache=VerifiedTokenCache())
 
 async def get_current_account(request: Request, db = Depends(get_db)):
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    auth = AuthService(account_repo=None, secret_key=JWT_SECRET)
-    try:
-        payload = auth.verify_token(token)
-    except InvalidTokenError as e:
-        raise HTTPException(status_code=401, detail=str(e))
-    account = await AccountRepository(db).get_by_id(payload["sub"])
+    with stage(AUTH):
+        try:
+            payload = token_verifier.verify_token(token)
+        except InvalidTokenError as e:
+            raise HTTPException(status_code=401, detail=str(e))
+        if revoked_accounts.loaded:
+            # Быстрый путь: заблокированные и удалённые аккаунты — в множестве отозванных,
+            # тариф — в кэше процесса (токен переживает смену тарифа, поэтому из него не берётся)
+            if revoked_accounts.is_revoked(payload["sub"]):
+                raise HTTPException(status_code=403, detail="Account is blocked")
+            tier = account_tier_cache.get(payload["sub"])
+            if tier is not TIER_MISSING:
+                return AccountStatus(payload["sub"], payload["login"], False, tier)
+        # Множество ещё не загружено или тарифа нет в кэше: get_status положит его туда
+        account = await AccountRepository(db).get_status(payload["sub"])
     if account is None:
         raise HTTPException(status_code=403, detail="Account not found")
     if account.is_blocked:
         raise HTTPException(status_code=403, detail="Account is blocked")
     return account
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    global ML_MODEL
-    sentry_sdk.init(
-        # Тут должен быть ключ от Sentry
-        dsn=os.getenv("SENTRY_DSN", ""),
-        traces_sample_rate=1.0,
-        environment=os.getenv("SENTRY_ENVIRONMENT", "dev"),
-    )
-    logger.info("Setting up MLflow tracking")
+rate_limit_simple_predict = rate_limiter.dependency("simple_predict", get_current_account)
+rate_limit_async_predict = rate_limiter.dependency("async_predict", get_current_account)
+
+def get_admin_account(account = Depends(get_current_account)):
+    if account.id not in ADMIN_ACCOUNT_IDS:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return account
+
+def setup_mlflow():
+    # Импорт mlflow занимает около секунды, поэтому он выполняется в потоке при старте
+    import mlflow
     mlflow.set_tracking_uri(MLFLOW_TRACKING_URI)
     os.environ["MLFLOW_TRACKING_INSECURE_TLS"] = "true"
     mlflow.sklearn.autolog(disable=True)
-    await producer.start()
-    try:
+
+async def start_queue():
+    async with startup_state.phase(producer.backend):
+        await producer.start()
+
+async def init_db():
+    async with startup_state.phase("create_all"):
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+    async with startup_state.phase("synthetic_data"):
         async with session_maker() as db:
-            item_repo = ItemRepository(db)
-            await load_synthetic_data(item_repo)
-            service = ModelService(
-                item_repository=item_repo, 
-                model_repository=model_repository,
+            await load_synthetic_data(ItemRepository(db))
+    await seed_revoked_accounts()
+
+async def seed_revoked_accounts():
+    # Аккаунты, заблокированные в обход AccountRepository (миграцией, руками в БД)
+    try:
+        async with startup_state.phase("revoked_accounts"):
+            async with session_maker() as db:
+                await revoked_accounts.revoke(*await AccountRepository(db).get_blocked_ids())
+    except Exception as e:
+        # Без множества проверка токенов читает аккаунт из БД: медленнее, но верно
+        logger.warning(f'Failed to seed revoked accounts: {e}')
+
+async def load_model():
+    global ML_MODEL
+    async with startup_state.phase("mlflow_import"):
+        logger.info("Setting up MLflow tracking")
+        await run_in_threadpool(setup_mlflow)
+    async with startup_state.phase("model"):
+        service = ModelService(item_repository=None, model_repository=model_repository)
+        try:
+            await asyncio.wait_for(
+                run_in_threadpool(service.load_model),
+                timeout=5,
             )
-            try:
-                await asyncio.wait_for(
-                    run_in_threadpool(service.load_model),
-                    timeout=5,
-                )
-                logger.info("Model loaded successfully")
-                ML_MODEL = service.model
-            except (TimeoutError, RuntimeError, asyncio.TimeoutError):
-                logger.info('Model was not found in MLFlow or timeout. Training a new one')
-                await run_in_threadpool(service.train_model)
-                ML_MODEL = service.model
-            except Exception as e:
-                logger.exception(f'Failed to load model on service start: {e}')
+            logger.info("Model loaded successfully")
+            ML_MODEL = service.model
+        except (TimeoutError, RuntimeError, asyncio.TimeoutError, ModelIsNotAvailable) as e:
+            # ModelIsNotAvailable — модель обучена на другой схеме признаков: обслуживать её нельзя
+            logger.info(f'Model was not loaded from MLFlow ({e}). Training a new one')
+            await run_in_threadpool(service.train_model)
+            ML_MODEL = service.model
+        except Exception as e:
+            logger.exception(f'Failed to load model on service start: {e}')
+
+async def warmup_prediction():
+    # Первое предсказание прогревает пул инференса и модель до прихода трафика
+    service = ModelService(item_repository=None, model_repository=model_repository, model=ML_MODEL, executor=inference_executor)
+    try:
+        async with startup_state.phase("warmup_prediction"):
+            await service.predict_batch_async(FEATURE_SCHEMA.build_matrix([FEATURE_SCHEMA.raw_from(WARMUP_REQUEST)]))
+    except Exception as e:
+        logger.exception(f'Warm-up prediction failed: {e}')
+
+async def prepare_model():
+    await load_model()
+    if ML_MODEL is None:
+        return
+    async with startup_state.phase("inference_executor"):
+        inference_executor.start(ML_MODEL)
+    logger.info(f'Inference executor started: {inference_executor.backend} x{inference_executor.max_workers}')
+    await warmup_prediction()
+
+async def prepare_password_hasher():
+    # Фиктивный хеш для входа с неизвестным логином считается в пуле, а не на event loop
+    async with startup_state.phase("password_hasher"):
+        await password_hasher.prepare()
+
+def create_cache_warmer():
+    model_service = ModelService(
+        item_repository=None,
+        model_repository=model_repository,
+        model=ML_MODEL,
+        executor=inference_executor,
+    )
+    return CacheWarmer(session_maker, redis_repo, hot_items=hot_items_repository, model_service=model_service)
+
+async def warm_cache(limit):
+    try:
+        async with startup_state.phase("cache_warmup"):
+            await create_cache_warmer().warm(limit)
+    except Exception as e:
+        # Без прогретого кэша сервис работает, только медленнее: старт не прерывается
+        logger.warning(f'Cache warm-up failed: {e}')
+
+async def warm_up():
+    """Loads and warms up the model, then the cache; the process is ready when they are done."""
+    try:
+        await prepare_model()
+        if READY_CACHE_WARMUP_ITEMS:
+            # Прогрев идёт после загрузки модели: объявления без результата сразу скорятся
+            await warm_cache(READY_CACHE_WARMUP_ITEMS)
+        startup_state.mark_ready()
+    except Exception as e:
+        # Процесс остаётся живым, но не готовым: причина видна в /health/ready
+        capture_exception(e)
+        logger.exception(f'Warm-up failed: {e}')
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    async with startup_state.phase("sentry"):
+        init_sentry("dev")
+    try:
+        # Очередь и БД друг от друга не зависят: поднимаются одновременно
+        await startup_state.run_concurrently(start_queue(), init_db(), prepare_password_hasher())
+        queue_lag.start()
+        revoked_accounts.start()
+        # Модель и прогревы идут в фоне: uvicorn сразу открывает сокет, /health/live отвечает,
+        # а /health/ready не пускает трафик, пока они не закончатся
+        startup_state.run_in_background("warm_up", warm_up())
         yield
     finally:
+        startup_state.mark_stopping()
+        await startup_state.stop_background()
+        await queue_lag.stop()
+        await revoked_accounts.stop()
+        await task_event_listener.stop()
+        inference_executor.shutdown()
+        password_hasher.shutdown()
         await producer.stop()
+        try:
+            await hot_items_repository.flush()
+        except Exception as e:
+            logger.warning(f'Failed to flush item access counters: {e}')
 
 model_repository = MlflowModelRepository(MLFLOW_TRACKING_URI)
 
@@ -143,8 +313,10 @@ async def login(body: LoginRequest, auth_service = Depends(get_auth_service)):
         raise HTTPException(status_code=401, detail="Invalid login or password")
     except AccountBlockedError:
         raise HTTPException(status_code=403, detail="Account is blocked")
+    except PasswordHashingBusyError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
 
-@app.post("/predict")
+@app.post("/predict", response_model=PredictResponse, response_class=FastJSONResponse, dependencies=[Depends(admit_predict)])
 async def get_prediction(request: PredictRequest, service = Depends(get_model_service), account = Depends(get_current_account)):
     """
     Get prediction
@@ -154,33 +326,39 @@ async def get_prediction(request: PredictRequest, service = Depends(get_model_se
     Returns: PredictResponse: Model predictions on success (200)
              HTTPException: Error message on failure (422)
     """
-    logger.info(f'Got new request: {request}.')
+    log_event(logger, "predict.request", request=request)
     start = time.perf_counter()
     try:
-        result = await run_in_threadpool(service.predict, request)
+        result = await service.predict_async(request)
         PREDICTION_DURATION.observe(time.perf_counter() - start)
         PREDICTIONS_TOTAL.labels(result="violation" if result.is_violation else "no_violation").inc()
         MODEL_PREDICTION_PROBABILITY.observe(result.probability)
-        logger.info(f'Response: {result}.')
-        return result
+        log_event(logger, "predict.response", result=result)
+        # Ответ модели уже провалидирован PredictResponse: повторная проверка и jsonable_encoder не нужны
+        return FastJSONResponse(prediction_body(result))
     except ModelIsNotAvailable as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         PREDICTION_ERRORS_TOTAL.labels(error_type="model_not_found").inc()
         logger.error(f'Got exception during prediction. Details: {str(e)}.')
         raise HTTPException(status_code=503, detail=str(e))
     except ErrorInPrediction as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         PREDICTION_ERRORS_TOTAL.labels(error_type="prediction_error").inc()
         logger.error(f'Got exception during prediction. Details: {str(e)}.')
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         PREDICTION_ERRORS_TOTAL.labels(error_type="internal").inc()
         logger.error(f'Got exception during prediction. Details: {str(e)}.')
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/simple_predict/{item_id}")
-async def get_prediction_for_id(item_id: int, model_service = Depends(get_model_service), moder_service = Depends(get_moderation_service), account = Depends(get_current_account)):
+@app.post(
+    "/simple_predict/{item_id}",
+    response_model=PredictResponse,
+    response_class=FastJSONResponse,
+    dependencies=[Depends(admit_simple_predict)],
+)
+async def get_prediction_for_id(item_id: int, model_service = Depends(get_model_service), moder_service = Depends(get_moderation_service), account = Depends(rate_limit_simple_predict)):
     """
     Get prediction
 
@@ -188,112 +366,177 @@ async def get_prediction_for_id(item_id: int, model_service = Depends(get_model_
     Returns: PredictResponse: Model predictions on success (200)
              HTTPException: Error message on failure (422)
     """
-    logger.info(f'Got new prediciton request for item with id {item_id}.')
+    log_event(logger, "simple_predict.request", item_id=item_id)
     try:
         result = await moder_service.get_or_predict_for_item(item_id, model_service)
         if result is None:
             raise AdvertisementNotFoundError(f"Item with id={item_id} not found")
         
-        is_violation = result.get("is_violation") if isinstance(result, dict) else result.is_violation
-        probability = result.get("probability") if isinstance(result, dict) else result.probability
-        PREDICTIONS_TOTAL.labels(result="violation" if is_violation else "no_violation").inc()
-        if probability is not None:
-            MODEL_PREDICTION_PROBABILITY.observe(probability)
-        logger.info(f'Response: {result}.')
-        return result
+        PREDICTIONS_TOTAL.labels(result="violation" if result.is_violation else "no_violation").inc()
+        if result.probability is not None:
+            MODEL_PREDICTION_PROBABILITY.observe(result.probability)
+        log_event(logger, "simple_predict.response", item_id=item_id, result=result)
+        # Из кэша приходит ModerationRecord, от модели — PredictResponse; ответ один и тот же
+        return FastJSONResponse(prediction_body(result))
     except AdvertisementNotFoundError as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         PREDICTION_ERRORS_TOTAL.labels(error_type="item_not_found").inc()
         logger.error(f'Got exception during prediction. Details: {str(e)}.')
         raise HTTPException(status_code=404, detail=str(e))
     except ModelIsNotAvailable as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         PREDICTION_ERRORS_TOTAL.labels(error_type="model_not_found").inc()
         logger.error(f'Got exception during prediction. Details: {str(e)}.')
         raise HTTPException(status_code=503, detail=str(e))
     except ErrorInPrediction as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         PREDICTION_ERRORS_TOTAL.labels(error_type="prediction_error").inc()
         logger.error(f'Got exception during prediction. Details: {str(e)}.')
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         PREDICTION_ERRORS_TOTAL.labels(error_type="internal").inc()
         logger.error(f'Got exception during prediction. Details: {str(e)}.')
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/async_predict/{item_id}")
-async def get_async_prediction_for_id(item_id: int, service = Depends(get_moderation_service), account = Depends(get_current_account)):
+@app.post(
+    "/async_predict/{item_id}",
+    response_model=AsyncPredictResponse,
+    response_class=FastJSONResponse,
+    dependencies=[Depends(admit_async_predict)],
+)
+async def get_async_prediction_for_id(
+    item_id: int,
+    priority: Literal[INTERACTIVE, BULK] = INTERACTIVE,
+    service = Depends(get_moderation_service),
+    account = Depends(rate_limit_async_predict),
+):
     """
     Create async moderation request for item
 
     Args: item_id (int): The item ID to moderate
+          priority (str): Lane of the task: interactive (default) or bulk for re-scoring
+                          jobs, which must not delay interactive requests
 
     Returns: AsyncPredictResponse: Task information on success (200)
              HTTPException: Error message on failure (404, 500)
     """
-    logger.info(f'Got new async prediction request for item with id {item_id}.')
+    log_event(logger, "async_predict.request", item_id=item_id, priority=priority)
     try:
-        task_id = await service.get_moderation_task_id_for_item(item_id)
+        task_id = await service.get_moderation_task_id_for_item(item_id, priority)
         if task_id is None:
             raise HTTPException(status_code=404, detail="Item with id is not found")
-        await producer.send_moderation_request(item_id)
-        logger.info(f'Created moderation task id: {task_id}.')
-        return AsyncPredictResponse(
-            task_id=task_id,
-            status="pending",
-            message="Moderation request accepted"
-        )
+        await producer.send_moderation_request(item_id, priority)
+        log_event(logger, "async_predict.response", item_id=item_id, task_id=task_id)
+        return FastJSONResponse({
+            "task_id": task_id,
+            "status": "pending",
+            "message": "Moderation request accepted",
+        })
     except HTTPException:
         PREDICTION_ERRORS_TOTAL.labels(error_type="item_not_found").inc()
         raise
     except AdvertisementNotFoundError as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         PREDICTION_ERRORS_TOTAL.labels(error_type="item_not_found").inc()
         logger.error(f'Got exception during prediction. Details: {str(e)}.')
         raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         PREDICTION_ERRORS_TOTAL.labels(error_type="internal").inc()
         logger.error(f'Got exception during prediction. Details: {str(e)}.')
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/moderation_result/{task_id}")
-async def get_moderation_result(task_id: int, service = Depends(get_moderation_service), account = Depends(get_current_account)):
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+async def moderation_events(service, task_ids, timeout):
+    delivered = set()
+    try:
+        async for update in service.stream_results(task_ids, timeout, SSE_HEARTBEAT_SECONDS):
+            if update is None:
+                yield ": keep-alive\n\n"
+                continue
+            task_id, task = update
+            delivered.add(task_id)
+            if task is None:
+                yield sse_event("not_found", {"task_id": task_id})
+            else:
+                yield sse_event("result", moderation_result_body(task))
+        pending = [task_id for task_id in dict.fromkeys(task_ids) if task_id not in delivered]
+        yield sse_event("timeout" if pending else "done", {"pending": pending})
+    except Exception as e:
+        capture_exception(e)
+        logger.error(f'Error streaming moderation results. Details: {str(e)}.')
+        yield sse_event("error", {"detail": str(e)})
+
+@app.get("/moderation_result/stream")
+async def stream_moderation_results(
+    task_ids: str = Query(..., description="Comma-separated task ids"),
+    timeout: float = Query(60, gt=0, le=MODERATION_STREAM_MAX_SECONDS),
+    service = Depends(get_moderation_service),
+    account = Depends(get_current_account),
+):
+    """
+    Stream moderation results of several tasks as server-sent events
+
+    Every task produces one `result` event when it leaves `pending` (or `not_found`).
+    The stream ends with `done`, or with `timeout` listing the tasks still pending.
+
+    Args: task_ids (str): Comma-separated task IDs
+          timeout (float): How long to keep the stream open, in seconds
+
+    Returns: StreamingResponse: text/event-stream on success (200)
+             HTTPException: Error message on failure (400)
+    """
+    try:
+        ids = [int(task_id) for task_id in task_ids.split(",") if task_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="task_ids must be comma-separated integers")
+    if not ids or len(ids) > MODERATION_STREAM_MAX_TASKS:
+        raise HTTPException(status_code=400, detail=f"Expected 1 to {MODERATION_STREAM_MAX_TASKS} task ids")
+    return StreamingResponse(
+        moderation_events(service, ids, timeout),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/moderation_result/{task_id}", response_model=ModerationResultResponse, response_class=FastJSONResponse)
+async def get_moderation_result(
+    task_id: int,
+    wait: float = Query(0, ge=0, le=MODERATION_RESULT_MAX_WAIT),
+    service = Depends(get_moderation_service),
+    account = Depends(get_current_account),
+):
     """
     Get moderation result by task ID
 
+    With `wait`, the request is held until the task leaves `pending` or `wait`
+    seconds pass, whichever comes first (long-poll).
+
     Args: task_id (int): The moderation task ID
+          wait (float): Maximum time to wait for a pending task, in seconds
 
     Returns: ModerationResultResponse: Moderation result on success (200)
              HTTPException: Error message on failure (404, 500)
     """
     try:
-        task = await service.get_moderation_result(task_id)
+        # Завершённая задача: ответ отрендерен при записи в кэш и отдаётся как есть
+        rendered = await service.get_rendered_result(task_id)
+        if rendered is not None:
+            if rendered.probability is not None:
+                MODEL_PREDICTION_PROBABILITY.observe(rendered.probability)
+            return RenderedJSONResponse(rendered.body)
+        task = await service.wait_for_result(task_id, wait)
         if task is None:
             raise HTTPException(status_code=404, detail="Task with id is not found")
-        if isinstance(task, dict):
-            prob = task.get("probability")
-            if prob is not None:
-                MODEL_PREDICTION_PROBABILITY.observe(prob)
-            return ModerationResultResponse(
-                task_id=task["id"],
-                status=task["status"],
-                is_violation=task.get("is_violation"),
-                probability=prob
-            )
         if task.probability is not None:
             MODEL_PREDICTION_PROBABILITY.observe(task.probability)
-        return ModerationResultResponse(
-            task_id=task.id,
-            status=task.status,
-            is_violation=task.is_violation,
-            probability=task.probability
-        )
+        return FastJSONResponse(moderation_result_body(task))
     except HTTPException:
         raise
     except Exception as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         PREDICTION_ERRORS_TOTAL.labels(error_type="internal").inc()
         logger.error(f'Got exception during prediction. Details: {str(e)}.')
         raise HTTPException(status_code=500, detail=str(e))
@@ -319,12 +562,99 @@ async def close_item(item_id: int, service = Depends(get_moderation_service), ac
     except HTTPException:
         raise
     except Exception as e:
-        sentry_sdk.capture_exception(e)
+        capture_exception(e)
         logger.error(f'Error closing item {item_id}: {str(e)}.')
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness: the process is up and the event loop responds."""
+    return {"status": "alive"}
+
+def readiness_checks():
+    checks = {
+        "startup": lambda: startup_state.ready,
+        "model": lambda: ML_MODEL is not None,
+        "warmup_prediction": lambda: "warmup_prediction" in startup_state.completed,
+        "database": lambda: ping_database(session_maker),
+        "redis": redis_repo.ping,
+        producer.backend: lambda: producer.is_started,
+    }
+    if READY_CACHE_WARMUP_ITEMS:
+        # Прогрев мог и упасть: важно только, что он закончился до приёма трафика
+        checks["cache_warmup"] = lambda: "cache_warmup" in startup_state.phases
+    return checks
+
+@app.get("/health/ready")
+async def health_ready():
+    """
+    Readiness: startup finished, the model is loaded and warmed up, DB, Redis and Kafka
+    are reachable and (if READY_CACHE_WARMUP_ITEMS is set) the hot items are cached.
+    Warm-up steps still in progress are listed in `running`
+
+    Returns: check results and startup phase durations (200), or the same with 503
+    """
+    checks = await run_checks(readiness_checks())
+    ready = all(error is None for error in checks.values())
+    state = startup_state.to_dict()
+    state["status"] = "ready" if ready else "not_ready"
+    state["checks"] = {name: error or "ok" for name, error in checks.items()}
+    return JSONResponse(content=state, status_code=200 if ready else 503)
+
+@app.get("/admin/profile")
+async def admin_profile(
+    seconds: float = Query(10, gt=0, le=profiling.PROFILE_MAX_SECONDS),
+    mode: Literal["wall", "cpu"] = profiling.WALL,
+    format: Literal["collapsed", "speedscope"] = profiling.COLLAPSED,
+    interval: float = Query(profiling.DEFAULT_INTERVAL, ge=0.001, le=1),
+    account = Depends(get_admin_account),
+):
+    """
+    Sample this API process for `seconds`
+
+    Args: mode: wall (all threads, waiting included) or cpu (event loop thread, CPU time only)
+          format: collapsed (flamegraph.pl, speedscope) or speedscope JSON
+
+    Returns: profile file on success (200)
+             HTTPException: 403 for non-admins, 409 if another session is running
+    """
+    try:
+        profile = await profiling.profile_for(seconds, mode, interval)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    filename = f"api-{os.getpid()}-{int(time.time())}"
+    if format == profiling.COLLAPSED:
+        return PlainTextResponse(
+            profile.collapsed(),
+            headers={"Content-Disposition": f'attachment; filename="{filename}.collapsed"'},
+        )
+    return JSONResponse(
+        profile.speedscope(filename),
+        headers={"Content-Disposition": f'attachment; filename="{filename}.speedscope.json"'},
+    )
+
+@app.get("/admin/tracemalloc")
+async def admin_tracemalloc(
+    seconds: float = Query(10, ge=0, le=profiling.PROFILE_MAX_SECONDS),
+    top: int = Query(25, gt=0, le=500),
+    account = Depends(get_admin_account),
+):
+    """
+    Top allocation sites of this API process and their growth over `seconds`
+
+    Returns: text report on success (200)
+             HTTPException: 403 for non-admins, 409 if another session is running
+    """
+    try:
+        report = await profiling.tracemalloc_report(seconds, top)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(report)
+
 app.add_middleware(PrometheusMiddleware)
 
 @app.get("/metrics")
 async def metrics():
-    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return Response(content=collect_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -1,16 +1,74 @@
+import hashlib
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 
 import jwt
 
 from app.exceptions import InvalidCredentialsError, AccountBlockedError, InvalidTokenError
 
+# Сколько проверенных токенов помнит процесс
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", "10000"))
+
+
+class VerifiedTokenCache:
+    """
+    LRU of tokens that already passed signature verification: token digest -> claims.
+
+    A hit skips the HMAC check and JSON decoding of `jwt.decode`. Entries are served
+    until the `exp` of the token; tokens without `exp` and tokens that failed
+    verification are never cached. Only the digest of a token is kept in memory.
+    """
+    def __init__(self, max_size: int = TOKEN_CACHE_MAX_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+    def get(self, token: str):
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            # Истёкший токен идёт в jwt.decode и получает обычную ошибку
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return dict(claims)
+
+    def put(self, token: str, claims: dict) -> None:
+        expires_at = claims.get("exp")
+        if expires_at is None:
+            return
+        key = self.digest(token)
+        self._entries[key] = (dict(claims), expires_at)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
 
 class AuthService:
-    def __init__(self, account_repo, secret_key: str, algorithm: str = "HS256", token_ttl_minutes: int = 30):
+    def __init__(
+        self,
+        account_repo,
+        secret_key: str,
+        algorithm: str = "HS256",
+        token_ttl_minutes: int = 30,
+        token_cache: VerifiedTokenCache = None,
+    ):
         self.account_repo = account_repo
         self.secret_key = secret_key
         self.algorithm = algorithm
         self.token_ttl = timedelta(minutes=token_ttl_minutes)
+        self.token_cache = token_cache
 
     async def authenticate(self, login: str, password: str) -> str:
         account = await self.account_repo.get_by_login_and_password(login, password)
@@ -18,6 +76,8 @@ class AuthService:
             raise InvalidCredentialsError("Invalid login or password")
         if account.is_blocked:
             raise AccountBlockedError("Account is blocked")
+        # Пароль известен только сейчас: старый хеш (MD5, прежние параметры) заменяется новым
+        await self.account_repo.rehash_password(account, password)
         return self.create_token(account.id, account.login)
 
     def create_token(self, account_id: int, login: str) -> str:
@@ -29,11 +89,17 @@ class AuthService:
         return jwt.encode(payload, self.secret_key, algorithm=self.algorithm)
 
     def verify_token(self, token: str) -> dict:
+        if self.token_cache is not None:
+            payload = self.token_cache.get(token)
+            if payload is not None:
+                return payload
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
             payload["sub"] = int(payload["sub"])
-            return payload
         except jwt.ExpiredSignatureError:
             raise InvalidTokenError("Token has expired")
         except jwt.InvalidTokenError:
             raise InvalidTokenError("Invalid token")
+        if self.token_cache is not None:
+            self.token_cache.put(token, payload)
+        return payload
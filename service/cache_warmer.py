@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+import time
+from typing import NamedTuple
+
+from app.metrics import CACHE_WARMUP_ITEMS, CACHE_WARMUP_PROGRESS, CACHE_WARMUP_DURATION
+from repository.item.item_repository import ItemRepository
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+
+logger = logging.getLogger(__name__)
+
+# Объявлений за один проход: один запрос в БД на пачку, один вызов модели, один pipeline в Redis
+CACHE_WARMUP_BATCH_SIZE = int(os.getenv("CACHE_WARMUP_BATCH_SIZE", "200"))
+# Пауза между пачками, чтобы прогрев не забирал соединения у живого трафика
+CACHE_WARMUP_BATCH_DELAY = float(os.getenv("CACHE_WARMUP_BATCH_DELAY", "0.05"))
+
+
+class WarmupReport(NamedTuple):
+    candidates: int
+    cached: int
+    scored: int
+    skipped: int
+    duration: float
+
+
+class CacheWarmer:
+    """
+    Fills the Redis cache for the hottest items before traffic hits them.
+
+    Candidates are the most accessed items (HotItemsRepository), topped up with items of
+    the most recent completed moderation results. For each batch, stored completed results
+    are cached as they are; open items without one are scored with the model in a single
+    vectorized call. Both go to Redis in one pipeline per batch.
+    """
+    def __init__(
+        self,
+        session_maker,
+        redis_repo,
+        hot_items=None,
+        model_service=None,
+        batch_size: int = CACHE_WARMUP_BATCH_SIZE,
+        batch_delay: float = CACHE_WARMUP_BATCH_DELAY,
+    ):
+        self.session_maker = session_maker
+        self.redis_repo = redis_repo
+        self.hot_items = hot_items
+        self.model_service = model_service
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+
+    async def candidates(self, limit: int) -> list:
+        item_ids = await self.hot_items.top(limit) if self.hot_items is not None else []
+        if len(item_ids) < limit:
+            async with self.session_maker() as db:
+                recent = await ModerationResultRepository(db).get_recent_completed(limit)
+            seen = set(item_ids)
+            for record in recent:
+                if record.item_id not in seen and len(item_ids) < limit:
+                    seen.add(record.item_id)
+                    item_ids.append(record.item_id)
+        return item_ids
+
+    def can_score(self) -> bool:
+        return self.model_service is not None and self.model_service.model is not None
+
+    async def warm_batch(self, item_ids) -> tuple:
+        async with self.session_maker() as db:
+            item_repo = ItemRepository(db)
+            open_ids = await item_repo.get_open_ids(item_ids)
+            completed = await ModerationResultRepository(db).get_completed_for_items(open_ids)
+            to_score = [item_id for item_id in open_ids if item_id not in completed]
+            predictions = []
+            if to_score and self.can_score():
+                scored_ids, matrix = await item_repo.get_feature_matrix(to_score)
+                if scored_ids:
+                    predictions = list(zip(scored_ids, await self.model_service.predict_batch_async(matrix)))
+        await self.redis_repo.set_moderations(list(completed.values()))
+        await self.redis_repo.set_predictions_for_items(predictions)
+        return len(completed), len(predictions)
+
+    async def warm(self, limit: int) -> WarmupReport:
+        start = time.perf_counter()
+        CACHE_WARMUP_PROGRESS.set(0)
+        item_ids = await self.candidates(limit)
+        cached = scored = 0
+        for offset in range(0, len(item_ids), self.batch_size):
+            batch = item_ids[offset:offset + self.batch_size]
+            batch_cached, batch_scored = await self.warm_batch(batch)
+            cached += batch_cached
+            scored += batch_scored
+            CACHE_WARMUP_ITEMS.labels(result="cached").inc(batch_cached)
+            CACHE_WARMUP_ITEMS.labels(result="scored").inc(batch_scored)
+            CACHE_WARMUP_ITEMS.labels(result="skipped").inc(len(batch) - batch_cached - batch_scored)
+            CACHE_WARMUP_PROGRESS.set((offset + len(batch)) / len(item_ids))
+            if self.batch_delay and offset + self.batch_size < len(item_ids):
+                await asyncio.sleep(self.batch_delay)
+        CACHE_WARMUP_PROGRESS.set(1)
+        duration = time.perf_counter() - start
+        CACHE_WARMUP_DURATION.set(duration)
+        report = WarmupReport(
+            candidates=len(item_ids),
+            cached=cached,
+            scored=scored,
+            skipped=len(item_ids) - cached - scored,
+            duration=duration,
+        )
+        logger.info(
+            f"Cache warm-up: {report.candidates} candidates, {report.cached} cached, "
+            f"{report.scored} scored, {report.skipped} skipped in {report.duration:.2f}s"
+        )
+        return report
@@ -0,0 +1,115 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+from app.exceptions import ModelIsNotAvailable
+
+
+@dataclass(frozen=True)
+class FeatureSpec:
+    """
+    One model feature: a raw item column, optionally clipped from above, divided by a scale.
+
+    Attributes:
+        name (str): Name of the feature
+        column (str): Raw value it is computed from (a column of the feature query)
+        scale (float): Divisor that brings the raw value to model range
+        clip (Optional[float]): Upper bound applied to the raw value before scaling
+    """
+    name: str
+    column: str
+    scale: float
+    clip: Optional[float] = None
+
+    def scalar(self, raw) -> float:
+        value = 0.0 if raw is None else float(raw)
+        if self.clip is not None:
+            value = min(value, self.clip)
+        return value / self.scale
+
+
+class FeatureSchema:
+    """
+    Versioned description of the model input shared by training and serving.
+
+    Bump `version` on any change of features, order or scaling: models are tagged with
+    the version they were trained with and are rejected by a serving schema that differs.
+    """
+    def __init__(self, version: int, features: Sequence[FeatureSpec]):
+        self.version = version
+        self.features = tuple(features)
+        self.names = tuple(f.name for f in self.features)
+        self.columns = tuple(f.column for f in self.features)
+        # Колонки таблицы item_features с уже нормализованными значениями
+        self.store_columns = tuple(f"f_{name}" for name in self.names)
+
+    def spec(self, name: str) -> FeatureSpec:
+        return self.features[self.names.index(name)]
+
+    def __len__(self):
+        return len(self.features)
+
+    def raw_from(self, source) -> tuple:
+        """Raw feature values of a PredictRequest or an item-like object, in schema order."""
+        return (
+            getattr(source, "is_verified_seller", None),
+            source.images_qty,
+            len(source.description),
+            source.category,
+        )
+
+    def vector(self, raw: Sequence) -> list:
+        """Scalar path: normalized features of one item as Python floats."""
+        return [spec.scalar(value) for spec, value in zip(self.features, raw)]
+
+    def build_matrix(self, rows: Sequence[Sequence], first_column: int = 0, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Columnar path: normalized float32 matrix for a batch of raw rows.
+
+        Args:
+            rows: raw values as returned by the feature query, one tuple per item
+            first_column: index of the first feature column in a row (e.g. 1 if rows start with id)
+            out: optional preallocated (len(rows), len(schema)) float32 matrix to fill
+
+        Returns:
+            np.ndarray: matrix of shape (len(rows), len(schema))
+        """
+        n = len(rows)
+        if out is None:
+            out = np.empty((n, len(self)), dtype=np.float32)
+        if n == 0:
+            return out
+        # NULL (None) превращается в NaN, а затем в 0.0 — как в скалярном пути
+        raw = np.array(rows, dtype=np.float64)[:, first_column:first_column + len(self)]
+        np.nan_to_num(raw, copy=False, nan=0.0)
+        for j, spec in enumerate(self.features):
+            column = raw[:, j]
+            if spec.clip is not None:
+                np.minimum(column, spec.clip, out=column)
+            np.divide(column, spec.scale, out=out[:, j])
+        return out
+
+    def tag_model(self, model):
+        model.feature_schema_version = self.version
+        return model
+
+    def ensure_compatible(self, model):
+        # Модели, обученные до появления версий схемы, соответствуют версии 1
+        version = getattr(model, "feature_schema_version", 1)
+        if version != self.version:
+            raise ModelIsNotAvailable(
+                f"Model was trained with feature schema v{version}, serving uses v{self.version}"
+            )
+        return model
+
+
+FEATURE_SCHEMA = FeatureSchema(
+    version=1,
+    features=[
+        FeatureSpec(name="is_verified_seller", column="is_verified_seller", scale=1.0),
+        FeatureSpec(name="images_qty", column="images_qty", scale=10.0, clip=10.0),
+        FeatureSpec(name="description_length", column="description_length", scale=1000.0),
+        FeatureSpec(name="category", column="category", scale=100.0),
+    ],
+)
@@ -0,0 +1,194 @@
+import asyncio
+import pickle
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import numpy as np
+
+from app.metrics import INFERENCE_QUEUE_DEPTH, INFERENCE_UTILIZATION
+
+
+class InferenceExecutor:
+    """
+    Runs model scoring for a batch of feature vectors.
+
+    Subclasses decide where the CPU-bound `predict_proba` call runs. The base class
+    keeps queue-depth and utilization gauges up to date for every backend.
+    """
+    backend = "base"
+
+    def __init__(self, max_workers: int = 1):
+        self.max_workers = max(1, max_workers)
+        self._in_flight = 0
+        self._model = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._model is not None
+
+    def start(self, model) -> None:
+        self._model = model
+
+    def shutdown(self) -> None:
+        self._model = None
+
+    async def _run(self, features: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    @property
+    def queue_depth(self) -> int:
+        """Calls waiting for a free slot of the pool."""
+        return max(0, self._in_flight - self.max_workers)
+
+    def _report(self) -> None:
+        INFERENCE_QUEUE_DEPTH.labels(backend=self.backend).set(self.queue_depth)
+        INFERENCE_UTILIZATION.labels(backend=self.backend).set(min(self._in_flight, self.max_workers) / self.max_workers)
+
+    async def predict_proba(self, features: np.ndarray) -> np.ndarray:
+        """
+        Args:
+            features (np.ndarray): 2D matrix, one row of model features per item
+
+        Returns:
+            np.ndarray: class probabilities, one row per item
+        """
+        if not self.is_running:
+            raise RuntimeError("Inference executor is not started. Call start(model) on startup.")
+        self._in_flight += 1
+        self._report()
+        try:
+            return await self._run(np.ascontiguousarray(features))
+        finally:
+            self._in_flight -= 1
+            self._report()
+
+
+class InlineInferenceExecutor(InferenceExecutor):
+    """Scores right in the event loop. Cheapest for tiny models, blocks I/O for heavy ones."""
+    backend = "inline"
+
+    async def _run(self, features):
+        return self._model.predict_proba(features)
+
+
+class ThreadPoolInferenceExecutor(InferenceExecutor):
+    """Scores in a dedicated thread pool; helps while the model releases the GIL (numpy/BLAS)."""
+    backend = "thread"
+
+    def __init__(self, max_workers: int = 1):
+        super().__init__(max_workers)
+        self._pool = None
+
+    def start(self, model):
+        super().start(model)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+
+    def shutdown(self):
+        super().shutdown()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    async def _run(self, features):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, self._model.predict_proba, features)
+
+
+_PROCESS_MODEL = None
+_PROCESS_SHM = None
+
+
+def share_model(model):
+    """
+    Pickles the model with protocol 5 and places both the pickle stream and the
+    out-of-band array buffers (the weights) into one shared memory block.
+
+    Returns:
+        tuple: the SharedMemory block (owned by the caller) and the layout needed to load it
+    """
+    buffers = []
+    payload = pickle.dumps(model, protocol=5, buffer_callback=buffers.append)
+    raw = [b.raw() for b in buffers]
+    size = len(payload) + sum(r.nbytes for r in raw)
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    shm.buf[:len(payload)] = payload
+    offset = len(payload)
+    layout = []
+    for r in raw:
+        shm.buf[offset:offset + r.nbytes] = r
+        layout.append((offset, r.nbytes))
+        offset += r.nbytes
+    return shm, (shm.name, len(payload), layout)
+
+
+def load_shared_model(name: str, payload_size: int, layout):
+    """Attaches to the block created by share_model; array weights stay in shared memory."""
+    shm = shared_memory.SharedMemory(name=name)
+    buffers = [shm.buf[offset:offset + size] for offset, size in layout]
+    model = pickle.loads(bytes(shm.buf[:payload_size]), buffers=buffers)
+    return shm, model
+
+
+def _init_inference_process(name, payload_size, layout):
+    global _PROCESS_MODEL, _PROCESS_SHM
+    _PROCESS_SHM, _PROCESS_MODEL = load_shared_model(name, payload_size, layout)
+
+
+def _predict_in_process(features):
+    return _PROCESS_MODEL.predict_proba(features)
+
+
+class ProcessPoolInferenceExecutor(InferenceExecutor):
+    """
+    Scores in a pool of processes, so heavy models don't hold the API/worker GIL.
+
+    The model is loaded once per process from shared memory when the process starts;
+    only the feature matrix and the probabilities cross the process boundary.
+    """
+    backend = "process"
+
+    def __init__(self, max_workers: int = 1):
+        super().__init__(max_workers)
+        self._pool = None
+        self._shm = None
+
+    def start(self, model):
+        self.shutdown()
+        super().start(model)
+        self._shm, layout = share_model(model)
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=get_context("spawn"),
+            initializer=_init_inference_process,
+            initargs=layout,
+        )
+
+    def shutdown(self):
+        super().shutdown()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    async def _run(self, features):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, _predict_in_process, features)
+
+
+INFERENCE_BACKENDS = {
+    InlineInferenceExecutor.backend: InlineInferenceExecutor,
+    ThreadPoolInferenceExecutor.backend: ThreadPoolInferenceExecutor,
+    ProcessPoolInferenceExecutor.backend: ProcessPoolInferenceExecutor,
+}
+
+
+def create_inference_executor(backend: str, max_workers: int = 1) -> InferenceExecutor:
+    try:
+        executor_class = INFERENCE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown inference backend '{backend}'. Expected one of: {', '.join(INFERENCE_BACKENDS)}")
+    return executor_class(max_workers=max_workers)
@@ -1,6 +1,12 @@
+import asyncio
+
+import numpy as np
+
 from dto.request import PredictRequest
 from dto.response import PredictResponse
 from app.exceptions import ModelIsNotAvailable, ErrorInPrediction, AdvertisementNotFoundError
+from service.features import FEATURE_SCHEMA
+from app.instrumentation import stage, FEATURES, INFERENCE
 
 class ModelService:
     """
@@ -8,18 +14,16 @@ class ModelService:
 
     This service handles model prediction
     """
-    def __init__(self, model_repository, item_repository, model=None):
+    def __init__(self, model_repository, item_repository, model=None, executor=None, seller_repository=None):
         self.model_repository = model_repository
         self.item_repository = item_repository
         self.model = model
+        self.executor = executor
+        self.seller_repository = seller_repository
     
-    def load_or_train_model(self):
-        model = self.model_repository.load_or_train_model()
-        self.model = model
-
     def load_model(self):
         model = self.model_repository.load_model()
-        self.model = model
+        self.model = FEATURE_SCHEMA.ensure_compatible(model)
     
     def train_model(self):
         model = self.model_repository.train_model()
@@ -27,7 +31,7 @@ class ModelService:
 
     def load_or_train_model(self):
         model = self.model_repository.load_or_train_model()
-        self.model = model
+        self.model = FEATURE_SCHEMA.ensure_compatible(model)
     
     def predict(self, request: PredictRequest):
         """
@@ -42,34 +46,81 @@ class ModelService:
         if self.model is None:
             raise ModelIsNotAvailable('Модель не загружена.')
         try:
-            model_input = self.prepare_features(request)
-            probas = self.model_repository.predict(input=model_input, model=self.model)
+            with stage(FEATURES):
+                model_input = self.prepare_features(request)
+            with stage(INFERENCE):
+                probas = self.model_repository.predict(input=model_input, model=self.model)
         except ModelIsNotAvailable:
             raise
         except Exception as e:
             raise ErrorInPrediction(f"Ошибка при выполнении предсказания: {e}") from e
 
+        return self.to_response(probas)
+
+    async def predict_async(self, request: PredictRequest):
+        """
+        Generate prediction without blocking the event loop.
+
+        Scoring goes through the configured inference executor (inline, thread pool or
+        process pool); without one the synchronous `predict` runs in a worker thread.
+
+        Args:
+            request (PredictRequest): Request containing input data for prediction
+
+        Returns:
+            PredictResponse: prediction for the request
+        """
+        request = await self.resolve_seller(request)
+        if self.executor is None or not self.executor.is_running:
+            with stage(INFERENCE):
+                return await asyncio.to_thread(self.predict, request)
+        with stage(FEATURES):
+            features = FEATURE_SCHEMA.build_matrix([FEATURE_SCHEMA.raw_from(request)])
+        return (await self.predict_batch_async(features))[0]
+
+    async def resolve_seller(self, request: PredictRequest):
+        """Fills in is_verified_seller by seller_id when the client didn't send it."""
+        if request.is_verified_seller is not None or request.seller_id is None or self.seller_repository is None:
+            return request
+        is_verified = await self.seller_repository.is_verified(request.seller_id)
+        if is_verified is None:
+            return request
+        return request.model_copy(update={"is_verified_seller": is_verified})
+
+    async def predict_batch_async(self, features: np.ndarray):
+        """
+        Score a batch of items at once.
+
+        Args:
+            features (np.ndarray): matrix built by FEATURE_SCHEMA.build_matrix
+
+        Returns:
+            list[PredictResponse]: one prediction per matrix row
+        """
+        if self.model is None:
+            raise ModelIsNotAvailable('Модель не загружена.')
+        try:
+            with stage(INFERENCE):
+                if self.executor is None or not self.executor.is_running:
+                    probas = await asyncio.to_thread(self.model_repository.predict_batch, features, self.model)
+                else:
+                    probas = await self.executor.predict_proba(features)
+        except Exception as e:
+            raise ErrorInPrediction(f"Ошибка при выполнении предсказания: {e}") from e
+        return [self.to_response(row) for row in probas]
+
+    def to_response(self, probas):
         return PredictResponse(
-            is_violation=probas[1] > probas[0],
-            probability=probas[1]
+            is_violation=bool(probas[1] > probas[0]),
+            probability=float(probas[1])
         )
     
     def prepare_features(self, request):
-        is_verified_float = 1.0 if request.is_verified_seller else 0.0
-        images_qty = min(request.images_qty, 10) / 10.0
-        description = len(request.description) / 1000.0
-        category = request.category / 100.0
-        return [is_verified_float, images_qty, description, category]
+        return FEATURE_SCHEMA.vector(FEATURE_SCHEMA.raw_from(request))
     
     async def get_prediction_for_item(self, item_id):
-        item = await self.item_repository.get_item(item_id)
-        if item is None:
+        # Готовый вектор из item_features, как у воркера: описание объявления не читается
+        item_ids, features = await self.item_repository.get_feature_matrix([item_id])
+        if not item_ids:
             raise AdvertisementNotFoundError(f"Item with id={item_id} not found")
-        request = PredictRequest(
-            item_id = item.id,
-            name = item.name,
-            description = item.description,
-            category = item.category,
-            images_qty = item.images_qty
-        )
-        return self.predict(request)
+        return (await self.predict_batch_async(features))[0]
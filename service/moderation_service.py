@@ -1,22 +1,118 @@
+import asyncio
+import logging
+
+from app.clients.lanes import INTERACTIVE
+
+logger = logging.getLogger(__name__)
+
+
 class ModerationService:
-    def __init__(self, moder_repo, item_repo):
+    def __init__(self, moder_repo, item_repo, hot_items=None, task_events=None):
         self.moder_repo = moder_repo
         self.item_repo = item_repo
+        # Счётчики обращений к объявлениям: по ним выбираются объявления для прогрева кэша
+        self.hot_items = hot_items
+        # Уведомления о завершённых задачах для long-poll и SSE
+        self.task_events = task_events
+
+    def is_pending(self, result):
+        return result is not None and result.status in (None, "pending")
+
+    async def record_access(self, item_id):
+        if self.hot_items is None:
+            return
+        try:
+            await self.hot_items.record(item_id)
+        except Exception as e:
+            logger.warning(f"Failed to record access to item {item_id}: {e}")
 
     async def get_prediction_for_item(self, item_id):
         return await self.moder_repo.get_completed_for_item(item_id)
 
-    async def get_moderation_task_id_for_item(self, item_id):
+    async def get_moderation_task_id_for_item(self, item_id, lane=INTERACTIVE):
         item = await self.item_repo.get_item(item_id)
         if item is None:
             return None
-        task = await self.moder_repo.create_and_cache(item_id)
+        task = await self.moder_repo.create_and_cache(item_id, lane)
         return task.id
 
     async def get_moderation_result(self, task_id):
-        return await self.moder_repo.get_result(task_id)
+        result = await self.moder_repo.get_result(task_id)
+        if result is not None:
+            await self.record_access(result.item_id)
+        return result
+
+    async def get_rendered_result(self, task_id):
+        """
+        RenderedResult of a finished task, with the response body rendered when it was
+        cached, or None; a finished task doesn't change, so the body is valid for any `wait`.
+        """
+        rendered = await self.moder_repo.get_rendered_result(task_id)
+        if rendered is not None:
+            await self.record_access(rendered.item_id)
+        return rendered
+
+    async def wait_for_result(self, task_id, timeout):
+        """
+        Long-poll: the moderation result as soon as the task leaves `pending`, or its
+        current state after `timeout` seconds.
+        """
+        if timeout <= 0 or self.task_events is None:
+            return await self.get_moderation_result(task_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        # Подписка до чтения: событие, пришедшее между ними, не теряется
+        async with self.task_events.subscribe([task_id]) as events:
+            result = await self.get_moderation_result(task_id)
+            while self.is_pending(result):
+                left = deadline - loop.time()
+                if left <= 0:
+                    break
+                await self.moder_repo.release_connection()
+                if await events.wait(left):
+                    result = await self.moder_repo.get_result(task_id)
+        return result
+
+    async def stream_results(self, task_ids, timeout, heartbeat):
+        """
+        Yields (task_id, result) for every task once it is finished or turns out missing
+        (result None), until all are delivered or `timeout` seconds pass. Yields None when
+        nothing happened for `heartbeat` seconds.
+        """
+        if self.task_events is None:
+            # Без уведомлений отдаётся только то, что уже готово
+            for task_id in dict.fromkeys(task_ids):
+                result = await self.get_moderation_result(task_id)
+                if not self.is_pending(result):
+                    yield task_id, result
+            return
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        async with self.task_events.subscribe(task_ids) as events:
+            waiting = set()
+            for task_id in dict.fromkeys(task_ids):
+                result = await self.get_moderation_result(task_id)
+                if self.is_pending(result):
+                    waiting.add(task_id)
+                else:
+                    yield task_id, result
+            while waiting:
+                left = deadline - loop.time()
+                if left <= 0:
+                    break
+                delivered = False
+                await self.moder_repo.release_connection()
+                for task_id in sorted(await events.wait(min(left, heartbeat)) & waiting):
+                    result = await self.moder_repo.get_result(task_id)
+                    if not self.is_pending(result):
+                        waiting.discard(task_id)
+                        delivered = True
+                        yield task_id, result
+                if not delivered:
+                    yield None
 
     async def get_or_predict_for_item(self, item_id, model_service):
+        await self.record_access(item_id)
         cached = await self.get_prediction_for_item(item_id)
         if cached is not None:
             return cached
@@ -0,0 +1,153 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import logging
+import os
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+
+from app.exceptions import PasswordHashingBusyError
+
+logger = logging.getLogger(__name__)
+
+# Алгоритм новых хешей: scrypt или pbkdf2_sha256. Хеши с другими параметрами (и старые MD5)
+# проверяются как есть и пересчитываются при следующем входе
+PASSWORD_HASH_ALGORITHM = os.getenv("PASSWORD_HASH_ALGORITHM", "scrypt")
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_PBKDF2_ITERATIONS = int(os.getenv("PASSWORD_PBKDF2_ITERATIONS", "600000"))
+# Хеширование идёт в отдельном пуле потоков, чтобы всплеск входов не занимал event loop;
+# сверх PASSWORD_HASH_MAX_PENDING ожидающих вычислений вход сразу отклоняется
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+SALT_BYTES = 16
+KEY_BYTES = 32
+LEGACY_MD5 = re.compile(r"[0-9a-f]{32}")
+
+
+def b64encode(value: bytes) -> str:
+    return base64.b64encode(value).decode().rstrip("=")
+
+
+def b64decode(value: str) -> bytes:
+    return base64.b64decode(value + "=" * (-len(value) % 4))
+
+
+class PasswordHasher:
+    """
+    Salted password hashes with the parameters stored next to the hash:
+    `scrypt$<n>$<r>$<p>$<salt>$<key>` or `pbkdf2_sha256$<iterations>$<salt>$<key>`.
+
+    Unsalted MD5 hex digests from before are still accepted, so existing accounts can
+    log in; `needs_rehash` is True for them and for hashes made with other parameters
+    than the current ones. The async methods run the KDF in a pool of `workers` threads
+    (hashlib releases the GIL while hashing) and raise PasswordHashingBusyError instead
+    of queueing more than `max_pending` computations.
+    """
+    def __init__(
+        self,
+        algorithm: str = PASSWORD_HASH_ALGORITHM,
+        scrypt_n: int = PASSWORD_SCRYPT_N,
+        scrypt_r: int = PASSWORD_SCRYPT_R,
+        scrypt_p: int = PASSWORD_SCRYPT_P,
+        pbkdf2_iterations: int = PASSWORD_PBKDF2_ITERATIONS,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_pending: int = PASSWORD_HASH_MAX_PENDING,
+    ):
+        if algorithm not in ("scrypt", "pbkdf2_sha256"):
+            raise ValueError(f"Unknown password hash algorithm: {algorithm}")
+        self.algorithm = algorithm
+        self.scrypt_params = (scrypt_n, scrypt_r, scrypt_p)
+        self.pbkdf2_iterations = pbkdf2_iterations
+        self.workers = max(1, workers)
+        self.max_pending = max_pending
+        self.pending = 0
+        self._executor = None
+        self._dummy_hash = None
+
+    def _scrypt(self, password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p, dklen=KEY_BYTES,
+            # По умолчанию OpenSSL ограничивает память 32 МБ, scrypt нужно 128 * n * r байт
+            maxmem=256 * n * r,
+        )
+
+    def _pbkdf2(self, password: str, salt: bytes, iterations: int) -> bytes:
+        return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations, dklen=KEY_BYTES)
+
+    def current_params(self) -> str:
+        if self.algorithm == "scrypt":
+            return "scrypt$" + "$".join(str(value) for value in self.scrypt_params)
+        return f"pbkdf2_sha256${self.pbkdf2_iterations}"
+
+    def hash(self, password: str) -> str:
+        salt = secrets.token_bytes(SALT_BYTES)
+        if self.algorithm == "scrypt":
+            key = self._scrypt(password, salt, *self.scrypt_params)
+        else:
+            key = self._pbkdf2(password, salt, self.pbkdf2_iterations)
+        return f"{self.current_params()}${b64encode(salt)}${b64encode(key)}"
+
+    def verify(self, password: str, stored: str) -> bool:
+        """
+        Constant-time check of `password` against a stored hash of any supported format.
+        A malformed or unknown stored hash never matches.
+        """
+        if LEGACY_MD5.fullmatch(stored):
+            return hmac.compare_digest(hashlib.md5(password.encode()).hexdigest(), stored)
+        try:
+            algorithm, *params, salt, key = stored.split("$")
+            if algorithm == "scrypt":
+                n, r, p = (int(value) for value in params)
+                computed = self._scrypt(password, b64decode(salt), n, r, p)
+            elif algorithm == "pbkdf2_sha256":
+                computed = self._pbkdf2(password, b64decode(salt), int(params[0]))
+            else:
+                raise ValueError(f"unknown algorithm {algorithm!r}")
+            return hmac.compare_digest(computed, b64decode(key))
+        except (ValueError, TypeError) as e:
+            # Испорченный хеш в базе — это отказ во входе, а не ошибка 500
+            logger.error(f"Malformed password hash: {e}")
+            return False
+
+    def needs_rehash(self, stored: str) -> bool:
+        return stored.rpartition("$")[0].rpartition("$")[0] != self.current_params()
+
+    async def dummy_hash(self) -> str:
+        """A hash to verify against when the login does not exist: the reply takes as long."""
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash_async(secrets.token_urlsafe(16))
+        return self._dummy_hash
+
+    async def prepare(self) -> None:
+        """Computes the dummy hash in the pool at startup, before the first unknown login."""
+        await self.dummy_hash()
+
+    async def _run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise PasswordHashingBusyError("Too many logins in progress, retry later")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash_async(self, password: str) -> str:
+        return await self._run(self.hash, password)
+
+    async def verify_async(self, password: str, stored: str) -> bool:
+        return await self._run(self.verify, password, stored)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
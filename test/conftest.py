@@ -1,4 +1,6 @@
+from contextlib import asynccontextmanager, ExitStack
 from typing import Generator
+import fakeredis.aioredis
 import pytest
 from fastapi.testclient import TestClient
 from fastapi import FastAPI
@@ -8,6 +10,7 @@ from service.model_service import ModelService
 from service.moderation_service import ModerationService
 from unittest.mock import patch, MagicMock, AsyncMock
 from types import SimpleNamespace
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 import os
 import sys
 import pytest_asyncio
@@ -22,6 +25,14 @@ sys.modules['mlflow'] = mock_mlflow
 sys.modules['mlflow.tracking'] = mock_mlflow.tracking
 sys.modules['mlflow.sklearn'] = mock_mlflow.sklearn
 
+# Таблицы регистрируются в Base.metadata при импорте модулей
+from db.database import Base
+import db.tables.account
+import db.tables.item
+import db.tables.item_features
+import db.tables.moderation_result
+import db.tables.seller
+
 @pytest.fixture(scope="session")
 def mock_service():
     mock_repo = LocalModelRepository()
@@ -43,6 +54,7 @@ def mock_moderation_service():
     moder_repo = AsyncMock()
     moder_repo.get_completed_for_item = AsyncMock(return_value=None)
     moder_repo.get_result = AsyncMock(return_value=None)
+    moder_repo.get_rendered_result = AsyncMock(return_value=None)
     moder_repo.create_and_cache = AsyncMock()
     moder_repo.save_to_cache = AsyncMock()
     moder_repo.delete_for_item = AsyncMock(return_value=[])
@@ -91,3 +103,39 @@ def predict_request_builder():
         predict.update(new_params)
         return predict
     return build
+
+@pytest.fixture
+async def session_factory():
+    """Session factory of an in-memory sqlite database with every table created."""
+    engine = create_async_engine("sqlite+aiosqlite://", echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+@pytest.fixture
+async def db_session(session_factory):
+    async with session_factory() as session:
+        yield session
+
+@pytest.fixture
+def fake_redis():
+    return fakeredis.aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+
+@pytest.fixture
+def redis_connection(request, fake_redis):
+    """
+    Patches `get_redis_connection` of the modules listed in the test module's
+    REDIS_MODULES (or in `request.param` for indirect parametrization) to yield
+    `fake_redis`, and returns it.
+    """
+    modules = getattr(request, "param", None) or request.module.REDIS_MODULES
+
+    @asynccontextmanager
+    async def fake_connection():
+        yield fake_redis
+
+    with ExitStack() as stack:
+        for module in modules:
+            stack.enter_context(patch(f"{module}.get_redis_connection", fake_connection))
+        yield fake_redis
@@ -3,6 +3,15 @@ from types import SimpleNamespace
 import pytest
 from unittest.mock import AsyncMock
 
+from service.features import FEATURE_SCHEMA
+
+
+def stored_features(item):
+    """get_feature_matrix of an item, or of a missing one for None."""
+    if item is None:
+        return AsyncMock(return_value=([], FEATURE_SCHEMA.build_matrix([])))
+    return AsyncMock(return_value=([item.id], FEATURE_SCHEMA.build_matrix([FEATURE_SCHEMA.raw_from(item)])))
+
 @pytest.mark.asyncio
 async def test_positive_prediction_for_verified_seller_with_images(app_client):
     mock_item = SimpleNamespace(
@@ -12,7 +21,7 @@ async def test_positive_prediction_for_verified_seller_with_images(app_client):
         category=5,
         images_qty=7
     )
-    app_client.service.item_repository.get_item = AsyncMock(return_value=mock_item)
+    app_client.service.item_repository.get_feature_matrix = stored_features(mock_item)
     response = app_client.post("/simple_predict/1")
     assert response.status_code == HTTPStatus.OK
     prediction = response.json()
@@ -29,7 +38,7 @@ async def test_negative_prediction_for_item_without_images(app_client):
         category=3,
         images_qty=0
     )
-    app_client.service.item_repository.get_item = AsyncMock(return_value=mock_item)
+    app_client.service.item_repository.get_feature_matrix = stored_features(mock_item)
     response = app_client.post("/simple_predict/2")
     assert response.status_code == HTTPStatus.OK
     prediction = response.json()
@@ -47,7 +56,7 @@ async def test_negative_prediction_for_item_with_few_images(app_client):
         category=2,
         images_qty=1
     )
-    app_client.service.item_repository.get_item = AsyncMock(return_value=mock_item)
+    app_client.service.item_repository.get_feature_matrix = stored_features(mock_item)
     response = app_client.post("/simple_predict/3")
     assert response.status_code == HTTPStatus.OK
     prediction = response.json()
@@ -56,7 +65,7 @@ async def test_negative_prediction_for_item_with_few_images(app_client):
 
 @pytest.mark.asyncio
 async def test_item_not_found(app_client):
-    app_client.service.item_repository.get_item = AsyncMock(return_value=None)
+    app_client.service.item_repository.get_feature_matrix = stored_features(None)
     response = app_client.post("/simple_predict/99999")
     assert response.status_code in [
         HTTPStatus.INTERNAL_SERVER_ERROR,
@@ -79,7 +88,7 @@ async def test_create_multiple_items_and_predict(app_client):
     ]
     predictions = []
     for mock_item in items_data:
-        app_client.service.item_repository.get_item = AsyncMock(return_value=mock_item)
+        app_client.service.item_repository.get_feature_matrix = stored_features(mock_item)
         
         response = app_client.post(f"/simple_predict/{mock_item.id}")
         assert response.status_code == HTTPStatus.OK
@@ -104,7 +113,7 @@ async def test_item_retrieval_and_prediction(app_client):
         category=7,
         images_qty=6
     )
-    app_client.service.item_repository.get_item = AsyncMock(return_value=mock_item)
+    app_client.service.item_repository.get_feature_matrix = stored_features(mock_item)
     
     response = app_client.post(f"/simple_predict/{mock_item.id}")
     assert response.status_code == HTTPStatus.OK
@@ -128,7 +137,7 @@ async def test_images_qty_threshold(app_client, images_qty, expected_violation):
         category=4,
         images_qty=images_qty
     )
-    app_client.service.item_repository.get_item = AsyncMock(return_value=mock_item)
+    app_client.service.item_repository.get_feature_matrix = stored_features(mock_item)
     
     response = app_client.post("/simple_predict/30")
     
@@ -138,7 +147,7 @@ async def test_images_qty_threshold(app_client, images_qty, expected_violation):
 
 @pytest.mark.asyncio
 async def test_invalid_item_id_negative(app_client):
-    app_client.service.item_repository.get_item = AsyncMock(return_value=None)
+    app_client.service.item_repository.get_feature_matrix = stored_features(None)
     response = app_client.post("/simple_predict/-1")
     assert response.status_code in [
         HTTPStatus.OK,
@@ -157,17 +166,17 @@ async def test_prediction_uses_correct_item_data(app_client):
         category=8,
         images_qty=3
     )
-    app_client.service.item_repository.get_item = AsyncMock(return_value=mock_item)
+    app_client.service.item_repository.get_feature_matrix = stored_features(mock_item)
     response = app_client.post("/simple_predict/40")
     assert response.status_code == HTTPStatus.OK
     prediction = response.json()
     assert 'is_violation' in prediction
     assert 'probability' in prediction
-    app_client.service.item_repository.get_item.assert_called_once_with(40)
+    app_client.service.item_repository.get_feature_matrix.assert_called_once_with([40])
 
 @pytest.mark.asyncio  
 async def test_repository_exception_handling(app_client):
-    app_client.service.item_repository.get_item = AsyncMock(
+    app_client.service.item_repository.get_feature_matrix = AsyncMock(
         side_effect=Exception("Database connection error")
     )
     response = app_client.post("/simple_predict/50")
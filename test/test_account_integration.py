@@ -1,10 +1,12 @@
 import hashlib
 
 import pytest
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from db.database import Base
 import db.tables.account
 from repository.account.account_repository import AccountRepository
+from service.passwords import PasswordHasher
 
 
 @pytest.fixture
@@ -31,7 +33,8 @@ class TestAccountRepository:
         account = await account_repo.create_account("user1", "pass1")
         assert account is not None
         assert account.login == "user1"
-        assert account.password == hashlib.md5(b"pass1").hexdigest()
+        assert account.password.startswith("scrypt$")
+        assert account_repo.hasher.verify("pass1", account.password)
         assert account.is_blocked is False
 
         fetched = await account_repo.get_by_id(account.id)
@@ -71,13 +74,48 @@ class TestAccountRepository:
         found = await account_repo.get_by_login_and_password("user", "secret")
         assert found is not None
         assert found.login == "user"
-        assert found.password == hashlib.md5(b"secret").hexdigest()
+        assert account_repo.hasher.verify("secret", found.password)
 
     async def test_get_by_login_and_password_not_found(self, account_repo):
         result = await account_repo.get_by_login_and_password("no_user", "no_pass")
         assert result is None
 
+    async def test_get_by_login_and_password_with_duplicate_logins(self, account_repo):
+        await account_repo.create_account("user", "first")
+        second = await account_repo.create_account("user", "second")
+
+        found = await account_repo.get_by_login_and_password("user", "second")
+        assert found is not None and found.id == second.id
+        assert await account_repo.get_by_login_and_password("user", "third") is None
+
     async def test_get_by_login_and_password_wrong_password(self, account_repo):
         await account_repo.create_account("user", "correct")
         result = await account_repo.get_by_login_and_password("user", "wrong")
         assert result is None
+
+    async def test_legacy_md5_password_is_rehashed_on_login(self, account_repo, db_session):
+        account = await account_repo.create_account("legacy", "secret")
+        await db_session.execute(
+            text("UPDATE account SET password = :password WHERE id = :id"),
+            {"password": hashlib.md5(b"secret").hexdigest(), "id": account.id},
+        )
+        await db_session.commit()
+
+        found = await account_repo.get_by_login_and_password("legacy", "secret")
+        assert found is not None
+        assert await account_repo.rehash_password(found, "secret") is True
+
+        upgraded = await account_repo.get_by_id(account.id)
+        assert upgraded.password.startswith("scrypt$")
+        assert await account_repo.get_by_login_and_password("legacy", "secret") is not None
+        assert await account_repo.rehash_password(upgraded, "secret") is False
+
+    async def test_rehash_upgrades_hash_parameters(self, db_session):
+        old = AccountRepository(db_session, hasher=PasswordHasher("pbkdf2_sha256", pbkdf2_iterations=1000))
+        account = await old.create_account("user", "secret")
+
+        current = AccountRepository(db_session)
+        found = await current.get_by_login_and_password("user", "secret")
+        assert found.password.startswith("pbkdf2_sha256$1000$")
+        assert await current.rehash_password(found, "secret") is True
+        assert (await current.get_by_id(account.id)).password.startswith("scrypt$")
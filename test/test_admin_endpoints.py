@@ -0,0 +1,44 @@
+import pytest
+
+from routes import api
+
+
+def test_profile_requires_admin(app_client, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_ACCOUNT_IDS", {2})
+    response = app_client.get("/admin/profile", params={"seconds": 0.05})
+    assert response.status_code == 403
+
+
+def test_admin_is_matched_by_account_id_not_login(app_client, mock_account, monkeypatch):
+    # Чужой аккаунт с тем же логином, что у администратора
+    monkeypatch.setattr(api, "ADMIN_ACCOUNT_IDS", {1})
+    mock_account.id = 2
+    assert app_client.get("/admin/tracemalloc", params={"seconds": 0}).status_code == 403
+
+
+def test_profile_returns_collapsed_stacks(app_client, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_ACCOUNT_IDS", {1})
+    response = app_client.get("/admin/profile", params={"seconds": 0.1, "interval": 0.001})
+    assert response.status_code == 200
+    assert response.headers["content-disposition"].endswith('.collapsed"')
+    assert response.text.startswith("thread:")
+
+
+def test_profile_returns_speedscope(app_client, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_ACCOUNT_IDS", {1})
+    response = app_client.get("/admin/profile", params={"seconds": 0.05, "format": "speedscope"})
+    assert response.status_code == 200
+    assert response.json()["profiles"][0]["type"] == "sampled"
+
+
+@pytest.mark.parametrize("params", [{"seconds": 0}, {"seconds": 1000}, {"mode": "gpu"}])
+def test_profile_validates_params(app_client, monkeypatch, params):
+    monkeypatch.setattr(api, "ADMIN_ACCOUNT_IDS", {1})
+    assert app_client.get("/admin/profile", params=params).status_code == 422
+
+
+def test_tracemalloc_report(app_client, monkeypatch):
+    monkeypatch.setattr(api, "ADMIN_ACCOUNT_IDS", {1})
+    response = app_client.get("/admin/tracemalloc", params={"seconds": 0, "top": 3})
+    assert response.status_code == 200
+    assert "# top 3 allocation sites" in response.text
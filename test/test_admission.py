@@ -0,0 +1,165 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, HTTPException
+from prometheus_client import REGISTRY
+
+from model.item import Item
+from app.admission import (
+    AIMDLimit,
+    AdmissionController,
+    QueueLagMonitor,
+    db_pool_check,
+    inference_queue_check,
+    parse_endpoint_values,
+)
+from repository.item.item_repository import ItemRepository
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+
+
+def shed_count(endpoint, reason):
+    return REGISTRY.get_sample_value("admission_shed_total", {"endpoint": endpoint, "reason": reason}) or 0
+
+
+def request_with(**query_params):
+    return SimpleNamespace(query_params=query_params)
+
+
+def test_parse_endpoint_values():
+    assert parse_endpoint_values("predict=64, async_predict=256", int) == {"predict": 64, "async_predict": 256}
+    assert parse_endpoint_values("") == {}
+
+
+def test_aimd_backs_off_on_slow_or_failed_requests():
+    limit = AIMDLimit(max_limit=100, min_limit=10, latency_target=0.1, backoff=0.5)
+
+    limit.on_sample(latency=0.5, in_flight=1)
+    assert limit.limit == 50
+    limit.on_sample(latency=0.01, in_flight=1, dropped=True)
+    assert limit.limit == 25
+    for _ in range(10):
+        limit.on_sample(latency=1.0, in_flight=1)
+    assert limit.limit == 10
+
+
+def test_aimd_grows_only_while_the_limit_is_used():
+    limit = AIMDLimit(max_limit=100, latency_target=0.1, backoff=0.5)
+    limit.on_sample(latency=1.0, in_flight=1)
+
+    for _ in range(100):
+        limit.on_sample(latency=0.01, in_flight=1)
+    assert limit.limit == 50
+
+    # Около +1 на каждые `limit` быстрых запросов
+    for _ in range(50 * 10):
+        limit.on_sample(latency=0.01, in_flight=40)
+    assert 58 <= limit.limit <= 60
+
+
+def test_dependency_checks():
+    assert inference_queue_check(SimpleNamespace(queue_depth=5), max_depth=4)(None) is not None
+    assert inference_queue_check(SimpleNamespace(queue_depth=4), max_depth=4)(None) is None
+
+    pool = SimpleNamespace(size=lambda: 5, checkedout=lambda: 15)
+    assert db_pool_check(SimpleNamespace(pool=pool), max_overflow=10)(None) is not None
+    pool.checkedout = lambda: 14
+    assert db_pool_check(SimpleNamespace(pool=pool), max_overflow=10)(None) is None
+    # У StaticPool/NullPool нет размера
+    assert db_pool_check(SimpleNamespace(pool=object()), max_overflow=10)(None) is None
+
+
+def test_queue_lag_check_uses_the_lane_of_the_request():
+    monitor = QueueLagMonitor(session_maker=None)
+    monitor.pending = {"bulk": 500, "interactive": 3}
+    check = monitor.check(max_pending=100)
+
+    assert check(request_with()) is None
+    assert check(request_with(priority="bulk")) == pytest.approx(30)
+
+
+@pytest.mark.integration
+async def test_queue_lag_monitor_counts_pending_tasks(session_factory):
+    async with session_factory() as db:
+        item = await ItemRepository(db).create_item(Item(name="n", description="d", category=1, images_qty=1))
+        moderations = ModerationResultRepository(db)
+        for lane in ("bulk", "bulk", "interactive"):
+            await moderations.create_moderation(item.id, lane)
+
+    monitor = QueueLagMonitor(session_factory, interval=10)
+    monitor.start()
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    assert monitor.pending == {"bulk": 2, "interactive": 1}
+
+
+def admission_app(controller, release=None):
+    app = FastAPI()
+
+    @app.get("/work", dependencies=[Depends(controller)])
+    async def work(status: int = 200):
+        if release is not None:
+            await release.wait()
+        if status != 200:
+            raise HTTPException(status_code=status, detail="failed")
+        return {"ok": True}
+
+    return app
+
+
+async def test_requests_over_the_limit_get_429_with_retry_after():
+    controller = AdmissionController("test_limit", AIMDLimit(max_limit=1, latency_target=10), retry_after=2)
+    release = asyncio.Event()
+    transport = httpx.ASGITransport(app=admission_app(controller, release))
+    before = shed_count("test_limit", "concurrency")
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        first = asyncio.create_task(client.get("/work"))
+        while controller.in_flight == 0:
+            await asyncio.sleep(0.01)
+        shed = await client.get("/work")
+        release.set()
+        admitted = await first
+
+    assert admitted.status_code == 200
+    assert shed.status_code == 429 and shed.headers["Retry-After"] == "2"
+    assert shed_count("test_limit", "concurrency") == before + 1
+    assert controller.in_flight == 0
+
+
+async def test_overloaded_dependency_sheds_with_its_retry_after():
+    controller = AdmissionController("test_check", AIMDLimit(max_limit=10), checks={"queue_lag": lambda request: 30})
+    transport = httpx.ASGITransport(app=admission_app(controller))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get("/work")
+
+    assert response.status_code == 429 and response.headers["Retry-After"] == "30"
+    assert shed_count("test_check", "queue_lag") >= 1
+
+
+async def test_server_errors_lower_the_limit_client_errors_do_not():
+    controller = AdmissionController("test_errors", AIMDLimit(max_limit=10, latency_target=10, backoff=0.5))
+    transport = httpx.ASGITransport(app=admission_app(controller))
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        await client.get("/work", params={"status": 404})
+        assert controller.limit.limit == 10
+        await client.get("/work", params={"status": 503})
+        assert controller.limit.limit == 5
+
+    assert REGISTRY.get_sample_value("admission_concurrency_limit", {"endpoint": "test_errors"}) == 5
+
+
+def test_async_predict_is_shed_while_workers_lag(app_client, monkeypatch):
+    from routes import api
+
+    monkeypatch.setattr(api.queue_lag, "pending", {"bulk": 10 ** 9})
+
+    response = app_client.post("/async_predict/1?priority=bulk")
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    app_client.moder_service.item_repo.get_item.assert_not_awaited()
@@ -21,10 +21,12 @@ def make_request(cookie_value=None):
         request.cookies = {}
     return request
 
-def mock_db_with_row(row_dict):
+def mock_db_with_row(row_dict, tier="free"):
+    # get_status выбирает только id, login, is_blocked, tier
+    row = None if row_dict is None else (row_dict["id"], row_dict["login"], row_dict["is_blocked"], tier)
     mock_db = AsyncMock()
     mock_result = MagicMock()
-    mock_result.mappings.return_value.first.return_value = row_dict
+    mock_result.first.return_value = row
     mock_db.execute = AsyncMock(return_value=mock_result)
     return mock_db
 
@@ -91,3 +93,54 @@ class TestGetCurrentAccount:
             await get_current_account(request=request, db=mock_db)
         assert exc_info.value.status_code == 403
         assert "blocked" in exc_info.value.detail.lower()
+
+
+class TestRevokedAccountsFastPath:
+    @pytest.fixture
+    def revoked(self, monkeypatch):
+        from routes import api
+
+        monkeypatch.setattr(api.revoked_accounts, "loaded", True)
+        monkeypatch.setattr(api.revoked_accounts, "ids", frozenset({10}))
+        api.account_tier_cache.invalidate()
+        yield api.revoked_accounts
+        api.account_tier_cache.invalidate()
+
+    async def test_cached_tier_is_used_without_db(self, revoked):
+        from routes.api import get_current_account, JWT_SECRET
+
+        token = AuthService(account_repo=None, secret_key=JWT_SECRET).create_token(5, "user")
+        mock_db = mock_db_with_row(make_account_row(account_id=5, login="user"), tier="pro")
+
+        first = await get_current_account(request=make_request(cookie_value=token), db=mock_db)
+        second = await get_current_account(request=make_request(cookie_value=token), db=mock_db)
+
+        assert first == second
+        assert (second.id, second.login, second.is_blocked, second.tier) == (5, "user", False, "pro")
+        mock_db.execute.assert_awaited_once()
+
+    async def test_revoked_account_raises_403(self, revoked):
+        from routes.api import get_current_account, JWT_SECRET
+
+        token = AuthService(account_repo=None, secret_key=JWT_SECRET).create_token(10, "blocked_user")
+
+        with pytest.raises(HTTPException) as exc_info:
+            await get_current_account(request=make_request(cookie_value=token), db=AsyncMock())
+        assert exc_info.value.status_code == 403
+
+    async def test_tier_claim_of_the_token_is_not_trusted(self, revoked):
+        import jwt
+        from datetime import datetime, timedelta, timezone
+        from routes.api import get_current_account, JWT_SECRET
+
+        # Токен, выданный до смены тарифа (или до того, как тариф убрали из токена)
+        token = jwt.encode(
+            {"sub": "5", "login": "user", "tier": "pro", "exp": datetime.now(timezone.utc) + timedelta(minutes=5)},
+            JWT_SECRET,
+        )
+        mock_db = mock_db_with_row(make_account_row(account_id=5, login="user"))
+
+        result = await get_current_account(request=make_request(cookie_value=token), db=mock_db)
+
+        assert result.tier == "free"
+        mock_db.execute.assert_awaited_once()
@@ -1,7 +1,11 @@
+import time
+
+import jwt
 import pytest
-from unittest.mock import AsyncMock, MagicMock
-from service.auth_service import AuthService
+from unittest.mock import AsyncMock, MagicMock, patch
+from service.auth_service import AuthService, VerifiedTokenCache
 from app.exceptions import InvalidCredentialsError, AccountBlockedError, InvalidTokenError
+from repository.account.account_tier_cache import AccountTierCache, MISSING as TIER_MISSING
 
 SECRET = "test-secret-key"
 
@@ -12,6 +16,7 @@ def _make_account(account_id=1, login="user", password="pass", is_blocked=False)
     account.login = login
     account.password = password
     account.is_blocked = is_blocked
+    account.tier = "free"
     return account
 
 
@@ -33,6 +38,7 @@ class TestAuthenticate:
         assert isinstance(token, str)
         assert len(token) > 0
         repo.get_by_login_and_password.assert_awaited_once_with("user", "pass")
+        repo.rehash_password.assert_awaited_once_with(account, "pass")
 
     async def test_authenticate_invalid_credentials(self):
         repo = AsyncMock()
@@ -85,3 +91,53 @@ class TestToken:
         token = service_a.create_token(account_id=1, login="user")
         with pytest.raises(InvalidTokenError):
             service_b.verify_token(token)
+
+
+class TestVerifiedTokenCache:
+    def test_cached_token_skips_signature_check(self):
+        service = AuthService(account_repo=None, secret_key=SECRET, token_cache=VerifiedTokenCache())
+        token = service.create_token(account_id=42, login="alice")
+
+        with patch("service.auth_service.jwt.decode", wraps=jwt.decode) as decode:
+            first = service.verify_token(token)
+            second = service.verify_token(token)
+
+        assert decode.call_count == 1
+        assert first == second and second["sub"] == 42 and second["login"] == "alice"
+
+    def test_invalid_and_expired_tokens_are_not_served(self):
+        cache = VerifiedTokenCache()
+        service = AuthService(account_repo=None, secret_key=SECRET, token_cache=cache)
+        with pytest.raises(InvalidTokenError):
+            service.verify_token("not.a.valid.token")
+        assert len(cache) == 0
+
+        cache.put("token", {"sub": 1, "exp": time.time() - 1})
+        assert cache.get("token") is None
+        assert len(cache) == 0
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = VerifiedTokenCache(max_size=2)
+        expires = time.time() + 60
+        cache.put("a", {"sub": 1, "exp": expires})
+        cache.put("b", {"sub": 2, "exp": expires})
+        cache.get("a")
+        cache.put("c", {"sub": 3, "exp": expires})
+
+        assert cache.get("b") is None
+        assert cache.get("a")["sub"] == 1 and cache.get("c")["sub"] == 3
+
+
+class TestAccountTierCache:
+    def test_entries_expire_and_oldest_is_evicted(self):
+        cache = AccountTierCache(ttl=60, max_size=2)
+        cache.put(1, "free")
+        cache.put(2, "pro")
+        cache.put(3, "pro")
+
+        assert cache.get(1) is TIER_MISSING
+        assert cache.get(2) == "pro" and len(cache) == 2
+
+        expired = AccountTierCache(ttl=-1)
+        expired.put(1, "pro")
+        assert expired.get(1) is TIER_MISSING
@@ -0,0 +1,105 @@
+from unittest.mock import AsyncMock
+
+import pytest
+from prometheus_client import REGISTRY
+
+from model.item import Item
+from repository.item.item_repository import ItemRepository
+from repository.moderation_result.hot_items_repository import HotItemsRepository
+from repository.moderation_result.moderation_redis_repository import ModerationRedisRepository
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+from service.cache_warmer import CacheWarmer
+from service.moderation_service import ModerationService
+
+
+REDIS_MODULES = (
+    "repository.moderation_result.moderation_redis_repository",
+    "repository.moderation_result.hot_items_repository",
+)
+
+
+async def create_items(session_factory):
+    """open item with a completed result, closed item, open item with a pending task only."""
+    async with session_factory() as db:
+        items = ItemRepository(db)
+        moderations = ModerationResultRepository(db)
+        ids = {}
+        for name in ("completed", "closed", "pending"):
+            item = await items.create_item(Item(name=name, description="desc", category=1, images_qty=2))
+            task = await moderations.create_moderation(item.id)
+            ids[name] = (item.id, task.id)
+        for name in ("completed", "closed"):
+            await moderations.update_task(db, ids[name][1], "completed", is_violation=True, probability=0.9)
+        await items.close_item(ids["closed"][0])
+    return ids
+
+
+async def test_hot_items_flush_in_batches(redis_connection):
+    hot_items = HotItemsRepository(flush_size=3, flush_interval=3600)
+    await hot_items.record(1)
+    await hot_items.record(2)
+    assert await hot_items.top(10) == []
+
+    await hot_items.record(2)
+    assert await hot_items.top(10) == [2, 1]
+
+    await hot_items.record(1)
+    await hot_items.flush()
+    assert await hot_items.top(1) in ([1], [2])
+
+
+async def test_moderation_service_records_access():
+    hot_items = AsyncMock()
+    moder_repo = AsyncMock()
+    moder_repo.get_completed_for_item = AsyncMock(return_value=object())
+    moder_repo.get_result = AsyncMock(return_value=type("Task", (), {"item_id": 5})())
+    service = ModerationService(moder_repo=moder_repo, item_repo=AsyncMock(), hot_items=hot_items)
+
+    await service.get_or_predict_for_item(3, model_service=None)
+    await service.get_moderation_result(10)
+
+    assert [call.args[0] for call in hot_items.record.await_args_list] == [3, 5]
+
+
+async def test_access_counter_failure_does_not_break_request():
+    hot_items = AsyncMock()
+    hot_items.record = AsyncMock(side_effect=ConnectionError("redis is down"))
+    moder_repo = AsyncMock()
+    moder_repo.get_completed_for_item = AsyncMock(return_value="cached")
+    service = ModerationService(moder_repo=moder_repo, item_repo=AsyncMock(), hot_items=hot_items)
+
+    assert await service.get_or_predict_for_item(3, model_service=None) == "cached"
+
+
+@pytest.mark.integration
+async def test_warm_caches_stored_results_and_scores_the_rest(session_factory, redis_connection, mock_service):
+    ids = await create_items(session_factory)
+    hot_items = HotItemsRepository(flush_size=1)
+    for name in ("pending", "completed", "closed"):
+        await hot_items.record(ids[name][0])
+    await hot_items.record(999)
+    redis_repo = ModerationRedisRepository()
+    warmer = CacheWarmer(session_factory, redis_repo, hot_items=hot_items, model_service=mock_service, batch_size=2)
+
+    report = await warmer.warm(limit=10)
+
+    assert (report.candidates, report.cached, report.scored, report.skipped) == (4, 1, 1, 2)
+    completed_item, completed_task = ids["completed"]
+    assert (await redis_repo.get_moderation(completed_task)).status == "completed"
+    assert (await redis_repo.get_moderation_for_item(completed_item)).id == completed_task
+    scored = await redis_repo.get_moderation_for_item(ids["pending"][0])
+    assert scored.status == "completed" and scored.id is None
+    assert await redis_repo.get_moderation_for_item(ids["closed"][0]) is None
+    assert REGISTRY.get_sample_value("cache_warmup_progress_ratio") == 1.0
+
+
+@pytest.mark.integration
+async def test_candidates_fall_back_to_recent_results(session_factory, redis_connection):
+    ids = await create_items(session_factory)
+    redis_repo = ModerationRedisRepository()
+    warmer = CacheWarmer(session_factory, redis_repo, hot_items=HotItemsRepository())
+
+    assert await warmer.candidates(10) == [ids["completed"][0]]
+
+    report = await warmer.warm(limit=10)
+    assert (report.cached, report.scored) == (1, 0)
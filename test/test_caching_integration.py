@@ -51,11 +51,11 @@ class TestSetAndGetModeration:
         result = await repo.get_moderation(1)
 
         assert result is not None
-        assert result["id"] == 1
-        assert result["item_id"] == 10
-        assert result["status"] == "completed"
-        assert result["is_violation"] is True
-        assert result["probability"] == 0.85
+        assert result.id == 1
+        assert result.item_id == 10
+        assert result.status == "completed"
+        assert result.is_violation is True
+        assert result.probability == 0.85
 
     @pytest.mark.asyncio
     async def test_roundtrip_by_item_id(self, repo):
@@ -65,8 +65,8 @@ class TestSetAndGetModeration:
         result = await repo.get_moderation_for_item(20)
 
         assert result is not None
-        assert result["id"] == 5
-        assert result["item_id"] == 20
+        assert result.id == 5
+        assert result.item_id == 20
 
     @pytest.mark.asyncio
     async def test_dict_data_with_item_id(self, repo):
@@ -81,10 +81,10 @@ class TestSetAndGetModeration:
         await repo.set_moderation(3, data)
 
         by_task = await repo.get_moderation(3)
-        assert by_task["id"] == 3
+        assert by_task.id == 3
 
         by_item = await repo.get_moderation_for_item(30)
-        assert by_item["id"] == 3
+        assert by_item.id == 3
 
 @pytest.mark.integration
 class TestSetModerationWithoutItemId:
@@ -96,7 +96,7 @@ class TestSetModerationWithoutItemId:
 
         by_task = await repo.get_moderation(99)
         assert by_task is not None
-        assert by_task["id"] == 99
+        assert by_task.id == 99
 
         keys = await fake_redis.keys("item-*")
         assert len(keys) == 0
@@ -111,8 +111,10 @@ class TestSetPredictionForItem:
         result = await repo.get_moderation_for_item(10)
 
         assert result is not None
-        assert result["is_violation"] is False
-        assert result["probability"] == 0.12
+        assert result.status == "completed"
+        assert result.item_id == 10
+        assert result.is_violation is False
+        assert result.probability == 0.12
 
     @pytest.mark.asyncio
     async def test_overwrite_existing_item_cache(self, repo):
@@ -120,8 +122,8 @@ class TestSetPredictionForItem:
         await repo.set_prediction_for_item(10, PredictResponse(is_violation=False, probability=0.1))
 
         result = await repo.get_moderation_for_item(10)
-        assert result["is_violation"] is False
-        assert result["probability"] == 0.1
+        assert result.is_violation is False
+        assert result.probability == 0.1
 
 @pytest.mark.integration
 class TestTTL:
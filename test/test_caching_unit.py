@@ -3,30 +3,13 @@ from unittest.mock import AsyncMock, MagicMock
 from service.moderation_service import ModerationService
 from repository.moderation_result.moderation_result_repository import ModerationResultRepository
 from dto.response import PredictResponse
+from repository.records import ModerationRecord
 
-COMPLETED_CACHE_DICT = {
-    "id": 1,
-    "item_id": 10,
-    "status": "completed",
-    "is_violation": True,
-    "probability": 0.85,
-}
-
-PENDING_CACHE_DICT = {
-    "id": 2,
-    "item_id": 10,
-    "status": "pending",
-    "is_violation": None,
-    "probability": None,
-}
-
-FAILED_CACHE_DICT = {
-    "id": 3,
-    "item_id": 10,
-    "status": "failed",
-    "is_violation": None,
-    "probability": None,
-}
+COMPLETED_CACHE_RECORD = ModerationRecord(id=1, item_id=10, status="completed", is_violation=True, probability=0.85)
+
+PENDING_CACHE_RECORD = ModerationRecord(id=2, item_id=10, status="pending")
+
+FAILED_CACHE_RECORD = ModerationRecord(id=3, item_id=10, status="failed")
 
 def make_orm_result(id=1, item_id=10, status="completed", is_violation=True, probability=0.85):
     obj = MagicMock()
@@ -88,17 +71,17 @@ def service(moder_repo, item_repo):
 class TestRepoGetCompletedForItem:
     @pytest.mark.asyncio
     async def test_returns_from_cache_when_completed(self, repo, redis_repo):
-        redis_repo.get_moderation_for_item.return_value = COMPLETED_CACHE_DICT
+        redis_repo.get_moderation_for_item.return_value = COMPLETED_CACHE_RECORD
 
         result = await repo.get_completed_for_item(10)
 
-        assert result == COMPLETED_CACHE_DICT
+        assert result == COMPLETED_CACHE_RECORD
         redis_repo.get_moderation_for_item.assert_awaited_once_with(10)
         repo.get_moderation_for_item.assert_not_awaited()
 
     @pytest.mark.asyncio
     async def test_skips_cache_when_pending_and_goes_to_db(self, repo, redis_repo):
-        redis_repo.get_moderation_for_item.return_value = PENDING_CACHE_DICT
+        redis_repo.get_moderation_for_item.return_value = PENDING_CACHE_RECORD
         db_result = make_orm_result(status="completed")
         repo.get_moderation_for_item.return_value = db_result
 
@@ -140,26 +123,26 @@ class TestRepoGetCompletedForItem:
 class TestRepoGetResult:
     @pytest.mark.asyncio
     async def test_returns_from_cache_when_completed(self, repo, redis_repo):
-        redis_repo.get_moderation.return_value = COMPLETED_CACHE_DICT
+        redis_repo.get_moderation.return_value = COMPLETED_CACHE_RECORD
 
         result = await repo.get_result(1)
 
-        assert result == COMPLETED_CACHE_DICT
+        assert result == COMPLETED_CACHE_RECORD
         redis_repo.get_moderation.assert_awaited_once_with(1)
         repo.get_moderation.assert_not_awaited()
 
     @pytest.mark.asyncio
     async def test_returns_from_cache_when_failed(self, repo, redis_repo):
-        redis_repo.get_moderation.return_value = FAILED_CACHE_DICT
+        redis_repo.get_moderation.return_value = FAILED_CACHE_RECORD
 
         result = await repo.get_result(3)
 
-        assert result == FAILED_CACHE_DICT
+        assert result == FAILED_CACHE_RECORD
         repo.get_moderation.assert_not_awaited()
 
     @pytest.mark.asyncio
     async def test_skips_pending_cache_goes_to_db(self, repo, redis_repo):
-        redis_repo.get_moderation.return_value = PENDING_CACHE_DICT
+        redis_repo.get_moderation.return_value = PENDING_CACHE_RECORD
         db_result = make_orm_result(id=2, status="completed")
         repo.get_moderation.return_value = db_result
 
@@ -199,7 +182,7 @@ class TestRepoCreateAndCache:
         result = await repo.create_and_cache(10)
 
         assert result is task
-        repo.create_moderation.assert_awaited_once_with(10)
+        repo.create_moderation.assert_awaited_once_with(10, "interactive")
         redis_repo.set_moderation.assert_awaited_once_with(42, task)
 
 class TestRepoSaveToCache:
@@ -242,22 +225,22 @@ class TestRepoDeleteForItem:
 class TestServiceGetPredictionForItem:
     @pytest.mark.asyncio
     async def test_delegates_to_repo(self, service, moder_repo):
-        moder_repo.get_completed_for_item.return_value = COMPLETED_CACHE_DICT
+        moder_repo.get_completed_for_item.return_value = COMPLETED_CACHE_RECORD
 
         result = await service.get_prediction_for_item(10)
 
-        assert result == COMPLETED_CACHE_DICT
+        assert result == COMPLETED_CACHE_RECORD
         moder_repo.get_completed_for_item.assert_awaited_once_with(10)
 
 
 class TestServiceGetModerationResult:
     @pytest.mark.asyncio
     async def test_delegates_to_repo(self, service, moder_repo):
-        moder_repo.get_result.return_value = COMPLETED_CACHE_DICT
+        moder_repo.get_result.return_value = COMPLETED_CACHE_RECORD
 
         result = await service.get_moderation_result(1)
 
-        assert result == COMPLETED_CACHE_DICT
+        assert result == COMPLETED_CACHE_RECORD
         moder_repo.get_result.assert_awaited_once_with(1)
 
 class TestServiceGetModerationTaskIdForItem:
@@ -271,7 +254,7 @@ class TestServiceGetModerationTaskIdForItem:
 
         assert result == 5
         item_repo.get_item.assert_awaited_once_with(10)
-        moder_repo.create_and_cache.assert_awaited_once_with(10)
+        moder_repo.create_and_cache.assert_awaited_once_with(10, "interactive")
 
     @pytest.mark.asyncio
     async def test_returns_none_when_item_not_found(self, service, moder_repo, item_repo):
@@ -296,12 +279,12 @@ class TestServiceSavePredictionToCache:
 class TestServiceGetOrPredictForItem:
     @pytest.mark.asyncio
     async def test_returns_cached_result_without_calling_model(self, service, moder_repo):
-        moder_repo.get_completed_for_item.return_value = COMPLETED_CACHE_DICT
+        moder_repo.get_completed_for_item.return_value = COMPLETED_CACHE_RECORD
         model_service = AsyncMock()
 
         result = await service.get_or_predict_for_item(10, model_service)
 
-        assert result == COMPLETED_CACHE_DICT
+        assert result == COMPLETED_CACHE_RECORD
         model_service.get_prediction_for_item.assert_not_awaited()
 
     @pytest.mark.asyncio
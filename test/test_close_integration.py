@@ -3,6 +3,7 @@ from unittest.mock import MagicMock, patch
 from contextlib import asynccontextmanager
 
 import fakeredis.aioredis
+from dto.response import PredictResponse
 from repository.moderation_result.moderation_redis_repository import ModerationRedisRepository
 
 @pytest.fixture
@@ -56,7 +57,7 @@ class TestDeleteForItem:
 
     @pytest.mark.asyncio
     async def test_deletes_item_key_with_empty_task_ids(self, repo, fake_redis):
-        await repo.set_prediction_for_item(10, {"is_violation": False, "probability": 0.1})
+        await repo.set_prediction_for_item(10, PredictResponse(is_violation=False, probability=0.1))
 
         assert await repo.get_moderation_for_item(10) is not None
 
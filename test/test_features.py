@@ -0,0 +1,143 @@
+import numpy as np
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import text
+
+from app.exceptions import ModelIsNotAvailable
+from dto.request import PredictRequest
+from repository.item.item_repository import ItemRepository
+from repository.model.local_model_repository import LocalModelRepository
+from service.features import FEATURE_SCHEMA
+from service.model_service import ModelService
+
+
+def make_items(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return [
+        SimpleNamespace(
+            is_verified_seller=[None, True, False][int(rng.integers(3))],
+            images_qty=int(rng.integers(0, 40)),
+            description="x" * int(rng.integers(1, 5000)),
+            category=int(rng.integers(0, 300)),
+        )
+        for _ in range(n)
+    ]
+
+
+def test_schema_matches_model_input_order():
+    assert FEATURE_SCHEMA.names == ("is_verified_seller", "images_qty", "description_length", "category")
+    assert len(FEATURE_SCHEMA) == 4
+
+
+def test_batch_matrix_matches_scalar_path_exactly():
+    items = make_items()
+    service = ModelService(model_repository=None, item_repository=None)
+
+    matrix = FEATURE_SCHEMA.build_matrix([FEATURE_SCHEMA.raw_from(item) for item in items])
+
+    assert matrix.dtype == np.float32
+    assert matrix.shape == (len(items), len(FEATURE_SCHEMA))
+    expected = np.array([service.prepare_features(item) for item in items], dtype=np.float32)
+    assert np.array_equal(matrix, expected)
+
+
+def test_scalar_path_matches_legacy_formula():
+    request = PredictRequest(
+        is_verified_seller=True, item_id=1, name="n", description="d" * 250, category=7, images_qty=15,
+    )
+    assert FEATURE_SCHEMA.vector(FEATURE_SCHEMA.raw_from(request)) == [1.0, 1.0, 0.25, 0.07]
+
+
+def test_build_matrix_fills_preallocated_output_and_skips_id_column():
+    rows = [(10, None, 3, 100, 2), (11, True, 12, 0, 5)]
+    out = np.zeros((2, 4), dtype=np.float32)
+
+    result = FEATURE_SCHEMA.build_matrix(rows, first_column=1, out=out)
+
+    assert result is out
+    np.testing.assert_array_equal(out, np.array([[0.0, 0.3, 0.1, 0.02], [1.0, 1.0, 0.0, 0.05]], dtype=np.float32))
+
+
+def test_build_matrix_empty():
+    assert FEATURE_SCHEMA.build_matrix([]).shape == (0, 4)
+
+
+def test_trained_model_is_tagged_and_compatible():
+    model = LocalModelRepository().train_model()
+    assert model.feature_schema_version == FEATURE_SCHEMA.version
+    assert model.n_features_in_ == len(FEATURE_SCHEMA)
+    FEATURE_SCHEMA.ensure_compatible(model)
+
+
+def test_incompatible_model_is_rejected():
+    model = SimpleNamespace(feature_schema_version=FEATURE_SCHEMA.version + 1)
+    with pytest.raises(ModelIsNotAvailable):
+        FEATURE_SCHEMA.ensure_compatible(model)
+
+
+@pytest.mark.integration
+async def test_feature_rows_from_db_match_scalar_path(db_session):
+    items = make_items(20)
+    ids = []
+    for item in items:
+        result = await db_session.execute(
+            text(
+                "INSERT INTO items (name, description, category, images_qty) "
+                "VALUES ('item', :description, :category, :images_qty) RETURNING id"
+            ),
+            {"description": item.description, "category": item.category, "images_qty": item.images_qty},
+        )
+        ids.append(result.scalar_one())
+    await db_session.commit()
+
+    rows = await ItemRepository(db_session).get_feature_rows(ids)
+    rows = sorted(rows, key=lambda row: ids.index(row[0]))
+    matrix = FEATURE_SCHEMA.build_matrix(rows, first_column=1)
+
+    service = ModelService(model_repository=None, item_repository=None)
+    expected = np.array(
+        [service.prepare_features(SimpleNamespace(**{**vars(item), "is_verified_seller": None})) for item in items],
+        dtype=np.float32,
+    )
+    assert np.array_equal(matrix, expected)
+
+
+@pytest.mark.integration
+async def test_created_items_are_scored_from_feature_store(db_session):
+    items = make_items(20)
+    repo = ItemRepository(db_session)
+    ids = [(await repo.create_item(SimpleNamespace(name="item", **vars(item)))).id for item in items]
+
+    stored = (await db_session.execute(text("SELECT count(*) FROM item_features"))).scalar_one()
+    item_ids, matrix = await repo.get_feature_matrix(ids)
+
+    service = ModelService(model_repository=None, item_repository=None)
+    expected = np.array(
+        [service.prepare_features(SimpleNamespace(**{**vars(item), "is_verified_seller": None})) for item in items],
+        dtype=np.float32,
+    )
+    assert stored == len(items)
+    assert item_ids == ids
+    assert np.array_equal(matrix, expected)
+
+
+@pytest.mark.integration
+async def test_feature_store_recomputes_missing_and_stale_rows(db_session):
+    repo = ItemRepository(db_session)
+    fresh, stale, missing = [
+        (await repo.create_item(SimpleNamespace(name="item", **vars(item)))).id for item in make_items(3)
+    ]
+    await db_session.execute(
+        text("UPDATE item_features SET schema_version = 0, f_category = 99 WHERE item_id = :id"), {"id": stale}
+    )
+    await db_session.execute(text("DELETE FROM item_features WHERE item_id = :id"), {"id": missing})
+    await db_session.commit()
+
+    item_ids, matrix = await repo.get_feature_matrix([fresh, stale, missing, 10_000])
+    _, expected = await repo.refresh_features([fresh, stale, missing])
+
+    assert sorted(item_ids) == [fresh, stale, missing]
+    order = [item_ids.index(i) for i in (fresh, stale, missing)]
+    assert np.array_equal(matrix[order], expected)
+    versions = (await db_session.execute(text("SELECT DISTINCT schema_version FROM item_features"))).scalars().all()
+    assert versions == [FEATURE_SCHEMA.version]
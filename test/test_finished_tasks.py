@@ -0,0 +1,98 @@
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from model.item import Item
+from app.workers import moderation_worker
+from repository.item.item_repository import ItemRepository
+from repository.moderation_result.finished_tasks import FinishedTaskBuffer
+from repository.moderation_result.moderation_redis_repository import ModerationRedisRepository, TASK_EVENTS_CHANNEL
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+from repository.records import ModerationRecord
+
+
+REDIS_MODULES = ("repository.moderation_result.moderation_redis_repository",)
+
+
+@pytest.fixture
+def redis_repo(redis_connection):
+    return ModerationRedisRepository()
+
+
+@pytest.mark.asyncio
+async def test_flush_caches_results_and_publishes_events(redis_repo, fake_redis):
+    pubsub = fake_redis.pubsub()
+    await pubsub.subscribe(TASK_EVENTS_CHANNEL)
+    await pubsub.get_message(timeout=1)
+
+    buffer = FinishedTaskBuffer(redis_repo)
+    buffer.add(ModerationRecord(1, 10, "completed", True, 0.9))
+    buffer.add(ModerationRecord(2, 20, "failed"))
+
+    assert await buffer.flush() == 2
+    assert len(buffer) == 0
+    assert (await redis_repo.get_moderation(1)).status == "completed"
+    assert (await redis_repo.get_moderation_for_item(20)).status == "failed"
+    events = [await pubsub.get_message(timeout=1) for _ in range(2)]
+    assert [event["data"] for event in events] == [
+        '{"task_id": 1, "status": "completed"}',
+        '{"task_id": 2, "status": "failed"}',
+    ]
+    await pubsub.aclose()
+
+
+@pytest.mark.asyncio
+async def test_flush_without_records_skips_redis():
+    redis_repo = MagicMock()
+    redis_repo.set_finished_tasks = AsyncMock()
+
+    assert await FinishedTaskBuffer(redis_repo).flush() == 0
+    redis_repo.set_finished_tasks.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_flush_failure_drops_batch():
+    redis_repo = MagicMock()
+    redis_repo.set_finished_tasks = AsyncMock(side_effect=ConnectionError("redis is down"))
+    buffer = FinishedTaskBuffer(redis_repo)
+    buffer.add(ModerationRecord(1, 10, "completed", True, 0.9))
+
+    assert await buffer.flush() == 0
+    assert len(buffer) == 0
+
+
+@pytest.mark.integration
+async def test_update_task_adds_finished_record_to_buffer(db_session):
+    item = await ItemRepository(db_session).create_item(Item(name="n", description="d", category=1, images_qty=1))
+    buffer = FinishedTaskBuffer(MagicMock())
+    moderations = ModerationResultRepository(db_session, finished_tasks=buffer)
+    task = await moderations.create_moderation(item.id)
+
+    await moderations.update_task(db_session, task.id, "pending")
+    assert len(buffer) == 0
+
+    record = await moderations.update_task(db_session, task.id, "completed", is_violation=True, probability=0.9)
+
+    assert record.id == task.id and record.item_id == item.id
+    assert record.status == "completed" and record.probability == 0.9
+    assert buffer._records == {task.id: record}
+
+
+@pytest.mark.asyncio
+async def test_handle_batch_flushes_then_commits_once():
+    events = []
+    consumer = MagicMock()
+    consumer.commit = AsyncMock(side_effect=lambda: events.append("commit"))
+    buffer = MagicMock()
+    buffer.flush = AsyncMock(side_effect=lambda: events.append("flush"))
+
+    async def handle_message(msg, **kwargs):
+        events.append(msg)
+
+    with patch.object(moderation_worker, "finished_tasks", buffer), \
+            patch.object(moderation_worker, "handle_message", side_effect=handle_message):
+        await moderation_worker.handle_batch(
+            consumer=consumer, messages=["m1", "m2", "m3"], model=None, model_repo=None, dlq_producer=None,
+        )
+
+    assert events == ["m1", "m2", "m3", "flush", "commit"]
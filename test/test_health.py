@@ -0,0 +1,114 @@
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.health import run_checks
+from app.startup import StartupState
+from routes import api
+from service.features import FEATURE_SCHEMA
+
+
+async def test_run_checks_reports_each_failure():
+    async def slow():
+        await asyncio.sleep(1)
+        return True
+
+    async def broken():
+        raise ConnectionError("refused")
+
+    results = await run_checks(
+        {"ok": lambda: True, "flag": lambda: False, "slow": slow, "broken": broken},
+        timeout=0.05,
+    )
+    assert results == {
+        "ok": None,
+        "flag": "not ready",
+        "slow": "timed out after 0.05s",
+        "broken": "ConnectionError: refused",
+    }
+
+
+@pytest.fixture
+def ready_dependencies(monkeypatch):
+    state = StartupState()
+    state.completed.add("warmup_prediction")
+    state.mark_ready()
+    monkeypatch.setattr(api, "startup_state", state)
+    monkeypatch.setattr(api, "ML_MODEL", object())
+    monkeypatch.setattr(api, "ping_database", AsyncMock(return_value=True))
+    monkeypatch.setattr(api.redis_repo, "ping", AsyncMock(return_value=True))
+    monkeypatch.setattr(api.producer, "_producer", object())
+    return state
+
+
+def test_liveness(app_client):
+    assert app_client.get("/health/live").json() == {"status": "alive"}
+
+
+def test_ready_when_all_checks_pass(app_client, ready_dependencies):
+    response = app_client.get("/health/ready")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["status"] == "ready"
+    assert set(body["checks"].values()) == {"ok"}
+
+
+@pytest.mark.parametrize("broken", ["model", "warmup_prediction", "redis", "stopping"])
+def test_not_ready_when_a_check_fails(app_client, ready_dependencies, monkeypatch, broken):
+    if broken == "model":
+        monkeypatch.setattr(api, "ML_MODEL", None)
+    elif broken == "warmup_prediction":
+        ready_dependencies.completed.clear()
+    elif broken == "redis":
+        monkeypatch.setattr(api.redis_repo, "ping", AsyncMock(side_effect=ConnectionError("refused")))
+    else:
+        ready_dependencies.mark_stopping()
+    response = app_client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "not_ready"
+
+
+def test_ready_waits_for_cache_warmup(app_client, ready_dependencies, monkeypatch):
+    monkeypatch.setattr(api, "READY_CACHE_WARMUP_ITEMS", 100)
+    response = app_client.get("/health/ready")
+    assert response.status_code == 503
+    assert response.json()["checks"]["cache_warmup"] == "not ready"
+
+    ready_dependencies.phases["cache_warmup"] = 0.1
+    assert app_client.get("/health/ready").status_code == 200
+
+
+async def test_incompatible_model_is_retrained_on_start(monkeypatch):
+    model_repository = MagicMock()
+    model_repository.load_model.return_value = MagicMock(feature_schema_version=FEATURE_SCHEMA.version + 1)
+    trained = FEATURE_SCHEMA.tag_model(MagicMock())
+    model_repository.train_model.return_value = trained
+    monkeypatch.setattr(api, "model_repository", model_repository)
+    monkeypatch.setattr(api, "setup_mlflow", lambda: None)
+    monkeypatch.setattr(api, "startup_state", StartupState())
+    monkeypatch.setattr(api, "ML_MODEL", None)
+
+    await api.load_model()
+
+    assert api.ML_MODEL is trained
+
+
+async def test_warm_up_runs_in_the_background(monkeypatch):
+    state = StartupState()
+    loaded = asyncio.Event()
+
+    async def prepare_model():
+        await loaded.wait()
+
+    monkeypatch.setattr(api, "startup_state", state)
+    monkeypatch.setattr(api, "prepare_model", prepare_model)
+    monkeypatch.setattr(api, "READY_CACHE_WARMUP_ITEMS", 0)
+
+    state.run_in_background("warm_up", api.warm_up())
+    await asyncio.sleep(0)
+    assert state.to_dict()["running"] == ["warm_up"] and not state.ready
+
+    loaded.set()
+    await state.background["warm_up"]
+    assert state.ready and state.to_dict()["running"] == []
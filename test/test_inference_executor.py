@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from app.metrics import INFERENCE_QUEUE_DEPTH, INFERENCE_UTILIZATION
+from repository.model.local_model_repository import LocalModelRepository
+from service.inference_executor import (
+    create_inference_executor,
+    share_model,
+    load_shared_model,
+    InlineInferenceExecutor,
+)
+from service.model_service import ModelService
+
+
+@pytest.fixture(scope="module")
+def model():
+    return LocalModelRepository().train_model()
+
+
+@pytest.fixture
+def features():
+    return np.random.default_rng(0).random((8, 4))
+
+
+@pytest.mark.parametrize("backend", ["inline", "thread", "process"])
+async def test_backends_match_direct_scoring(backend, model, features):
+    executor = create_inference_executor(backend, max_workers=2)
+    executor.start(model)
+    try:
+        probas = await executor.predict_proba(features)
+    finally:
+        executor.shutdown()
+
+    np.testing.assert_allclose(probas, model.predict_proba(features))
+    assert INFERENCE_QUEUE_DEPTH.labels(backend=backend)._value.get() == 0
+    assert INFERENCE_UTILIZATION.labels(backend=backend)._value.get() == 0
+
+
+async def test_not_started_executor_raises(features):
+    with pytest.raises(RuntimeError):
+        await InlineInferenceExecutor().predict_proba(features)
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        create_inference_executor("gpu")
+
+
+def test_shared_model_roundtrip(model, features):
+    shm, (name, payload_size, layout) = share_model(model)
+    try:
+        attached, loaded = load_shared_model(name, payload_size, layout)
+        np.testing.assert_allclose(loaded.predict_proba(features), model.predict_proba(features))
+        del loaded
+        attached.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+async def test_model_service_predict_async_uses_executor(model, predict_request_builder):
+    from dto.request import PredictRequest
+
+    executor = create_inference_executor("thread")
+    executor.start(model)
+    service = ModelService(model_repository=LocalModelRepository(), item_repository=None, model=model, executor=executor)
+    request = PredictRequest(**predict_request_builder(is_verified_seller=False, images_qty=0))
+    try:
+        result = await service.predict_async(request)
+    finally:
+        executor.shutdown()
+
+    expected = service.predict(request)
+    assert result.is_violation == expected.is_violation
+    assert result.probability == pytest.approx(expected.probability, rel=1e-5)
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+
+import pytest
+from prometheus_client import REGISTRY
+
+import app.instrumentation as instrumentation
+from app.instrumentation import (
+    current_trace,
+    db_query,
+    stage,
+    start_trace,
+    finish_trace,
+    timed,
+    traced,
+    traced_coroutine,
+    DATABASE,
+    FEATURES,
+    INFERENCE,
+)
+
+
+def stage_count(operation, name):
+    value = REGISTRY.get_sample_value(
+        "stage_duration_seconds_count", {"operation": operation, "stage": name}
+    )
+    return value or 0.0
+
+
+def query_count(query_type):
+    value = REGISTRY.get_sample_value("db_query_duration_seconds_count", {"query_type": query_type})
+    return value or 0.0
+
+
+def test_unsampled_request_gets_noop_stage():
+    trace, token = start_trace("op", sample_rate=0)
+    assert trace is None
+    assert current_trace() is None
+    assert stage(FEATURES) is stage(INFERENCE)
+    finish_trace(trace, token)
+
+
+def test_stages_accumulate_and_are_published():
+    before = stage_count("test_accumulate", FEATURES)
+    with traced("test_accumulate", sample_rate=1) as trace:
+        with stage(FEATURES):
+            pass
+        with stage(FEATURES):
+            pass
+        with stage(INFERENCE):
+            pass
+    assert set(trace.stages) == {FEATURES, INFERENCE}
+    assert current_trace() is None
+    assert stage_count("test_accumulate", FEATURES) == before + 1
+
+
+def test_nested_stage_is_attributed_to_outer():
+    with traced("test_nested", sample_rate=1) as trace:
+        with stage(INFERENCE):
+            with stage(FEATURES):
+                pass
+    assert list(trace.stages) == [INFERENCE]
+
+
+async def test_db_query_always_observes_histogram():
+    @db_query("test_select")
+    async def select():
+        return 42
+
+    before = query_count("test_select")
+    assert await select() == 42
+    assert query_count("test_select") == before + 1
+
+    with traced("test_db", sample_rate=1) as trace:
+        await select()
+    assert DATABASE in trace.stages
+    assert query_count("test_select") == before + 2
+
+
+async def test_timed_and_traced_coroutine():
+    @timed(FEATURES)
+    async def build():
+        await asyncio.sleep(0)
+
+    seen = {}
+
+    @traced_coroutine("test_coroutine", sample_rate=1)
+    async def handle():
+        await build()
+        seen.update(current_trace().stages)
+
+    await handle()
+    assert FEATURES in seen
+    assert current_trace() is None
+
+
+def test_slow_trace_is_logged(monkeypatch, caplog):
+    monkeypatch.setattr(instrumentation, "SLOW_REQUEST_THRESHOLD", 1e-9)
+    with caplog.at_level(logging.WARNING, logger="app.instrumentation"):
+        with traced("test_slow", sample_rate=1):
+            with stage(FEATURES):
+                pass
+    assert "Slow test_slow" in caplog.text
+    assert "features=" in caplog.text
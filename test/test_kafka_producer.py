@@ -0,0 +1,34 @@
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from app.clients.kafka import KafkaProducer
+
+
+async def test_moderation_request_is_keyed_by_item_id():
+    producer = KafkaProducer("localhost:9092")
+    producer._producer = AsyncMock()
+
+    await producer.send_moderation_request(42)
+
+    producer._producer.send_and_wait.assert_awaited_once()
+    args, kwargs = producer._producer.send_and_wait.call_args
+    assert args[0] == "moderation"
+    assert json.loads(args[1].decode("utf-8"))["item_id"] == 42
+    assert kwargs["key"] == b"42"
+
+
+async def test_send_json_without_key():
+    producer = KafkaProducer("localhost:9092")
+    producer._producer = AsyncMock()
+
+    await producer.send_json("topic", {"a": 1})
+
+    assert producer._producer.send_and_wait.call_args.kwargs["key"] is None
+
+
+async def test_send_json_requires_started_producer():
+    producer = KafkaProducer("localhost:9092")
+    with pytest.raises(RuntimeError):
+        await producer.send_json("topic", {})
@@ -0,0 +1,269 @@
+import asyncio
+import json
+from collections import Counter
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from aiokafka import TopicPartition
+
+from model.item import Item
+from app.clients.kafka import KafkaProducer
+from app.clients.lanes import lane_topic, parse_lane_weights
+from app.workers import moderation_worker
+from app.workers.moderation_worker import RetryableError, process_with_retry, requeue_for_retry
+from app.workers.queue import KafkaQueueConsumer, PostgresQueueConsumer, WeightedFairScheduler
+from repository.item.item_repository import ItemRepository
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+
+WEIGHTS = {"interactive": 8, "retry": 3, "bulk": 1}
+
+
+async def create_tasks(session_factory, lane, count):
+    async with session_factory() as db:
+        item = await ItemRepository(db).create_item(Item(name="n", description="d", category=1, images_qty=1))
+        moderations = ModerationResultRepository(db)
+        return [await moderations.create_moderation(item.id, lane) for _ in range(count)]
+
+
+def test_parse_lane_weights():
+    assert parse_lane_weights("interactive=8, retry=3, bulk=1") == WEIGHTS
+    with pytest.raises(ValueError):
+        parse_lane_weights("interactive=8,retry=3")
+    with pytest.raises(ValueError):
+        parse_lane_weights("interactive=8,retry=3,bulk=0")
+    with pytest.raises(ValueError):
+        parse_lane_weights("interactive=8,retry=3,bulk=1,urgent=5")
+
+
+def test_lane_topic_keeps_interactive_on_original_topic():
+    assert lane_topic("moderation", "interactive") == "moderation"
+    assert lane_topic("moderation", "bulk") == "moderation-bulk"
+
+
+def test_scheduler_shares_messages_by_weight_under_load():
+    scheduler = WeightedFairScheduler(WEIGHTS)
+    served = Counter()
+    for _ in range(1200):
+        lane = scheduler.order()[0]
+        scheduler.served(lane, 1)
+        served[lane] += 1
+
+    assert served == {"interactive": 800, "retry": 300, "bulk": 100}
+
+
+def test_scheduler_counts_messages_not_batches():
+    scheduler = WeightedFairScheduler({"interactive": 1, "retry": 1, "bulk": 1})
+    scheduler.served("bulk", 50)
+    scheduler.served("interactive", 1)
+
+    # Полоса bulk выбрала свою долю одной большой пачкой
+    assert scheduler.order()[-1] == "bulk"
+
+
+def test_scheduler_idle_lane_does_not_bank_credit():
+    scheduler = WeightedFairScheduler(WEIGHTS)
+    # Долго работает только bulk: interactive и retry пусты
+    for _ in range(100):
+        scheduler.served("bulk", 1)
+
+    served = Counter()
+    for _ in range(120):
+        lane = scheduler.order()[0]
+        scheduler.served(lane, 1)
+        served[lane] += 1
+
+    # Простой interactive и retry не превратился в запас: доли сразу по весам
+    assert served["interactive"] == 80
+    assert 9 <= served["bulk"] <= 10
+
+
+@pytest.mark.integration
+async def test_postgres_consumer_prefers_interactive_but_serves_bulk(session_factory):
+    await create_tasks(session_factory, "bulk", 3)
+    await create_tasks(session_factory, "interactive", 6)
+    consumer = PostgresQueueConsumer(
+        engine=None, session_maker=session_factory, batch_size=1, poll_interval=0.05, lease_seconds=60,
+        weights={"interactive": 2, "retry": 1, "bulk": 1},
+    )
+
+    lanes = []
+    for _ in range(9):
+        [msg] = await consumer.next_batch(asyncio.Event())
+        lanes.append(json.loads(msg.value)["lane"])
+
+    assert lanes.count("interactive") == 6 and lanes.count("bulk") == 3
+    # Пока есть interactive, bulk получает треть сообщений, а не ждёт конца очереди
+    assert lanes[:6].count("bulk") == 2
+    # Забранные задачи ждут результата и остаются в отставании полосы
+    assert await consumer.lane_lag() == [("interactive", "all", 6), ("retry", "all", 0), ("bulk", "all", 3)]
+
+
+@pytest.mark.integration
+async def test_requeue_task_moves_task_to_retry_lane(session_factory):
+    [task] = await create_tasks(session_factory, "interactive", 1)
+    async with session_factory() as db:
+        moderations = ModerationResultRepository(db)
+        assert len(await moderations.claim_pending(db, limit=10, lease_seconds=60)) == 1
+
+        assert await moderations.requeue_task(db, task.id, "retry") is True
+        assert await moderations.count_pending_by_lane() == {"retry": 1}
+        # Аренда снята: задачу сразу можно забрать из полосы retry
+        assert [claimed.id for claimed in await moderations.claim_pending(db, 10, 60, "retry")] == [task.id]
+
+        await moderations.update_task(db, task.id, "completed", is_violation=False, probability=0.1)
+        assert await moderations.requeue_task(db, task.id, "retry") is False
+
+
+def kafka_consumer():
+    consumer = KafkaQueueConsumer(
+        "localhost:9092", "moderation", "group", batch_size=10, batch_timeout_ms=100, weights=WEIGHTS,
+    )
+    consumer.consumer = MagicMock()
+    consumer.consumer.assignment.return_value = {
+        TopicPartition("moderation", 0), TopicPartition("moderation-bulk", 0), TopicPartition("moderation-retry", 0),
+    }
+    return consumer
+
+
+async def test_kafka_consumer_takes_batch_from_first_lane_with_messages():
+    consumer = kafka_consumer()
+    buffered = {"moderation-bulk": ["b1", "b2"], "moderation": ["i1"]}
+
+    async def getmany(*partitions, timeout_ms, max_records):
+        return {tp: buffered.pop(tp.topic) for tp in partitions if tp.topic in buffered}
+
+    consumer.consumer.getmany = AsyncMock(side_effect=getmany)
+
+    assert await consumer.next_batch(asyncio.Event()) == ["i1"]
+    assert await consumer.next_batch(asyncio.Event()) == ["b1", "b2"]
+    assert consumer.consumer.getmany.await_args_list[0].kwargs["timeout_ms"] == 0
+
+
+async def test_kafka_consumer_charges_every_lane_of_a_waited_batch():
+    consumer = kafka_consumer()
+    # В буфере ничего нет: пачка приходит из ожидающего getmany по всем разделам
+    consumer.consumer.getmany = AsyncMock(side_effect=[
+        {}, {}, {},
+        {TopicPartition("moderation-bulk", 0): ["b1", "b2"], TopicPartition("moderation", 0): ["i1"]},
+    ])
+
+    assert await consumer.next_batch(asyncio.Event()) == ["i1", "b1", "b2"]
+    assert consumer.consumer.getmany.await_args_list[-1].kwargs["timeout_ms"] == 100
+    assert consumer.scheduler.start_tag("interactive") > 0
+    assert consumer.scheduler.start_tag("bulk") > 0
+
+
+async def test_kafka_consumer_lane_lag():
+    consumer = kafka_consumer()
+    consumer.consumer.highwater = lambda tp: {"moderation": 10, "moderation-bulk": 500}.get(tp.topic)
+    consumer.consumer.position = AsyncMock(return_value=4)
+
+    assert sorted(await consumer.lane_lag()) == [("bulk", "0", 496), ("interactive", "0", 6)]
+
+
+async def test_kafka_producer_sends_bulk_to_its_topic():
+    producer = KafkaProducer("localhost:9092")
+    producer._producer = AsyncMock()
+
+    await producer.send_moderation_request(42, "bulk")
+
+    args, kwargs = producer._producer.send_and_wait.call_args
+    assert args[0] == "moderation-bulk"
+    assert json.loads(args[1])["lane"] == "bulk"
+
+
+async def test_requeue_for_retry_republishes_kafka_message():
+    producer = AsyncMock()
+
+    assert await requeue_for_retry(producer, {"item_id": 7, "lane": "interactive"}) is True
+
+    args, kwargs = producer.send_and_wait.call_args
+    assert args[0] == "moderation-retry"
+    assert json.loads(args[1]) == {"item_id": 7, "lane": "retry", "retry_count": 1}
+    assert kwargs["key"] == b"7"
+
+
+async def test_requeue_for_retry_without_producer():
+    assert await requeue_for_retry(None, {"item_id": 7}) is False
+
+
+@patch("asyncio.sleep", new_callable=AsyncMock)
+@patch("app.workers.moderation_worker.handle_moderation", new_callable=AsyncMock)
+@patch("app.workers.moderation_worker.ModerationResultRepository")
+@patch("app.workers.moderation_worker.session_maker")
+async def test_process_with_retry_hands_retry_to_retry_lane(mock_sm, MockModerRepo, mock_handle, mock_sleep):
+    mock_handle.side_effect = RetryableError()
+    MockModerRepo.return_value.get_latest_pending = AsyncMock(return_value=None)
+    requeue = AsyncMock(return_value=True)
+
+    await process_with_retry(
+        item_id=1, model=MagicMock(), model_repo=MagicMock(),
+        dlq_producer=None, original_event={"item_id": 1}, requeue=requeue,
+    )
+
+    mock_handle.assert_awaited_once()
+    mock_sleep.assert_not_awaited()
+    requeue.assert_awaited_once_with({"item_id": 1})
+
+
+@patch("app.workers.moderation_worker.send_to_dlq", new_callable=AsyncMock)
+@patch("app.workers.moderation_worker.mark_moderation_failed", new_callable=AsyncMock)
+@patch("asyncio.sleep", new_callable=AsyncMock)
+@patch("app.workers.moderation_worker.handle_moderation", new_callable=AsyncMock)
+@patch("app.workers.moderation_worker.ModerationResultRepository")
+@patch("app.workers.moderation_worker.session_maker")
+async def test_process_with_retry_in_retry_lane_retries_in_place(
+    mock_sm, MockModerRepo, mock_handle, mock_sleep, mock_mark, mock_dlq,
+):
+    mock_handle.side_effect = RetryableError()
+    moder_repo = MockModerRepo.return_value
+    moder_repo.increment_retry_count = AsyncMock()
+    requeue = AsyncMock(return_value=True)
+
+    await process_with_retry(
+        item_id=1, model=MagicMock(), model_repo=MagicMock(), dlq_producer=None,
+        original_event={"item_id": 1, "task_id": 5, "lane": "retry", "retry_count": 1}, requeue=requeue,
+    )
+
+    requeue.assert_not_awaited()
+    # Одна попытка уже была в исходной полосе: остальные идут здесь же, с задержкой
+    assert mock_handle.await_count == moderation_worker.MAX_RETRIES
+    assert [c.args[0] for c in mock_sleep.await_args_list] == [
+        moderation_worker.calculate_retry_delay(n) for n in range(1, moderation_worker.MAX_RETRIES)
+    ]
+    assert [c.args[1] for c in moder_repo.increment_retry_count.await_args_list] == [5] * (moderation_worker.MAX_RETRIES - 1)
+    mock_mark.assert_awaited_once()
+    assert mock_mark.await_args.kwargs["retry_count"] == moderation_worker.MAX_RETRIES
+    mock_dlq.assert_awaited_once()
+
+
+def test_observe_lane_latency_skips_messages_without_timestamp():
+    messages = [
+        SimpleNamespace(value=json.dumps({"item_id": 1, "lane": "bulk", "timestamp": "2026-01-01T00:00:00Z"}).encode()),
+        SimpleNamespace(value=json.dumps({"item_id": 2}).encode()),
+        SimpleNamespace(value=b"not json"),
+    ]
+    with patch.object(moderation_worker, "LANE_LATENCY") as latency:
+        moderation_worker.observe_lane_latency(messages)
+
+    latency.labels.assert_called_once_with(lane="bulk")
+    assert latency.labels.return_value.observe.call_args.args[0] > 0
+
+
+def test_async_predict_passes_priority(app_client):
+    from routes import api
+
+    app_client.moder_service.item_repo.get_item = AsyncMock(return_value=MagicMock(id=1))
+    app_client.moder_service.moder_repo.create_and_cache = AsyncMock(return_value=SimpleNamespace(id=5))
+    producer = MagicMock()
+    producer.send_moderation_request = AsyncMock()
+
+    with patch.object(api, "producer", producer):
+        response = app_client.post("/async_predict/1?priority=bulk")
+        invalid = app_client.post("/async_predict/1?priority=retry")
+
+    assert response.status_code == 200 and response.json()["task_id"] == 5
+    app_client.moder_service.moder_repo.create_and_cache.assert_awaited_once_with(1, "bulk")
+    producer.send_moderation_request.assert_awaited_once_with(1, "bulk")
+    assert invalid.status_code == 422
@@ -0,0 +1,59 @@
+import logging
+import queue
+
+from app.logs import DeferredQueueHandler, Fields, log_event
+
+
+class Expensive:
+    def __init__(self):
+        self.rendered = 0
+
+    def __str__(self):
+        self.rendered += 1
+        return "expensive"
+
+
+def test_fields_render_as_key_value():
+    assert str(Fields({"item_id": 1, "status": "ok"})) == "item_id=1 status=ok"
+
+
+def test_filtered_level_does_not_render(caplog):
+    logger = logging.getLogger("test.logs.filtered")
+    value = Expensive()
+    with caplog.at_level(logging.WARNING, logger="test.logs.filtered"):
+        log_event(logger, "predict.request", sample_rate=1, request=value)
+    assert value.rendered == 0
+    assert caplog.records == []
+
+
+def test_unsampled_record_is_dropped(caplog):
+    logger = logging.getLogger("test.logs.unsampled")
+    value = Expensive()
+    with caplog.at_level(logging.INFO, logger="test.logs.unsampled"):
+        log_event(logger, "predict.request", sample_rate=0, request=value)
+    assert value.rendered == 0
+    assert caplog.records == []
+
+
+def test_sampled_record_is_structured(caplog):
+    logger = logging.getLogger("test.logs.sampled")
+    with caplog.at_level(logging.INFO, logger="test.logs.sampled"):
+        log_event(logger, "predict.response", sample_rate=1, item_id=7, is_violation=False)
+    assert caplog.messages == ["predict.response item_id=7 is_violation=False"]
+
+
+def test_queue_handler_defers_formatting():
+    log_queue = queue.SimpleQueue()
+    value = Expensive()
+    logger = logging.getLogger("test.logs.queue")
+    logger.propagate = False
+    handler = DeferredQueueHandler(log_queue)
+    logger.addHandler(handler)
+    try:
+        logger.warning("%s %s", "predict.request", Fields({"request": value}))
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+    record = log_queue.get_nowait()
+    assert value.rendered == 0
+    assert record.getMessage() == "predict.request request=expensive"
@@ -0,0 +1,54 @@
+import os
+import subprocess
+import sys
+
+from app.metrics_exporter import build_registry, cleanup_dead_processes, prepare_multiproc_dir
+
+CHILD = """
+from prometheus_client import Counter, Gauge
+Counter("exporter_test_total", "test").inc({value})
+Gauge("exporter_test_in_flight", "test", multiprocess_mode="livesum").set({value})
+"""
+
+
+def run_child(path, value):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(path)}
+    subprocess.run([sys.executable, "-c", CHILD.format(value=value)], env=env, check=True)
+
+
+def test_counters_are_summed_across_processes(tmp_path):
+    prepare_multiproc_dir(str(tmp_path))
+    run_child(tmp_path, 2)
+    run_child(tmp_path, 3)
+
+    registry = build_registry(str(tmp_path))
+
+    assert registry.get_sample_value("exporter_test_total") == 5.0
+
+
+def test_live_gauges_of_dead_processes_are_removed(tmp_path):
+    prepare_multiproc_dir(str(tmp_path))
+    run_child(tmp_path, 4)
+    assert any(name.startswith("gauge_livesum_") for name in os.listdir(tmp_path))
+
+    registry = build_registry(str(tmp_path))
+
+    # Дочерний процесс завершился: его гауг не учитывается, а счётчик сохраняется
+    assert registry.get_sample_value("exporter_test_in_flight") is None
+    assert registry.get_sample_value("exporter_test_total") == 4.0
+    assert not any(name.startswith("gauge_livesum_") for name in os.listdir(tmp_path))
+
+
+def test_cleanup_keeps_files_of_live_processes(tmp_path):
+    (tmp_path / f"gauge_livesum_{os.getpid()}.db").write_bytes(b"")
+
+    assert cleanup_dead_processes(str(tmp_path)) == set()
+    assert (tmp_path / f"gauge_livesum_{os.getpid()}.db").exists()
+
+
+def test_prepare_multiproc_dir_removes_stale_files(tmp_path):
+    (tmp_path / "counter_1.db").write_bytes(b"")
+
+    prepare_multiproc_dir(str(tmp_path))
+
+    assert os.listdir(tmp_path) == []
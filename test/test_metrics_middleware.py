@@ -0,0 +1,73 @@
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.clients.middleware import PrometheusMiddleware, UNMATCHED_ENDPOINT
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        if item_id == 0:
+            raise HTTPException(status_code=404)
+        return {"item_id": item_id}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for i in range(3):
+                yield f"{i}\n"
+        return StreamingResponse(chunks())
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("boom")
+
+    app.add_middleware(PrometheusMiddleware)
+    with TestClient(app, raise_server_exceptions=False) as c:
+        yield c
+
+
+def count(endpoint, status, method="GET"):
+    value = REGISTRY.get_sample_value(
+        "http_requests_total", {"method": method, "endpoint": endpoint, "status": str(status)}
+    )
+    return value or 0.0
+
+
+def test_records_route_template_not_raw_path(client):
+    before = count("/items/{item_id}", 200)
+    client.get("/items/1")
+    client.get("/items/2")
+    assert count("/items/{item_id}", 200) == before + 2
+    assert count("/items/1", 200) == 0.0
+
+
+def test_records_error_status(client):
+    before = count("/items/{item_id}", 404)
+    client.get("/items/0")
+    assert count("/items/{item_id}", 404) == before + 1
+
+
+def test_unmatched_paths_share_one_label(client):
+    before = count(UNMATCHED_ENDPOINT, 404)
+    client.get("/no/such/path/1")
+    client.get("/no/such/path/2")
+    assert count(UNMATCHED_ENDPOINT, 404) == before + 2
+
+
+def test_unhandled_exception_counted_as_500(client):
+    before = count("/boom", 500)
+    assert client.get("/boom").status_code == 500
+    assert count("/boom", 500) == before + 1
+
+
+def test_streaming_response_passes_through(client):
+    response = client.get("/stream")
+    assert response.text == "0\n1\n2\n"
+    assert REGISTRY.get_sample_value("http_requests_in_flight") == 0.0
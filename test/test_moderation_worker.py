@@ -1,3 +1,4 @@
+import asyncio
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -8,6 +9,7 @@ from app.workers.moderation_worker import (
     is_retryable_error,
     calculate_retry_delay,
     handle_moderation,
+    load_model,
     process_with_retry,
     mark_moderation_failed,
     send_to_dlq,
@@ -16,15 +18,29 @@ from app.workers.moderation_worker import (
     MAX_RETRIES,
     RETRY_DELAY,
 )
+from app.workers.queue import InFlightRebalanceListener
+from service.features import FEATURE_SCHEMA
 
-def make_item(item_id=1):
-    item = MagicMock()
-    item.id = item_id
-    item.name = "Test"
-    item.description = "Description"
-    item.category = 1
-    item.images_qty = 3
-    return item
+def make_feature_matrix(item_id=1):
+    # Нормализованный вектор из item_features: ids и матрица
+    return [item_id], FEATURE_SCHEMA.build_matrix([(None, 3, len("Description"), 1)])
+
+
+def test_load_model_retrains_an_incompatible_model():
+    model_repo = MagicMock()
+    model_repo.load_model.return_value = MagicMock(feature_schema_version=FEATURE_SCHEMA.version + 1)
+    trained = FEATURE_SCHEMA.tag_model(MagicMock())
+    model_repo.train_model.return_value = trained
+
+    assert load_model(model_repo) is trained
+
+
+def test_load_model_returns_none_when_training_fails():
+    model_repo = MagicMock()
+    model_repo.load_model.side_effect = RuntimeError("no model")
+    model_repo.train_model.side_effect = RuntimeError("no data")
+
+    assert load_model(model_repo) is None
 
 
 def make_task(task_id=10):
@@ -36,6 +52,9 @@ def make_task(task_id=10):
 
 
 def make_session_maker(mock_db):
+    # Запросы через настоящие репозитории ничего не находят
+    mock_db.execute.return_value = MagicMock()
+    mock_db.execute.return_value.first.return_value = None
     cm = AsyncMock()
     cm.__aenter__ = AsyncMock(return_value=mock_db)
     cm.__aexit__ = AsyncMock(return_value=False)
@@ -72,7 +91,7 @@ def test_calculate_retry_delay():
 @patch("app.workers.moderation_worker.ItemRepository")
 async def test_handle_moderation_success(MockItemRepo, MockModerRepo, MockModelService):
     mock_item_repo = AsyncMock()
-    mock_item_repo.get_item = AsyncMock(return_value=make_item())
+    mock_item_repo.get_feature_matrix = AsyncMock(return_value=make_feature_matrix())
     MockItemRepo.return_value = mock_item_repo
 
     task = make_task()
@@ -85,7 +104,7 @@ async def test_handle_moderation_success(MockItemRepo, MockModerRepo, MockModelS
     mock_result.is_violation = True
     mock_result.probability = 0.95
     mock_service = MagicMock()
-    mock_service.predict.return_value = mock_result
+    mock_service.predict_batch_async = AsyncMock(return_value=[mock_result])
     MockModelService.return_value = mock_service
 
     await handle_moderation(db=AsyncMock(), item_id=1, model=MagicMock(), model_repo=MagicMock())
@@ -98,7 +117,7 @@ async def test_handle_moderation_success(MockItemRepo, MockModerRepo, MockModelS
 @patch("app.workers.moderation_worker.ItemRepository")
 async def test_handle_moderation_item_not_found(MockItemRepo):
     mock_item_repo = AsyncMock()
-    mock_item_repo.get_item = AsyncMock(return_value=None)
+    mock_item_repo.get_feature_matrix = AsyncMock(return_value=([], FEATURE_SCHEMA.build_matrix([])))
     MockItemRepo.return_value = mock_item_repo
 
     with pytest.raises(AdvertisementNotFoundError):
@@ -108,7 +127,7 @@ async def test_handle_moderation_item_not_found(MockItemRepo):
 @patch("app.workers.moderation_worker.ItemRepository")
 async def test_handle_moderation_no_pending_task(MockItemRepo, MockModerRepo):
     mock_item_repo = AsyncMock()
-    mock_item_repo.get_item = AsyncMock(return_value=make_item())
+    mock_item_repo.get_feature_matrix = AsyncMock(return_value=make_feature_matrix())
     MockItemRepo.return_value = mock_item_repo
 
     mock_moder_repo = AsyncMock()
@@ -124,7 +143,7 @@ async def test_handle_moderation_no_pending_task(MockItemRepo, MockModerRepo):
 @patch("app.workers.moderation_worker.ItemRepository")
 async def test_handle_moderation_model_not_available(MockItemRepo, MockModerRepo):
     mock_item_repo = AsyncMock()
-    mock_item_repo.get_item = AsyncMock(return_value=make_item())
+    mock_item_repo.get_feature_matrix = AsyncMock(return_value=make_feature_matrix())
     MockItemRepo.return_value = mock_item_repo
 
     mock_moder_repo = AsyncMock()
@@ -184,6 +203,17 @@ async def test_mark_moderation_failed_success(MockModerRepo):
     assert call_kwargs.kwargs["error_message"] == "fail"
     assert call_kwargs.kwargs["retry_count"] == 2
 
+@patch("app.workers.moderation_worker.ModerationResultRepository")
+async def test_mark_moderation_failed_uses_claimed_task(MockModerRepo):
+    mock_repo = AsyncMock()
+    mock_repo.update_task = AsyncMock()
+    MockModerRepo.return_value = mock_repo
+
+    await mark_moderation_failed(db=AsyncMock(), item_id=1, error_message="fail", task_id=7)
+
+    mock_repo.get_latest_pending.assert_not_awaited()
+    assert mock_repo.update_task.call_args.kwargs["task_id"] == 7
+
 @patch("app.workers.moderation_worker.ModerationResultRepository")
 async def test_mark_moderation_failed_no_task(MockModerRepo):
     mock_repo = AsyncMock()
@@ -270,3 +300,24 @@ async def test_process_with_retry_max_retries_exceeded(mock_sm, mock_handle, moc
     assert mock_handle.await_count == MAX_RETRIES + 1
     mock_dlq.assert_awaited_once()
     mock_mark.assert_awaited_once()
+
+async def test_rebalance_listener_waits_for_in_flight_message():
+    listener = InFlightRebalanceListener()
+    events = []
+
+    async def process():
+        async with listener.in_flight():
+            await asyncio.sleep(0.05)
+            events.append("committed")
+
+    processing = asyncio.create_task(process())
+    await asyncio.sleep(0)
+    await listener.on_partitions_revoked({"moderation-0"})
+    events.append("revoked")
+    await processing
+
+    assert events == ["committed", "revoked"]
+
+async def test_rebalance_listener_revokes_immediately_when_idle():
+    listener = InFlightRebalanceListener()
+    await asyncio.wait_for(listener.on_partitions_revoked(set()), timeout=0.1)
@@ -0,0 +1,67 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from app.exceptions import PasswordHashingBusyError
+from service.passwords import PasswordHasher
+
+FAST_SCRYPT = dict(scrypt_n=2 ** 10, scrypt_r=8, scrypt_p=1)
+
+
+def test_hash_is_salted_and_verifies():
+    hasher = PasswordHasher(**FAST_SCRYPT)
+    first, second = hasher.hash("secret"), hasher.hash("secret")
+
+    assert first != second
+    assert first.startswith("scrypt$1024$8$1$")
+    assert hasher.verify("secret", first) and hasher.verify("secret", second)
+    assert not hasher.verify("wrong", first)
+    assert not hasher.needs_rehash(first)
+
+
+def test_pbkdf2_and_legacy_md5_verify_and_need_rehash():
+    hasher = PasswordHasher(**FAST_SCRYPT)
+    pbkdf2 = PasswordHasher("pbkdf2_sha256", pbkdf2_iterations=1000).hash("secret")
+    legacy = hashlib.md5(b"secret").hexdigest()
+
+    assert hasher.verify("secret", pbkdf2) and hasher.verify("secret", legacy)
+    assert not hasher.verify("wrong", legacy)
+    assert hasher.needs_rehash(pbkdf2) and hasher.needs_rehash(legacy)
+    # Другие параметры того же алгоритма тоже требуют пересчёта
+    assert PasswordHasher(scrypt_n=2 ** 11).needs_rehash(hasher.hash("secret"))
+
+
+@pytest.mark.parametrize("stored", ["bcrypt$2b$salt$key", "scrypt$x$8$1$salt$key", "garbage", ""])
+def test_malformed_stored_hash_does_not_match(stored):
+    assert PasswordHasher(**FAST_SCRYPT).verify("secret", stored) is False
+
+
+async def test_prepare_computes_the_dummy_hash_in_the_pool():
+    hasher = PasswordHasher(**FAST_SCRYPT)
+    await hasher.prepare()
+
+    assert hasher._executor is not None
+    assert await hasher.dummy_hash() == hasher._dummy_hash
+    hasher.shutdown()
+
+
+def test_unknown_algorithm():
+    with pytest.raises(ValueError):
+        PasswordHasher("bcrypt")
+
+
+async def test_hashing_runs_off_the_event_loop_and_sheds_over_max_pending():
+    hasher = PasswordHasher(workers=1, max_pending=2, **FAST_SCRYPT)
+    stored = hasher.hash("secret")
+
+    first = asyncio.create_task(hasher.verify_async("secret", stored))
+    second = asyncio.create_task(hasher.verify_async("wrong", stored))
+    await asyncio.sleep(0)
+    assert hasher.pending == 2
+    with pytest.raises(PasswordHashingBusyError):
+        await hasher.hash_async("secret")
+
+    assert await asyncio.gather(first, second) == [True, False]
+    assert hasher.pending == 0
+    hasher.shutdown()
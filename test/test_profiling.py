@@ -0,0 +1,110 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from app import profiling
+from app.exceptions import ProfilerBusyError
+from app.profiling import Profile, SamplingProfiler, profile_for, tracemalloc_report
+
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+
+def spin(stop: threading.Event):
+    while not stop.is_set():
+        busy_loop(0.001)
+
+
+def test_wall_profiler_samples_other_threads():
+    stop = threading.Event()
+    thread = threading.Thread(target=spin, args=(stop,), name="spinner")
+    thread.start()
+    try:
+        profiler = SamplingProfiler(profiling.WALL, interval=0.001).start()
+        time.sleep(0.1)
+        profile = profiler.stop()
+    finally:
+        stop.set()
+        thread.join()
+    assert profile.samples > 0
+    collapsed = profile.collapsed()
+    assert any(
+        line.startswith("thread:spinner;") and "spin (test_profiling.py:" in line
+        for line in collapsed.splitlines()
+    )
+    assert "wall-profiler" not in collapsed
+
+
+def test_cpu_profiler_samples_main_thread():
+    profiler = SamplingProfiler(profiling.CPU, interval=0.001).start()
+    try:
+        busy_loop(0.2)
+    finally:
+        profile = profiler.stop()
+    assert profile.samples > 0
+    assert "busy_loop (test_profiling.py:" in profile.collapsed()
+
+
+def test_cpu_profiler_requires_main_thread():
+    errors = []
+
+    def start():
+        try:
+            SamplingProfiler(profiling.CPU).start()
+        except ValueError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=start)
+    thread.start()
+    thread.join()
+    assert errors
+
+
+def test_unknown_mode_rejected():
+    with pytest.raises(ValueError):
+        SamplingProfiler("gpu")
+
+
+def test_speedscope_merges_frames():
+    profile = Profile(profiling.WALL, interval=0.01)
+    main, handler, leaf = ("main", "app.py", 1), ("handler", "app.py", 10), ("leaf", "app.py", 20)
+    profile.add((main, handler, leaf))
+    profile.add((main, handler, leaf))
+    profile.add((main, handler))
+    document = json.loads(json.dumps(profile.speedscope("test")))
+    assert [frame["name"] for frame in document["shared"]["frames"]] == ["main", "handler", "leaf"]
+    sampled = document["profiles"][0]
+    assert sampled["samples"] == [[0, 1, 2], [0, 1]]
+    assert sampled["weights"] == pytest.approx([0.02, 0.01])
+    assert profile.collapsed().splitlines()[0] == "main (app.py:1);handler (app.py:10);leaf (app.py:20) 2"
+
+
+async def test_one_session_at_a_time():
+    first = asyncio.create_task(profile_for(0.2))
+    await asyncio.sleep(0.01)
+    with pytest.raises(ProfilerBusyError):
+        await tracemalloc_report(0)
+    profile = await first
+    assert profile.duration >= 0.2
+
+
+async def test_tracemalloc_report_shows_growth():
+    leak = []
+
+    async def allocate():
+        await asyncio.sleep(0.01)
+        leak.extend(bytearray(1024) for _ in range(500))
+
+    task = asyncio.create_task(allocate())
+    report = await tracemalloc_report(0.05, top=5)
+    await task
+    assert "# top 5 growth over the window" in report
+    assert "test_profiling.py" in report
@@ -0,0 +1,158 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiokafka import TopicPartition
+from sqlalchemy import text
+
+from model.item import Item
+from app.clients.kafka import KafkaProducer
+from app.clients.queue import PostgresQueueProducer, create_queue_producer, MODERATION_QUEUE_CHANNEL
+from app.workers.queue import KafkaQueueConsumer, PostgresQueueConsumer, create_queue_consumer
+from repository.item.item_repository import ItemRepository
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+from repository.records import ClaimedTask
+
+
+async def create_tasks(session_factory, count):
+    async with session_factory() as db:
+        item = await ItemRepository(db).create_item(Item(name="n", description="d", category=1, images_qty=1))
+        moderations = ModerationResultRepository(db)
+        return [await moderations.create_moderation(item.id) for _ in range(count)]
+
+
+def postgres_consumer(session_factory, batch_size=2, poll_interval=0.05, weights=None):
+    return PostgresQueueConsumer(
+        engine=None, session_maker=session_factory, batch_size=batch_size, poll_interval=poll_interval, lease_seconds=60,
+        weights=weights,
+    )
+
+
+def claimed(task):
+    return ClaimedTask(task.id, task.item_id, task.retry_count, task.created_at)
+
+
+@pytest.mark.integration
+async def test_claim_pending_skips_claimed_and_finished_tasks(session_factory):
+    tasks = await create_tasks(session_factory, 4)
+    async with session_factory() as db:
+        moderations = ModerationResultRepository(db)
+        await moderations.update_task(db, tasks[0].id, "completed", is_violation=False, probability=0.1)
+
+        first = await moderations.claim_pending(db, limit=2, lease_seconds=60)
+        second = await moderations.claim_pending(db, limit=2, lease_seconds=60)
+        third = await moderations.claim_pending(db, limit=2, lease_seconds=60)
+
+    assert first == [claimed(tasks[1]), claimed(tasks[2])]
+    assert second == [claimed(tasks[3])]
+    assert third == []
+
+
+@pytest.mark.integration
+async def test_claim_pending_reclaims_expired_lease(session_factory):
+    tasks = await create_tasks(session_factory, 1)
+    async with session_factory() as db:
+        moderations = ModerationResultRepository(db)
+        assert len(await moderations.claim_pending(db, limit=10, lease_seconds=60)) == 1
+        # Воркер, забравший задачу, упал час назад
+        await db.execute(
+            text("UPDATE moderation_results SET claimed_at = :claimed_at"),
+            {"claimed_at": datetime.now(timezone.utc) - timedelta(hours=1)},
+        )
+        await db.commit()
+
+        assert await moderations.claim_pending(db, limit=10, lease_seconds=60) == [claimed(tasks[0])]
+
+
+@pytest.mark.integration
+async def test_postgres_consumer_returns_claimed_tasks_as_messages(session_factory):
+    tasks = await create_tasks(session_factory, 3)
+    consumer = postgres_consumer(session_factory)
+
+    batch = await consumer.next_batch(asyncio.Event())
+
+    events = [json.loads(msg.value) for msg in batch]
+    assert [(event["item_id"], event["task_id"], event["lane"]) for event in events] == [
+        (task.item_id, task.id, "interactive") for task in tasks[:2]
+    ]
+    assert all(datetime.fromisoformat(event["timestamp"]).tzinfo is not None for event in events)
+    assert len(await consumer.next_batch(asyncio.Event())) == 1
+
+
+@pytest.mark.integration
+async def test_postgres_consumer_waits_for_notify(session_factory):
+    consumer = postgres_consumer(session_factory, poll_interval=10)
+
+    async def notify():
+        await asyncio.sleep(0.05)
+        await create_tasks(session_factory, 1)
+        consumer._on_notify(None, 0, MODERATION_QUEUE_CHANNEL, "1")
+
+    started = asyncio.get_running_loop().time()
+    empty, _ = await asyncio.gather(consumer.next_batch(asyncio.Event()), notify())
+
+    assert empty == []
+    assert asyncio.get_running_loop().time() - started < 1
+    assert len(await consumer.next_batch(asyncio.Event())) == 1
+
+
+@pytest.mark.integration
+async def test_postgres_consumer_stops(session_factory):
+    consumer = postgres_consumer(session_factory, poll_interval=10)
+    stopping = asyncio.Event()
+    asyncio.get_running_loop().call_later(0.05, stopping.set)
+
+    assert await consumer.next_batch(stopping) is None
+
+
+async def test_postgres_producer_notifies_workers():
+    db = AsyncMock()
+    session = MagicMock()
+    session.__aenter__ = AsyncMock(return_value=db)
+    session.__aexit__ = AsyncMock(return_value=False)
+    producer = PostgresQueueProducer(MagicMock(return_value=session))
+
+    await producer.start()
+    await producer.send_moderation_request(42)
+
+    assert producer.is_started
+    params = db.execute.call_args.args[1]
+    assert params == {"channel": MODERATION_QUEUE_CHANNEL, "payload": "42"}
+    db.commit.assert_awaited_once()
+
+
+async def test_kafka_consumer_flattens_partitions():
+    consumer = KafkaQueueConsumer("localhost:9092", "moderation", "group", batch_size=10, batch_timeout_ms=100)
+    consumer.consumer = MagicMock()
+    consumer.consumer.getmany = AsyncMock(
+        return_value={TopicPartition("moderation", 0): ["a", "b"], TopicPartition("moderation", 1): ["c"]},
+    )
+
+    assert await consumer.next_batch(asyncio.Event()) == ["a", "b", "c"]
+
+
+async def test_kafka_consumer_returns_none_on_stop():
+    consumer = KafkaQueueConsumer("localhost:9092", "moderation", "group", batch_size=10, batch_timeout_ms=100)
+    consumer.consumer = MagicMock()
+
+    async def never():
+        await asyncio.Event().wait()
+
+    consumer.consumer.getmany = MagicMock(side_effect=lambda **kwargs: never())
+    stopping = asyncio.Event()
+    stopping.set()
+
+    assert await consumer.next_batch(stopping) is None
+
+
+def test_backend_factories():
+    assert isinstance(create_queue_producer("kafka", "localhost:9092", None), KafkaProducer)
+    assert isinstance(create_queue_producer("postgres", "localhost:9092", None), PostgresQueueProducer)
+    assert create_queue_consumer("postgres").backend == "postgres"
+    assert create_queue_consumer("kafka").backend == "kafka"
+    with pytest.raises(ValueError):
+        create_queue_producer("rabbitmq", "localhost:9092", None)
+    with pytest.raises(ValueError):
+        create_queue_consumer("rabbitmq")
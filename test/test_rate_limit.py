@@ -0,0 +1,140 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis.aioredis
+import pytest
+from prometheus_client import REGISTRY
+
+from app.rate_limit import RateLimiter, TokenBucketLimit, parse_rate_limit_tiers
+from repository.account.rate_limit_repository import RateLimitRepository, bucket_key
+
+TIERS = {
+    "free": {"simple_predict": TokenBucketLimit(rate=1, burst=8)},
+    "pro": {"simple_predict": TokenBucketLimit(rate=100, burst=400)},
+}
+
+
+@pytest.fixture
+def fake_redis():
+    return fakeredis.aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+
+
+@pytest.fixture
+def repository(fake_redis):
+    @asynccontextmanager
+    async def fake_connection():
+        yield fake_redis
+
+    with patch("repository.account.rate_limit_repository.get_redis_connection", fake_connection):
+        yield RateLimitRepository()
+
+
+def checks(endpoint, source):
+    return REGISTRY.get_sample_value("rate_limit_checks_total", {"endpoint": endpoint, "source": source}) or 0
+
+
+def test_parse_rate_limit_tiers():
+    assert parse_rate_limit_tiers("free:simple_predict=5/20,async_predict=2; pro:simple_predict=50/100") == {
+        "free": {"simple_predict": TokenBucketLimit(5, 20), "async_predict": TokenBucketLimit(2, 2)},
+        "pro": {"simple_predict": TokenBucketLimit(50, 100)},
+    }
+    with pytest.raises(ValueError):
+        parse_rate_limit_tiers("free:simple_predict=0/10")
+
+
+async def test_bucket_grants_up_to_burst_then_refills(repository, fake_redis):
+    assert await repository.take(1, "simple_predict", rate=50, burst=5, requested=3) == (3, 0.0)
+    assert (await repository.take(1, "simple_predict", rate=50, burst=5, requested=3))[0] == 2
+
+    granted, retry_after = await repository.take(1, "simple_predict", rate=50, burst=5)
+    assert granted == 0 and 0 < retry_after <= 0.02
+    # Корзины аккаунтов и эндпоинтов независимы
+    assert (await repository.take(2, "simple_predict", rate=50, burst=5))[0] == 1
+    assert 0 < await fake_redis.pttl(bucket_key(1, "simple_predict")) <= 1100
+
+    await asyncio.sleep(0.05)
+    assert (await repository.take(1, "simple_predict", rate=50, burst=5))[0] == 1
+
+
+async def test_script_is_sent_once_then_called_by_sha(repository, fake_redis):
+    await repository.take(1, "simple_predict", rate=50, burst=5)
+    assert await fake_redis.script_exists(repository.script_sha) == [True]
+
+    with patch.object(fake_redis, "eval", wraps=fake_redis.eval) as evaluate:
+        await repository.take(1, "simple_predict", rate=50, burst=5)
+    evaluate.assert_not_called()
+
+
+async def test_limiter_spends_leased_tokens_without_redis(repository):
+    limiter = RateLimiter(TIERS, repository=repository, lease_tokens=10)
+    before = checks("simple_predict", "redis")
+
+    results = [await limiter.acquire(1, "free", "simple_predict") for _ in range(10)]
+
+    # Корзина на 8 токенов, аренда — четверть корзины: 4 обращения к Redis на 8 запросов
+    assert results[:8] == [None] * 8
+    assert all(retry_after is not None and retry_after > 0 for retry_after in results[8:])
+    assert checks("simple_predict", "redis") - before == 5
+
+
+async def test_limiter_rejects_locally_until_refill():
+    repository = MagicMock()
+    repository.take = AsyncMock(return_value=(0, 30.0))
+    limiter = RateLimiter(TIERS, repository=repository)
+
+    assert await limiter.acquire(1, "free", "simple_predict") == 30.0
+    assert 29 < await limiter.acquire(1, "free", "simple_predict") <= 30
+    repository.take.assert_awaited_once()
+
+
+async def test_limiter_shares_one_bucket_between_processes(repository):
+    processes = [RateLimiter(TIERS, repository=repository) for _ in range(3)]
+
+    allowed = 0
+    for _ in range(10):
+        for limiter in processes:
+            allowed += await limiter.acquire(1, "free", "simple_predict") is None
+
+    assert allowed == 8
+
+
+async def test_limiter_lets_requests_through_while_redis_is_down():
+    repository = MagicMock()
+    repository.take = AsyncMock(side_effect=ConnectionError("redis is down"))
+    limiter = RateLimiter(TIERS, repository=repository, error_backoff=60)
+
+    assert await limiter.acquire(1, "free", "simple_predict") is None
+    assert await limiter.acquire(2, "free", "simple_predict") is None
+    repository.take.assert_awaited_once()
+
+
+async def test_unlimited_endpoint_and_unknown_tier():
+    repository = MagicMock()
+    repository.take = AsyncMock(return_value=(1, 0.0))
+    limiter = RateLimiter(TIERS, default_tier="free", repository=repository)
+
+    assert await limiter.acquire(1, "free", "async_predict") is None
+    repository.take.assert_not_awaited()
+    assert limiter.tier_of(SimpleNamespace(tier="enterprise")) == "free"
+    assert limiter.tier_of(SimpleNamespace(tier="pro")) == "pro"
+
+
+def test_simple_predict_over_the_limit_gets_429(app_client, mock_account, monkeypatch):
+    from routes import api
+
+    repository = MagicMock()
+    repository.take = AsyncMock(return_value=(0, 2.5))
+    monkeypatch.setattr(api.rate_limiter, "repository", repository)
+    monkeypatch.setattr(api.rate_limiter, "_leases", {})
+    # Без Redis в тестах лимитер мог уже перейти в режим пропуска
+    monkeypatch.setattr(api.rate_limiter, "_bypass_until", 0.0)
+    mock_account.tier = "free"
+    before = REGISTRY.get_sample_value("rate_limited_total", {"endpoint": "simple_predict", "tier": "free"}) or 0
+
+    response = app_client.post("/simple_predict/1")
+
+    assert response.status_code == 429 and response.headers["Retry-After"] == "3"
+    assert REGISTRY.get_sample_value("rate_limited_total", {"endpoint": "simple_predict", "tier": "free"}) == before + 1
+    app_client.moder_service.item_repo.get_item.assert_not_awaited()
@@ -0,0 +1,78 @@
+import pytest
+from datetime import datetime, timezone
+
+from model.item import Item
+from repository.account.account_repository import AccountRepository
+from repository.item.item_repository import ItemRepository
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+from repository.records import ItemRecord, ModerationRecord, PendingTask, AccountStatus
+
+
+def test_records_are_immutable_and_slotted():
+    item = ItemRecord(1, "name", "desc", 1, 2, False)
+    with pytest.raises(AttributeError):
+        item.name = "other"
+    assert not hasattr(item, "__dict__")
+    assert item.seller_id is None and item.is_verified_seller is None
+
+
+def test_from_row_keeps_none():
+    assert ItemRecord.from_row(None) is None
+    assert PendingTask.from_row((5,)) == PendingTask(id=5)
+
+
+def test_moderation_to_dict_formats_timestamps():
+    created = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    record = ModerationRecord(1, 10, "completed", True, 0.9, None, 0, created, None)
+    d = record.to_dict()
+    assert d["created_at"] == created.isoformat()
+    assert d["processed_at"] is None
+    assert d["is_violation"] is True
+
+
+@pytest.mark.integration
+async def test_repositories_return_typed_records(db_session):
+    items = ItemRepository(db_session)
+    created = await items.create_item(Item(name="n", description="d", category=1, images_qty=1))
+    assert isinstance(created, ItemRecord)
+    assert created.is_closed is False
+
+    closed = await items.close_item(created.id)
+    assert closed.is_closed is True
+    assert await items.close_item(10_000) is None
+
+    moderations = ModerationResultRepository(db_session)
+    task = await moderations.create_moderation(created.id)
+    assert isinstance(task, ModerationRecord)
+    assert isinstance(task.created_at, datetime)
+    assert await moderations.get_latest_pending(db_session, created.id) == PendingTask(id=task.id)
+
+
+@pytest.mark.integration
+async def test_account_status_has_no_password(db_session):
+    accounts = AccountRepository(db_session)
+    account = await accounts.create_account("login", "password")
+
+    status = await accounts.get_status(account.id)
+
+    assert status == AccountStatus(id=account.id, login="login", is_blocked=False, tier="free")
+    assert await accounts.delete_account(account.id) is True
+    assert await accounts.delete_account(account.id) is False
+
+
+def test_cache_codec_roundtrip():
+    created = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    record = ModerationRecord(1, 10, "completed", False, 0.25, None, 2, created, created)
+
+    decoded = ModerationRecord.from_cache(record.to_cache())
+
+    assert decoded == record
+    assert ModerationRecord.from_cache(None) is None
+
+
+def test_cache_codec_reads_legacy_json_objects():
+    raw = '{"id": 3, "item_id": 30, "status": "failed", "is_violation": null, "probability": null}'
+
+    decoded = ModerationRecord.from_cache(raw)
+
+    assert decoded == ModerationRecord(id=3, item_id=30, status="failed")
@@ -0,0 +1,76 @@
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch
+
+import fakeredis.aioredis
+import pytest
+from fastapi.responses import JSONResponse
+
+from app.responses import FastJSONResponse, moderation_result_body, render_moderation_result
+from dto.response import ModerationResultResponse
+from repository.moderation_result.moderation_redis_repository import ModerationRedisRepository
+from repository import records
+from repository.records import ModerationRecord, RenderedResult
+
+COMPLETED = ModerationRecord(7, 10, "completed", True, 0.875)
+
+
+@pytest.fixture
+def redis_repo():
+    fake_redis = fakeredis.aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+
+    @asynccontextmanager
+    async def fake_connection():
+        yield fake_redis
+
+    with patch("repository.moderation_result.moderation_redis_repository.get_redis_connection", fake_connection):
+        yield ModerationRedisRepository()
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_fast_response_renders_the_same_bytes_as_fastapi(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(records, "orjson", None)
+    content = {"task_id": 1, "status": "failed", "is_violation": None, "probability": 0.1, "message": "ошибка"}
+
+    assert FastJSONResponse(content).body == JSONResponse(content).body
+
+
+def test_rendered_body_matches_response_model():
+    expected = ModerationResultResponse(task_id=7, status="completed", is_violation=True, probability=0.875)
+
+    assert moderation_result_body(COMPLETED) == expected.model_dump()
+    assert ModerationResultResponse.model_validate_json(render_moderation_result(COMPLETED)) == expected
+
+
+async def test_finished_tasks_are_cached_pre_rendered(redis_repo):
+    pending = ModerationRecord(8, 10, "pending")
+    await redis_repo.set_finished_tasks([COMPLETED])
+    await redis_repo.set_moderation(8, pending)
+
+    rendered = await redis_repo.get_rendered_result(7)
+    assert rendered == RenderedResult(10, 0.875, render_moderation_result(COMPLETED))
+    assert await redis_repo.get_rendered_result(8) is None
+
+    await redis_repo.delete_for_item(10, [7, 8])
+    assert await redis_repo.get_rendered_result(7) is None
+
+
+def test_moderation_result_returns_pre_rendered_body(app_client):
+    moder_repo = app_client.moder_service.moder_repo
+    body = render_moderation_result(COMPLETED)
+    moder_repo.get_rendered_result = AsyncMock(return_value=RenderedResult(10, 0.875, body))
+
+    response = app_client.get("/moderation_result/7?wait=5")
+
+    assert response.status_code == 200
+    assert response.content == body.encode()
+    assert response.headers["content-type"] == "application/json"
+    moder_repo.get_result.assert_not_awaited()
+
+
+def test_moderation_result_falls_back_to_the_record(app_client):
+    app_client.moder_service.moder_repo.get_result = AsyncMock(return_value=COMPLETED)
+
+    response = app_client.get("/moderation_result/7")
+
+    assert response.json() == moderation_result_body(COMPLETED)
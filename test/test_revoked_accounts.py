@@ -0,0 +1,71 @@
+from unittest.mock import patch
+
+import pytest
+
+from repository.account.account_repository import AccountRepository
+from repository.account.account_tier_cache import AccountTierCache, MISSING as TIER_MISSING
+from repository.account.revoked_accounts import RevokedAccounts, REVOKED_ACCOUNTS_KEY
+
+
+REDIS_MODULES = ("repository.account.revoked_accounts",)
+
+
+async def test_revocation_reaches_other_processes_on_refresh(redis_connection):
+    blocking, other = RevokedAccounts(), RevokedAccounts()
+    await other.refresh()
+    assert other.loaded and not other.is_revoked(7)
+
+    await blocking.revoke(7)
+
+    assert blocking.is_revoked(7)
+    await other.refresh()
+    assert other.is_revoked(7)
+
+
+async def test_refresh_skips_reading_the_set_while_version_is_unchanged(redis_connection):
+    revoked = RevokedAccounts()
+    await revoked.revoke(1)
+    await revoked.refresh()
+
+    # Без сдвига версии множество не перечитывается
+    await redis_connection.sadd(REVOKED_ACCOUNTS_KEY, 2)
+    await revoked.refresh()
+    assert not revoked.is_revoked(2)
+
+    await revoked.revoke(3)
+    await revoked.refresh()
+    assert revoked.ids == {1, 2, 3}
+
+
+@pytest.mark.integration
+async def test_blocking_and_deleting_revoke_the_account(redis_connection, db_session):
+    revoked = RevokedAccounts()
+    accounts = AccountRepository(db_session, revoked)
+    blocked = await accounts.create_account("blocked", "password")
+    deleted = await accounts.create_account("deleted", "password")
+    active = await accounts.create_account("active", "password")
+
+    await accounts.block_account(blocked.id)
+    await accounts.delete_account(deleted.id)
+
+    assert revoked.ids == {blocked.id, deleted.id}
+    assert await accounts.get_blocked_ids() == [blocked.id]
+    assert not revoked.is_revoked(active.id)
+
+
+@pytest.mark.integration
+async def test_block_is_kept_when_redis_is_down(db_session):
+    revoked = RevokedAccounts()
+    tier_cache = AccountTierCache()
+    accounts = AccountRepository(db_session, revoked, tier_cache=tier_cache)
+    account = await accounts.create_account("user", "password")
+    await accounts.get_status(account.id)
+    assert tier_cache.get(account.id) is not TIER_MISSING
+
+    with patch.object(revoked, "revoke", side_effect=ConnectionError("refused")):
+        blocked = await accounts.block_account(account.id)
+
+    assert blocked.is_blocked
+    # Кэш тарифа сброшен: этот процесс сразу читает аккаунт из БД и видит блокировку
+    assert tier_cache.get(account.id) is TIER_MISSING
+    assert await accounts.get_blocked_ids() == [account.id]
@@ -0,0 +1,133 @@
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+from dto.request import PredictRequest
+from model.item import Item
+from repository.item.item_repository import ItemRepository
+from repository.seller.seller_cache import SellerVerificationCache, MISSING
+from repository.seller.seller_repository import SellerRepository
+from service.features import FEATURE_SCHEMA
+from service.model_service import ModelService
+
+
+def test_cache_miss_hit_and_invalidate():
+    cache = SellerVerificationCache(ttl=60, max_size=10)
+    assert cache.get(1) is MISSING
+    cache.put(1, True)
+    assert cache.get(1) is True
+    cache.invalidate(1)
+    assert cache.get(1) is MISSING
+
+
+def test_cache_entries_expire():
+    cache = SellerVerificationCache(ttl=-1, max_size=10)
+    cache.put(1, False)
+    assert cache.get(1) is MISSING
+    assert len(cache) == 0
+
+
+def test_cache_evicts_oldest_when_full():
+    cache = SellerVerificationCache(ttl=60, max_size=2)
+    cache.put(1, True)
+    cache.put(2, False)
+    cache.put(3, True)
+    assert cache.get(1) is MISSING
+    assert cache.get(2) is False
+    assert cache.get(3) is True
+
+
+async def create_item(db_session, cache, is_verified=None):
+    seller_id = None
+    if is_verified is not None:
+        seller = await SellerRepository(db_session, cache=cache).create_seller(
+            SimpleNamespace(is_verified_seller=is_verified)
+        )
+        seller_id = seller.id
+    item = Item(name="item", description="desc", category=3, images_qty=2, seller_id=seller_id)
+    return await ItemRepository(db_session, seller_cache=cache).create_item(item)
+
+
+@pytest.mark.integration
+async def test_get_item_returns_seller_flag_and_warms_cache(db_session):
+    cache = SellerVerificationCache()
+    created = await create_item(db_session, cache, is_verified=True)
+    cache.invalidate()
+
+    item = await ItemRepository(db_session, seller_cache=cache).get_item(created.id)
+
+    assert item.is_verified_seller is True
+    assert cache.get(item.seller_id) is True
+
+
+@pytest.mark.integration
+async def test_get_item_without_seller_keeps_flag_unknown(db_session):
+    cache = SellerVerificationCache()
+    created = await create_item(db_session, cache)
+
+    item = await ItemRepository(db_session, seller_cache=cache).get_item(created.id)
+
+    assert item.seller_id is None
+    assert item.is_verified_seller is None
+
+
+@pytest.mark.integration
+async def test_feature_rows_include_seller_flag(db_session):
+    cache = SellerVerificationCache()
+    verified = await create_item(db_session, cache, is_verified=True)
+    unknown = await create_item(db_session, cache)
+
+    rows = await ItemRepository(db_session).get_feature_rows([verified.id, unknown.id])
+    matrix = FEATURE_SCHEMA.build_matrix(sorted(rows, key=lambda row: row[0]), first_column=1)
+
+    assert matrix[0, 0] == 1.0
+    assert matrix[1, 0] == 0.0
+
+
+@pytest.mark.integration
+async def test_set_verified_invalidates_cache(db_session):
+    cache = SellerVerificationCache()
+    sellers = SellerRepository(db_session, cache=cache)
+    seller = await sellers.create_seller(SimpleNamespace(is_verified_seller=False))
+    assert await sellers.is_verified(seller.id) is False
+
+    await sellers.set_verified(seller.id, True)
+
+    assert cache.get(seller.id) is MISSING
+    assert await sellers.is_verified(seller.id) is True
+
+
+async def test_predict_async_resolves_seller_flag():
+    seller_repository = SimpleNamespace(is_verified=AsyncMock(return_value=True))
+    service = ModelService(model_repository=None, item_repository=None, seller_repository=seller_repository)
+    request = PredictRequest(seller_id=7, item_id=1, name="n", description="d", category=1, images_qty=1)
+
+    resolved = await service.resolve_seller(request)
+
+    assert resolved.is_verified_seller is True
+    seller_repository.is_verified.assert_awaited_once_with(7)
+
+
+async def test_predict_async_keeps_explicit_seller_flag():
+    seller_repository = SimpleNamespace(is_verified=AsyncMock(return_value=True))
+    service = ModelService(model_repository=None, item_repository=None, seller_repository=seller_repository)
+    request = PredictRequest(seller_id=7, is_verified_seller=False, item_id=1, name="n", description="d", category=1, images_qty=1)
+
+    resolved = await service.resolve_seller(request)
+
+    assert resolved.is_verified_seller is False
+    seller_repository.is_verified.assert_not_awaited()
+
+
+@pytest.mark.integration
+async def test_set_verified_updates_stored_features(db_session):
+    cache = SellerVerificationCache()
+    created = await create_item(db_session, cache, is_verified=False)
+    repo = ItemRepository(db_session, seller_cache=cache)
+    _, before = await repo.get_feature_matrix([created.id])
+
+    await SellerRepository(db_session, cache=cache).set_verified(created.seller_id, True)
+    _, after = await repo.get_feature_matrix([created.id])
+
+    assert before[0, 0] == 0.0
+    assert after[0, 0] == 1.0
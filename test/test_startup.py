@@ -0,0 +1,63 @@
+import asyncio
+import sys
+import time
+
+import pytest
+
+from app.startup import StartupState
+from repository.model.mlflow_repository import MlflowModelRepository
+
+
+async def test_phase_records_duration():
+    state = StartupState()
+    async with state.phase("db"):
+        await asyncio.sleep(0.01)
+    assert state.phases["db"] >= 0.01
+    assert state.failed == {}
+
+
+async def test_failed_phase_is_recorded_and_raised():
+    state = StartupState()
+    with pytest.raises(ConnectionError):
+        async with state.phase("kafka"):
+            raise ConnectionError("broker is down")
+    assert state.failed == {"kafka": "ConnectionError: broker is down"}
+    assert "kafka" in state.phases
+
+
+async def test_steps_run_concurrently():
+    state = StartupState()
+
+    async def step(name):
+        async with state.phase(name):
+            await asyncio.sleep(0.1)
+
+    start = time.perf_counter()
+    await state.run_concurrently(step("a"), step("b"), step("c"))
+    assert time.perf_counter() - start < 0.25
+    assert set(state.phases) == {"a", "b", "c"}
+
+
+async def test_failure_cancels_other_steps():
+    state = StartupState()
+    finished = []
+
+    async def slow():
+        await asyncio.sleep(1)
+        finished.append("slow")
+
+    async def broken():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await state.run_concurrently(slow(), broken())
+    assert finished == []
+
+
+def test_mlflow_repository_is_lazy():
+    mlflow = sys.modules["mlflow"]
+    mlflow.reset_mock()
+    repo = MlflowModelRepository("http://mlflow:5000")
+    assert mlflow.method_calls == []
+    repo.mlflow_client
+    mlflow.set_experiment.assert_called_once_with("my_name")
@@ -0,0 +1,230 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis.aioredis
+import pytest
+
+from repository.moderation_result.moderation_redis_repository import ModerationRedisRepository
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+from repository.moderation_result.task_events import TaskEventListener
+from repository.records import ModerationRecord
+from service.moderation_service import ModerationService
+
+
+def make_task(id=1, status="pending", is_violation=None, probability=None):
+    return SimpleNamespace(id=id, item_id=10, status=status, is_violation=is_violation, probability=probability)
+
+
+@pytest.fixture
+def fake_redis():
+    return fakeredis.aioredis.FakeRedis(encoding="utf-8", decode_responses=True)
+
+
+@pytest.fixture
+def redis_patched(fake_redis):
+    @asynccontextmanager
+    async def fake_connection():
+        yield fake_redis
+
+    with patch(
+        "repository.moderation_result.moderation_redis_repository.get_redis_connection", fake_connection
+    ), patch("repository.moderation_result.task_events.get_redis_connection", fake_connection):
+        yield
+
+
+@pytest.fixture
+async def listener(redis_patched):
+    listener = TaskEventListener(ready_timeout=1, reconnect_delay=0.05, fallback_poll=0.05)
+    yield listener
+    await listener.stop()
+
+
+@pytest.mark.asyncio
+async def test_published_event_wakes_subscription(listener):
+    async with listener.subscribe([1, 2]) as events:
+        assert listener.connected
+        await ModerationRedisRepository().publish_task_event(2, "completed")
+        assert await events.wait(1) == {2}
+
+
+@pytest.mark.asyncio
+async def test_events_for_other_tasks_are_ignored(listener):
+    async with listener.subscribe([1]) as events:
+        await ModerationRedisRepository().publish_task_event(5, "completed")
+        assert await events.wait(0.1) == set()
+
+
+@pytest.mark.asyncio
+async def test_unsubscribes_on_exit(listener):
+    async with listener.subscribe([1]):
+        pass
+    assert listener._subscriptions == {}
+
+
+def test_malformed_event_is_ignored():
+    listener = TaskEventListener()
+    listener.dispatch("not json")
+    listener.dispatch('{"status": "completed"}')
+
+
+@pytest.mark.asyncio
+async def test_falls_back_to_polling_without_redis():
+    @asynccontextmanager
+    async def broken_connection():
+        raise ConnectionError("redis is down")
+        yield
+
+    listener = TaskEventListener(ready_timeout=0.05, reconnect_delay=0.05, fallback_poll=0.05)
+    with patch("repository.moderation_result.task_events.get_redis_connection", broken_connection):
+        async with listener.subscribe([1, 2]) as events:
+            assert not listener.connected
+            assert await events.wait(10) == {1, 2}
+    await listener.stop()
+
+
+def make_db(record):
+    db = AsyncMock()
+    db.execute.return_value = MagicMock()
+    db.execute.return_value.first.return_value = record
+    return db
+
+
+@pytest.mark.asyncio
+async def test_update_task_caches_finished_task():
+    redis_repo = MagicMock()
+    redis_repo.set_finished_tasks = AsyncMock()
+    repo = ModerationResultRepository(AsyncMock(), redis_repo)
+
+    await repo.update_task(db=make_db(ModerationRecord(7, 10, "pending")), task_id=7, status="pending")
+    redis_repo.set_finished_tasks.assert_not_awaited()
+
+    record = ModerationRecord(7, 10, "completed", True, 0.9)
+    await repo.update_task(db=make_db(record), task_id=7, status="completed", is_violation=True, probability=0.9)
+    redis_repo.set_finished_tasks.assert_awaited_once_with([record])
+
+
+@pytest.mark.asyncio
+async def test_update_task_survives_cache_failure():
+    redis_repo = MagicMock()
+    redis_repo.set_finished_tasks = AsyncMock(side_effect=ConnectionError("redis is down"))
+    db = make_db(ModerationRecord(7, 10, "failed"))
+
+    record = await ModerationResultRepository(db, redis_repo).update_task(db=db, task_id=7, status="failed")
+
+    assert record.status == "failed"
+    db.commit.assert_awaited_once()
+
+
+@pytest.fixture
+def moder_repo():
+    repo = AsyncMock()
+    repo.get_result = AsyncMock(return_value=make_task(status="pending"))
+    return repo
+
+
+@pytest.mark.asyncio
+async def test_wait_for_result_returns_finished_task_at_once(moder_repo, listener):
+    moder_repo.get_result.return_value = make_task(status="completed", is_violation=False, probability=0.1)
+    service = ModerationService(moder_repo=moder_repo, item_repo=AsyncMock(), task_events=listener)
+
+    result = await service.wait_for_result(1, timeout=5)
+
+    assert result.status == "completed"
+    moder_repo.get_result.assert_awaited_once_with(1)
+
+
+@pytest.mark.asyncio
+async def test_wait_for_result_wakes_on_event(moder_repo, listener):
+    service = ModerationService(moder_repo=moder_repo, item_repo=AsyncMock(), task_events=listener)
+
+    async def finish():
+        await asyncio.sleep(0.05)
+        moder_repo.get_result.return_value = make_task(status="completed", is_violation=True, probability=0.9)
+        await ModerationRedisRepository().publish_task_event(1, "completed")
+
+    started = asyncio.get_running_loop().time()
+    result, _ = await asyncio.gather(service.wait_for_result(1, timeout=5), finish())
+
+    assert result.status == "completed"
+    assert asyncio.get_running_loop().time() - started < 1
+    moder_repo.release_connection.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_wait_for_result_times_out_with_pending_task(moder_repo, listener):
+    service = ModerationService(moder_repo=moder_repo, item_repo=AsyncMock(), task_events=listener)
+
+    result = await service.wait_for_result(1, timeout=0.1)
+
+    assert result.status == "pending"
+
+
+@pytest.mark.asyncio
+async def test_stream_results_delivers_tasks_as_they_finish(listener):
+    tasks = {1: make_task(1, "completed", False, 0.2), 2: make_task(2), 3: None}
+    moder_repo = AsyncMock()
+    moder_repo.get_result = AsyncMock(side_effect=lambda task_id: tasks[task_id])
+    service = ModerationService(moder_repo=moder_repo, item_repo=AsyncMock(), task_events=listener)
+
+    async def finish():
+        await asyncio.sleep(0.05)
+        tasks[2] = make_task(2, "failed")
+        await ModerationRedisRepository().publish_task_event(2, "failed")
+
+    async def collect():
+        return [update async for update in service.stream_results([1, 2, 3], timeout=5, heartbeat=1)]
+
+    updates, _ = await asyncio.gather(collect(), finish())
+
+    assert [(task_id, task and task.status) for task_id, task in updates] == [
+        (1, "completed"), (3, None), (2, "failed"),
+    ]
+
+
+def test_long_poll_endpoint(app_client, redis_patched):
+    app_client.moder_service.task_events = TaskEventListener(ready_timeout=1)
+    app_client.moder_service.moder_repo.get_result.return_value = make_task(
+        status="completed", is_violation=True, probability=0.8
+    )
+
+    response = app_client.get("/moderation_result/1", params={"wait": 5})
+
+    assert response.status_code == 200
+    assert response.json()["status"] == "completed"
+
+
+def test_long_poll_wait_is_bounded(app_client):
+    response = app_client.get("/moderation_result/1", params={"wait": 3600})
+    assert response.status_code == 422
+
+
+def test_stream_endpoint_sends_events(app_client, redis_patched):
+    app_client.moder_service.task_events = TaskEventListener(ready_timeout=1)
+    tasks = {1: make_task(1, "completed", False, 0.2), 2: None}
+    app_client.moder_service.moder_repo.get_result = AsyncMock(side_effect=lambda task_id: tasks[task_id])
+
+    response = app_client.get("/moderation_result/stream", params={"task_ids": "1,2", "timeout": 5})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    body = response.text
+    assert 'event: result\ndata: {"task_id": 1, "status": "completed", "is_violation": false, "probability": 0.2}' in body
+    assert 'event: not_found\ndata: {"task_id": 2}' in body
+    assert body.endswith('event: done\ndata: {"pending": []}\n\n')
+
+
+def test_stream_endpoint_reports_pending_tasks_on_timeout(app_client, redis_patched):
+    app_client.moder_service.task_events = TaskEventListener(ready_timeout=1)
+    app_client.moder_service.moder_repo.get_result.return_value = make_task(1)
+
+    response = app_client.get("/moderation_result/stream", params={"task_ids": "1", "timeout": 0.2})
+
+    assert response.text.endswith('event: timeout\ndata: {"pending": [1]}\n\n')
+
+
+@pytest.mark.parametrize("task_ids", ["", "1,x", ",".join(str(i) for i in range(1000))])
+def test_stream_endpoint_rejects_bad_task_ids(app_client, task_ids):
+    response = app_client.get("/moderation_result/stream", params={"task_ids": task_ids})
+    assert response.status_code == 400
@@ -0,0 +1,62 @@
+import pytest
+
+import app.tracing as tracing
+from app.tracing import TraceSampler, parse_rates
+
+
+@pytest.fixture
+def sampler():
+    return TraceSampler(
+        default_rate=0.05,
+        error_rate=0.5,
+        endpoint_rates={"/metrics": 0.0, "/predict": 0.2, "/predict/batch": 1.0},
+    )
+
+
+def transaction(name, status="ok"):
+    return {"transaction": name, "contexts": {"trace": {"status": status}}}
+
+
+def test_parse_rates():
+    assert parse_rates("/predict=0.1, /metrics=0,") == {"/predict": 0.1, "/metrics": 0.0}
+
+
+def test_longest_prefix_wins(sampler):
+    assert sampler.rate_for("/predict/batch") == 1.0
+    assert sampler.rate_for("/predict") == 0.2
+    assert sampler.rate_for("/moderation_result/1") == 0.05
+    assert sampler.rate_for(None) == 0.05
+
+
+def test_sampler_uses_candidate_rate(sampler):
+    assert sampler({"asgi_scope": {"path": "/predict"}}) == 0.5
+    assert sampler({"asgi_scope": {"path": "/predict/batch"}}) == 1.0
+    assert sampler({"transaction_context": {"name": "moderation"}}) == 0.5
+
+
+def test_disabled_endpoint_is_never_traced(sampler):
+    assert sampler({"asgi_scope": {"path": "/metrics"}}) == 0.0
+
+
+def test_parent_decision_is_respected(sampler):
+    assert sampler({"parent_sampled": True, "asgi_scope": {"path": "/metrics"}}) == 1.0
+    assert sampler({"parent_sampled": False, "asgi_scope": {"path": "/predict"}}) == 0.0
+
+
+def test_failed_transactions_are_always_sent(sampler, monkeypatch):
+    monkeypatch.setattr(tracing.random, "random", lambda: 0.99)
+    event = transaction("/predict", status="internal_error")
+    assert sampler.before_send_transaction(event, {}) is event
+
+
+def test_successful_transactions_are_thinned_to_endpoint_rate(sampler, monkeypatch):
+    # /predict: 0.2 из кандидатов 0.5 -> остаётся 40% успешных
+    monkeypatch.setattr(tracing.random, "random", lambda: 0.39)
+    assert sampler.before_send_transaction(transaction("/predict"), {}) is not None
+    monkeypatch.setattr(tracing.random, "random", lambda: 0.41)
+    assert sampler.before_send_transaction(transaction("/predict"), {}) is None
+
+
+def test_transactions_above_error_rate_are_kept(sampler, monkeypatch):
+    monkeypatch.setattr(tracing.random, "random", lambda: 0.99)
+    assert sampler.before_send_transaction(transaction("/predict/batch"), {}) is not None
@@ -0,0 +1,146 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from model.item import Item
+from app.workers import moderation_worker
+from repository.item.item_repository import ItemRepository
+from repository.moderation_result import moderation_result_repository
+from repository.moderation_result.finished_tasks import FinishedTaskBuffer
+from repository.moderation_result.moderation_result_repository import ModerationResultRepository
+from repository.records import TaskOutcome
+
+
+async def create_tasks(session_factory, count):
+    async with session_factory() as db:
+        items = ItemRepository(db)
+        moderations = ModerationResultRepository(db)
+        tasks = []
+        for i in range(count):
+            item = await items.create_item(Item(name=f"item {i}", description="desc", category=1, images_qty=2))
+            tasks.append(await moderations.create_moderation(item.id))
+    return tasks
+
+
+def message(item_id, task_id=None):
+    event = {"item_id": item_id}
+    if task_id is not None:
+        event["task_id"] = task_id
+    return SimpleNamespace(value=json.dumps(event).encode("utf-8"))
+
+
+@pytest.mark.integration
+async def test_update_tasks_applies_every_outcome(session_factory, monkeypatch):
+    monkeypatch.setattr(moderation_result_repository, "UPDATE_TASKS_CHUNK_SIZE", 2)
+    tasks = await create_tasks(session_factory, 5)
+    buffer = FinishedTaskBuffer(MagicMock())
+
+    async with session_factory() as db:
+        moderations = ModerationResultRepository(db, finished_tasks=buffer)
+        await moderations.update_task(db, tasks[4].id, "pending", retry_count=2)
+        records = await moderations.update_tasks(db, [
+            TaskOutcome(tasks[0].id, "completed", True, 0.9),
+            TaskOutcome(tasks[1].id, "completed", False, 0.1),
+            TaskOutcome(tasks[2].id, "failed", error_message="boom", retry_count=3),
+            TaskOutcome(tasks[3].id, "completed", True, 0.7),
+            TaskOutcome(tasks[4].id, "pending"),
+        ])
+        stored = {task.id: await moderations.get_moderation(task.id) for task in tasks}
+
+    assert len(records) == 5
+    assert stored[tasks[0].id].status == "completed" and stored[tasks[0].id].is_violation is True
+    assert stored[tasks[1].id].is_violation is False and stored[tasks[1].id].probability == 0.1
+    assert stored[tasks[2].id].error_message == "boom" and stored[tasks[2].id].retry_count == 3
+    # retry_count=None оставляет счётчик как есть
+    assert stored[tasks[4].id].status == "pending" and stored[tasks[4].id].retry_count == 2
+    assert all(record.processed_at is not None for record in stored.values())
+    assert set(buffer._records) == {tasks[0].id, tasks[1].id, tasks[2].id, tasks[3].id}
+
+
+@pytest.mark.integration
+async def test_update_tasks_without_outcomes(session_factory):
+    async with session_factory() as db:
+        assert await ModerationResultRepository(db).update_tasks(db, []) == []
+
+
+@pytest.mark.integration
+async def test_latest_pending_for_items(session_factory):
+    tasks = await create_tasks(session_factory, 2)
+    async with session_factory() as db:
+        moderations = ModerationResultRepository(db)
+        newer = await moderations.create_moderation(tasks[0].item_id)
+        await moderations.update_task(db, tasks[1].id, "completed", is_violation=False, probability=0.2)
+
+        pending = await moderations.get_latest_pending_for_items(db, [tasks[0].item_id, tasks[1].item_id, 999])
+
+    assert pending == {tasks[0].item_id: newer.id}
+
+
+@pytest.mark.integration
+async def test_moderate_batch_updates_all_pending_tasks(session_factory, mock_service, monkeypatch):
+    tasks = await create_tasks(session_factory, 3)
+    buffer = FinishedTaskBuffer(MagicMock())
+    monkeypatch.setattr(moderation_worker, "session_maker", session_factory)
+    monkeypatch.setattr(moderation_worker, "finished_tasks", buffer)
+    malformed = SimpleNamespace(value=b"not json")
+    repeated = message(tasks[0].item_id)
+    missing = message(999)
+    messages = [message(task.item_id) for task in tasks] + [malformed, repeated, missing]
+
+    remaining = await moderation_worker.moderate_batch(
+        messages, mock_service.model, mock_service.model_repository,
+    )
+
+    assert remaining == [malformed, repeated, missing]
+    async with session_factory() as db:
+        stored = [await ModerationResultRepository(db).get_moderation(task.id) for task in tasks]
+    assert [record.status for record in stored] == ["completed"] * 3
+    assert all(record.probability is not None for record in stored)
+    assert set(buffer._records) == {task.id for task in tasks}
+
+
+@pytest.mark.integration
+async def test_moderate_batch_completes_the_claimed_task(session_factory, mock_service, monkeypatch):
+    tasks = await create_tasks(session_factory, 1)
+    async with session_factory() as db:
+        # Более новая задача того же объявления арендована другим воркером
+        newer = await ModerationResultRepository(db).create_moderation(tasks[0].item_id)
+    monkeypatch.setattr(moderation_worker, "session_maker", session_factory)
+    monkeypatch.setattr(moderation_worker, "finished_tasks", FinishedTaskBuffer(MagicMock()))
+
+    remaining = await moderation_worker.moderate_batch(
+        [message(tasks[0].item_id, task_id=tasks[0].id)], mock_service.model, mock_service.model_repository,
+    )
+
+    assert remaining == []
+    async with session_factory() as db:
+        moderations = ModerationResultRepository(db)
+        assert (await moderations.get_moderation(tasks[0].id)).status == "completed"
+        assert (await moderations.get_moderation(newer.id)).status == "pending"
+
+
+@pytest.mark.asyncio
+async def test_handle_batch_falls_back_to_single_messages():
+    consumer = MagicMock()
+    consumer.commit = AsyncMock()
+    handled = []
+
+    async def handle_message(msg, **kwargs):
+        handled.append(msg)
+
+    async def broken_batch(*args, **kwargs):
+        raise ConnectionError("db is down")
+
+    buffer = MagicMock()
+    buffer.flush = AsyncMock()
+    with patch.object(moderation_worker, "moderate_batch", broken_batch), \
+            patch.object(moderation_worker, "handle_message", side_effect=handle_message), \
+            patch.object(moderation_worker, "finished_tasks", buffer):
+        await moderation_worker.handle_batch(
+            consumer=consumer, messages=["m1", "m2"], model=MagicMock(), model_repo=None, dlq_producer=None,
+        )
+
+    assert handled == ["m1", "m2"]
+    consumer.commit.assert_awaited_once()